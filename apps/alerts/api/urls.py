@@ -4,7 +4,7 @@ Koimeret Dairies - Alerts API URLs
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import AlertViewSet, NotificationViewSet, AlertRuleViewSet
+from .views import AlertViewSet, NotificationViewSet, AlertRuleViewSet, OpenAlertsView, UnreadNotificationsView
 
 router = DefaultRouter()
 router.register(r"alerts", AlertViewSet, basename="alert")
@@ -12,5 +12,8 @@ router.register(r"notifications", NotificationViewSet, basename="notification")
 router.register(r"alerts/rules", AlertRuleViewSet, basename="alert-rule")
 
 urlpatterns = [
+    # Async polling endpoints, matched before the router's detail routes
+    path("alerts/open/", OpenAlertsView.as_view(), name="alert-open"),
+    path("notifications/unread/", UnreadNotificationsView.as_view(), name="notification-unread"),
     path("", include(router.urls)),
 ]
@@ -10,6 +10,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
 from apps.alerts.models import Alert, Notification, AlertRule
+from apps.core.aio import AsyncAPIView, gather
 from .serializers import AlertSerializer, NotificationSerializer, AlertRuleSerializer
 
 
@@ -28,13 +29,6 @@ class AlertViewSet(viewsets.ModelViewSet):
             return Alert.objects.filter(farm=user.active_farm)
         return Alert.objects.none()
 
-    @action(detail=False, methods=["get"])
-    def open(self, request):
-        """Get open alerts."""
-        alerts = self.get_queryset().filter(status="open")
-        serializer = AlertSerializer(alerts, many=True)
-        return Response(serializer.data)
-
     @action(detail=False, methods=["get"])
     def summary(self, request):
         """Get alerts summary."""
@@ -94,13 +88,6 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user)
 
-    @action(detail=False, methods=["get"])
-    def unread(self, request):
-        """Get unread notifications."""
-        notifications = self.get_queryset().exclude(status="read")
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
-
     @action(detail=True, methods=["post"])
     def mark_read(self, request, pk=None):
         """Mark notification as read."""
@@ -136,3 +123,32 @@ class AlertRuleViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(farm=self.request.user.active_farm)
+
+
+class OpenAlertsView(AsyncAPIView):
+    """Get open alerts (async polling endpoint)."""
+    version_models = ["alerts.Alert"]
+
+    async def get_data(self, request):
+        farm_id = request.user.active_farm_id
+        if not farm_id:
+            return []
+
+        def load():
+            alerts = Alert.objects.filter(farm_id=farm_id, status="open").select_related("resolved_by")
+            return AlertSerializer(alerts, many=True).data
+
+        (data,) = await gather(load)
+        return data
+
+
+class UnreadNotificationsView(AsyncAPIView):
+    """Get unread notifications (async polling endpoint)."""
+
+    async def get_data(self, request):
+        def load():
+            notifications = Notification.objects.filter(user=request.user).exclude(status="read")
+            return NotificationSerializer(notifications, many=True).data
+
+        (data,) = await gather(load)
+        return data
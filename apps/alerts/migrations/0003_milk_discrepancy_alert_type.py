@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='alert_type',
+            field=models.CharField(choices=[('low_stock', 'Low Stock'), ('yield_drop', 'Yield Drop'), ('vaccine_due', 'Vaccine Due'), ('withdrawal_active', 'Withdrawal Active'), ('task_missed', 'Task Missed'), ('health_event', 'Health Event'), ('payment_overdue', 'Payment Overdue'), ('milk_discrepancy', 'Milk Discrepancy'), ('system', 'System')], max_length=30, verbose_name='type'),
+        ),
+        migrations.AlterField(
+            model_name='alertrule',
+            name='alert_type',
+            field=models.CharField(choices=[('low_stock', 'Low Stock'), ('yield_drop', 'Yield Drop'), ('vaccine_due', 'Vaccine Due'), ('withdrawal_active', 'Withdrawal Active'), ('task_missed', 'Task Missed'), ('health_event', 'Health Event'), ('payment_overdue', 'Payment Overdue'), ('milk_discrepancy', 'Milk Discrepancy'), ('system', 'System')], max_length=30, verbose_name='alert type'),
+        ),
+    ]
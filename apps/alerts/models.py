@@ -20,6 +20,7 @@ class Alert(TimeStampedModel, FarmScopedModel):
         ("task_missed", _("Task Missed")),
         ("health_event", _("Health Event")),
         ("payment_overdue", _("Payment Overdue")),
+        ("milk_discrepancy", _("Milk Discrepancy")),
         ("system", _("System")),
     ]
 
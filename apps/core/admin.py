@@ -3,4 +3,40 @@ Koimeret Dairies - Core Admin
 """
 from django.contrib import admin
 
-# Core app has no models to register directly
+from .models import ArchiveChunk, LabelSheet, ModelVersion, OutboxEvent, UploadSession
+
+
+@admin.register(ArchiveChunk)
+class ArchiveChunkAdmin(admin.ModelAdmin):
+    list_display = ["model_label", "farm", "month", "row_count", "created_at"]
+    list_filter = ["model_label", "farm"]
+    exclude = ["payload"]
+    readonly_fields = ["farm", "model_label", "month", "row_count", "created_at"]
+
+
+@admin.register(ModelVersion)
+class ModelVersionAdmin(admin.ModelAdmin):
+    list_display = ["label", "farm", "version", "updated_at"]
+    list_filter = ["label", "farm"]
+    readonly_fields = ["farm", "label", "version", "updated_at"]
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ["id", "target", "object_id", "farm", "user", "offset", "size", "status", "expires_at"]
+    list_filter = ["status", "target", "farm"]
+    readonly_fields = ["farm", "user", "target", "object_id", "filename", "size", "offset", "status", "error", "expires_at"]
+
+
+@admin.register(LabelSheet)
+class LabelSheetAdmin(admin.ModelAdmin):
+    list_display = ["id", "farm", "format", "feed_items", "cows", "label_count", "status", "created_at"]
+    list_filter = ["status", "format", "farm"]
+    readonly_fields = ["farm", "requested_by", "content_hash", "file", "label_count", "status", "error"]
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ["id", "label", "object_id", "action", "farm_id", "created_at", "published_at"]
+    list_filter = ["label", "action"]
+    readonly_fields = ["farm_id", "label", "object_id", "action", "data", "created_at", "published_at"]
@@ -0,0 +1,172 @@
+"""
+Koimeret Dairies - Async Read Views
+
+Async views for the high fan-out polling endpoints (dashboards, open alerts,
+unread notifications, today's tasks). Under uvicorn a worker keeps serving
+other requests while one waits on the database; under gunicorn they still
+run, one event loop per request.
+
+Django 4.2's async ORM methods all run on a single thread-sensitive thread,
+so awaiting several of them does not overlap the queries. `gather` instead
+runs independent query functions on a bounded thread pool. Each pool thread
+has its own connection (reused within CONN_MAX_AGE), and the request's SQL
+metrics collector is attached in the thread that runs the query.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views import View
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied, Throttled
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .caching import afetch
+from .metrics import current_metrics
+from .versions import data_cache_key, set_validators, validator
+
+DEFAULTS = {
+    "CONCURRENT": True,
+    "MAX_WORKERS": 16,
+}
+
+
+def get_async_setting(name):
+    return getattr(settings, "ASYNC_READS", {}).get(name, DEFAULTS[name])
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(get_async_setting("MAX_WORKERS"), thread_name_prefix="async-reads")
+    return _executor
+
+
+def _call(call, metrics):
+    # Attach the request's SQL collector unless this thread's connection already has it
+    if metrics is None or metrics in connection.execute_wrappers:
+        return call()
+    with connection.execute_wrapper(metrics):
+        return call()
+
+
+def _pooled(call, metrics):
+    close_old_connections()
+    try:
+        return _call(call, metrics)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(call, *args):
+    """Run a sync function on the request's own thread and connection."""
+    return await sync_to_async(_call)(lambda: call(*args), current_metrics.get())
+
+
+async def gather(*calls):
+    """
+    Results of independent query functions, in order. They run concurrently
+    on the pool, or one after another on the request's own connection when
+    ASYNC_READS["CONCURRENT"] is off (tests, query-count benchmarks).
+    """
+    if not get_async_setting("CONCURRENT"):
+        return [await run_sync(call) for call in calls]
+    loop = asyncio.get_running_loop()
+    metrics = current_metrics.get()
+    return await asyncio.gather(*(loop.run_in_executor(get_executor(), _pooled, call, metrics) for call in calls))
+
+
+def _error(exc):
+    response = HttpResponse(JSONRenderer().render({"detail": exc.detail}), status=exc.status_code, content_type="application/json")
+    if isinstance(exc, Throttled) and exc.wait is not None:
+        response["Retry-After"] = str(int(exc.wait))
+    return response
+
+
+class AsyncAPIView(View):
+    """
+    Read-only async API view. Authentication, permission checks and
+    throttling run through the project's DRF classes, as for APIView.
+    Subclasses define the coroutine `get_data(request)`, which returns data
+    for the JSON renderer, or an HttpResponse (e.g. `self.render(error, 400)`).
+
+    `version_models` turns on ETag/Last-Modified validators (see
+    apps.core.versions); `cache_data` also caches the data per farm under
+    those versions.
+    """
+    http_method_names = ["get", "head", "options"]
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    version_models = ()
+    daily = False
+    cache_data = False
+    cache_timeout = 60 * 15
+
+    def initial(self, request):
+        """Authenticate, then check permissions and throttles (APIView.initial without negotiation)."""
+        drf_request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        request.user = drf_request.user
+        self.check_permissions(drf_request)
+        self.check_throttles(drf_request)
+        return request.user
+
+    def check_permissions(self, request):
+        for permission in (permission() for permission in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise NotAuthenticated()
+                raise PermissionDenied(getattr(permission, "message", None), getattr(permission, "code", None))
+
+    def check_throttles(self, request):
+        waits = [
+            throttle.wait() for throttle in (throttle() for throttle in self.throttle_classes)
+            if not throttle.allow_request(request, self)
+        ]
+        if waits:
+            raise Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await run_sync(self.initial, request)
+        except APIException as exc:
+            return _error(exc)
+
+        farm_id = user.active_farm_id
+        if not self.version_models or not farm_id:
+            return self.render(await self.get_data(request))
+
+        labels = tuple(self.version_models)
+        digest, last_modified = await run_sync(validator, request, farm_id, labels, self.daily)
+        etag = quote_etag(digest)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await self.get_cached(request, farm_id, labels)
+            if response.status_code != 200:
+                return response
+        return set_validators(response, etag, last_modified)
+
+    async def get_cached(self, request, farm_id, labels):
+        if not self.cache_data:
+            return self.render(await self.get_data(request))
+
+        key = await run_sync(data_cache_key, request, farm_id, labels, self.daily)
+        data = await afetch(
+            key, lambda: self.get_data(request), self.cache_timeout, local=True,
+            cacheable=lambda data: not isinstance(data, HttpResponse),
+        )
+        return self.render(data)
+
+    def render(self, data, status=200):
+        if isinstance(data, HttpResponse):
+            return data
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
@@ -1,26 +1,43 @@
 """
-Koimeret Dairies - Dashboard API
+Koimeret Dairies - Dashboard, Metrics, Upload and Label API
+
+The dashboards are async views (apps.core.aio): their independent aggregate
+queries run concurrently. The multi-farm portfolio is described in
+apps.core.portfolio. Resumable photo uploads are described in
+apps.core.uploads and QR label sheets in apps.core.labels.
 """
 from datetime import date, timedelta
 from decimal import Decimal
 
-from django.db.models import Sum, Count, Avg
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q, Sum
+from rest_framework import serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+from .aio import AsyncAPIView, gather
+from .uploads import TARGETS, UploadError, cancel, get_target, get_upload_setting, receive, start
+
+OWNER_DASHBOARD_MODELS = [
+    "farm.Farm", "dairy.Cow", "dairy.MilkLog", "sales.Sale", "feeds.InventoryBalance", "feeds.FeedItem",
+    "health.Withdrawal", "health.Vaccination", "tasks.TaskInstance", "alerts.Alert",
+]
+WORKER_DASHBOARD_MODELS = ["tasks.TaskInstance", "dairy.MilkLog", "feeds.FeedUsageLog"]
 
 
-class OwnerDashboardView(APIView):
+class OwnerDashboardView(AsyncAPIView):
     """Dashboard API for farm owner."""
-    permission_classes = [IsAuthenticated]
+    version_models = OWNER_DASHBOARD_MODELS
+    daily = True
+    cache_data = True
 
-    def get(self, request):
+    async def get_data(self, request):
         user = request.user
-        farm = user.active_farm
-
-        if not farm:
-            return Response({"error": "No active farm"}, status=400)
+        if not user.active_farm_id:
+            return self.render({"error": "No active farm"}, status=400)
 
+        farm_id = user.active_farm_id
         today = date.today()
         week_ago = today - timedelta(days=7)
         month_ago = today - timedelta(days=30)
@@ -33,57 +50,54 @@ class OwnerDashboardView(APIView):
         from apps.sales.models import Sale
         from apps.alerts.models import Alert
 
-        # Production KPIs
-        today_milk = MilkLog.objects.filter(
-            farm=farm, date=today, is_latest=True
-        ).aggregate(total=Sum("liters"))["total"] or Decimal("0")
-
-        milking_cows = Cow.objects.filter(farm=farm, status="milking").count()
-        liters_per_cow = today_milk / milking_cows if milking_cows > 0 else Decimal("0")
-
-        week_avg = MilkLog.objects.filter(
-            farm=farm, date__gte=week_ago, is_latest=True
-        ).values("date").annotate(
-            daily_total=Sum("liters")
-        ).aggregate(avg=Avg("daily_total"))["avg"] or Decimal("0")
-
-        # Financial KPIs
-        month_sales = Sale.objects.filter(
-            farm=farm, date__gte=month_ago
-        ).aggregate(total=Sum("total_amount"))["total"] or Decimal("0")
-
-        # Inventory
-        low_stock_count = sum(
-            1 for inv in InventoryBalance.objects.filter(farm=farm)
-            if inv.is_low_stock
+        (
+            farm, today_milk, cow_counts, total_cows, week_avg, month_sales,
+            low_stock_count, active_withdrawals, vaccines_due, tasks_missed, open_alerts,
+        ) = await gather(
+            lambda: user.active_farm,
+            # Production KPIs
+            lambda: MilkLog.objects.filter(
+                farm_id=farm_id, date=today, is_latest=True
+            ).aggregate(total=Sum("liters"))["total"] or Decimal("0"),
+            lambda: dict(Cow.objects.filter(farm_id=farm_id).values_list("status").annotate(count=Count("id")).order_by()),
+            lambda: Cow.objects.filter(farm_id=farm_id, is_active=True).count(),
+            lambda: MilkLog.objects.filter(
+                farm_id=farm_id, date__gte=week_ago, is_latest=True
+            ).values("date").annotate(
+                daily_total=Sum("liters")
+            ).aggregate(avg=Avg("daily_total"))["avg"] or Decimal("0"),
+            # Financial KPIs
+            lambda: Sale.objects.filter(
+                farm_id=farm_id, date__gte=month_ago
+            ).aggregate(total=Sum("total_amount"))["total"] or Decimal("0"),
+            # Inventory (same rule as InventoryBalance.is_low_stock)
+            lambda: InventoryBalance.objects.filter(
+                farm_id=farm_id, quantity_on_hand__lte=F("feed_item__reorder_level")
+            ).count(),
+            # Health
+            lambda: Withdrawal.objects.filter(
+                farm_id=farm_id, is_active=True, end_date__gte=today
+            ).count(),
+            lambda: Vaccination.objects.filter(
+                farm_id=farm_id,
+                next_due_date__gte=today,
+                next_due_date__lte=today + timedelta(days=7)
+            ).count(),
+            # Tasks
+            lambda: TaskInstance.objects.filter(
+                farm_id=farm_id, task_date=today, status="pending"
+            ).exclude(due_time=None).count(),  # Simplified check
+            # Alerts
+            lambda: Alert.objects.filter(farm_id=farm_id, status="open").count(),
         )
 
-        # Health
-        active_withdrawals = Withdrawal.objects.filter(
-            farm=farm, is_active=True, end_date__gte=today
-        ).count()
-
-        vaccines_due = Vaccination.objects.filter(
-            farm=farm,
-            next_due_date__gte=today,
-            next_due_date__lte=today + timedelta(days=7)
-        ).count()
-
-        # Tasks
-        today_tasks = TaskInstance.objects.filter(farm=farm, task_date=today)
-        tasks_missed = today_tasks.filter(
-            status="pending"
-        ).exclude(due_time=None).count()  # Simplified check
-
-        # Alerts
-        open_alerts = Alert.objects.filter(farm=farm, status="open").count()
+        milking_cows = cow_counts.get("milking", 0)
+        liters_per_cow = today_milk / milking_cows if milking_cows > 0 else Decimal("0")
 
         # Cow stats
-        cow_stats = {}
-        for status_code, _ in Cow.STATUS_CHOICES:
-            cow_stats[status_code] = Cow.objects.filter(farm=farm, status=status_code).count()
+        cow_stats = {status_code: cow_counts.get(status_code, 0) for status_code, _ in Cow.STATUS_CHOICES}
 
-        return Response({
+        return {
             "kpis": {
                 "total_liters_today": float(today_milk),
                 "liters_per_cow_today": float(round(liters_per_cow, 2)),
@@ -98,22 +112,21 @@ class OwnerDashboardView(APIView):
             "cow_stats": cow_stats,
             "farm": {
                 "name": farm.name,
-                "total_cows": Cow.objects.filter(farm=farm, is_active=True).count(),
+                "total_cows": total_cows,
                 "milking_cows": milking_cows,
             },
-        })
+        }
 
 
-class WorkerDashboardView(APIView):
+class WorkerDashboardView(AsyncAPIView):
     """Dashboard API for farm worker."""
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request):
-        user = request.user
-        farm = user.active_farm
+    version_models = WORKER_DASHBOARD_MODELS
+    daily = True
 
-        if not farm:
-            return Response({"error": "No active farm"}, status=400)
+    async def get_data(self, request):
+        farm_id = request.user.active_farm_id
+        if not farm_id:
+            return self.render({"error": "No active farm"}, status=400)
 
         today = date.today()
 
@@ -121,36 +134,241 @@ class WorkerDashboardView(APIView):
         from apps.feeds.models import FeedUsageLog
         from apps.tasks.models import TaskInstance
 
-        # Today's tasks
-        today_tasks = TaskInstance.objects.filter(farm=farm, task_date=today)
-        tasks_done = today_tasks.filter(status="done").count()
-        tasks_total = today_tasks.count()
-
-        # Today's milk logs
-        milk_sessions = MilkLog.objects.filter(
-            farm=farm, date=today, is_latest=True
-        ).values("session").annotate(count=Count("id"))
-
-        # Today's feed entries
-        feed_entries = FeedUsageLog.objects.filter(
-            farm=farm, date=today
-        ).count()
+        today_tasks = TaskInstance.objects.filter(farm_id=farm_id, task_date=today)
+        task_counts, milk_sessions, feed_entries, first_tasks = await gather(
+            # Today's tasks
+            lambda: today_tasks.aggregate(total=Count("id"), done=Count("id", filter=Q(status="done"))),
+            # Today's milk logs
+            lambda: MilkLog.objects.filter(
+                farm_id=farm_id, date=today, is_latest=True
+            ).values("session").distinct().count(),
+            # Today's feed entries
+            lambda: FeedUsageLog.objects.filter(farm_id=farm_id, date=today).count(),
+            lambda: list(today_tasks.values("id", "name", "status", "due_time")[:10]),
+        )
+        tasks_done, tasks_total = task_counts["done"], task_counts["total"]
 
-        return Response({
+        return {
             "kpis": {
                 "tasks_done": tasks_done,
                 "tasks_total": tasks_total,
                 "tasks_progress": f"{tasks_done}/{tasks_total}",
-                "milk_sessions_logged": len(milk_sessions),
+                "milk_sessions_logged": milk_sessions,
                 "feed_entries_today": feed_entries,
             },
             "today_tasks": [
                 {
-                    "id": t.id,
-                    "name": t.name,
-                    "status": t.status,
-                    "due_time": str(t.due_time) if t.due_time else None,
+                    "id": t["id"],
+                    "name": t["name"],
+                    "status": t["status"],
+                    "due_time": str(t["due_time"]) if t["due_time"] else None,
                 }
-                for t in today_tasks[:10]
+                for t in first_tasks
+            ],
+        }
+
+
+class PortfolioView(APIView):
+    """Owner dashboard KPIs for every farm the user owns or administers, with totals."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from apps.farm.membership import get_farm_context
+
+        from .portfolio import get_snapshots, portfolio_farms, totals
+
+        farms = portfolio_farms(get_farm_context(request.user))
+        snapshots = get_snapshots([farm_id for farm_id, _, _ in farms], user=request.user)
+        return Response({
+            "farms": [
+                {"id": farm_id, "name": name, "roles": roles, **snapshots[farm_id]}
+                for farm_id, name, roles in farms
             ],
+            "totals": totals([snapshots[farm_id] for farm_id, _, _ in farms]),
         })
+
+
+class RequestMetricsView(APIView):
+    """Rolling per-view request metrics and cache tier counts of this worker process (admin only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from .caching import stats
+        from .metrics import get_aggregator
+        return Response({**get_aggregator().snapshot(), "cache_tiers": stats.snapshot()})
+
+    def delete(self, request):
+        from .caching import stats
+        from .metrics import get_aggregator
+        get_aggregator().reset()
+        stats.reset()
+        return Response(status=204)
+
+
+class UploadSessionSerializer(serializers.Serializer):
+    id = serializers.UUIDField(read_only=True)
+    target = serializers.ChoiceField(choices=list(TARGETS))
+    object_id = serializers.IntegerField(min_value=1)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    offset = serializers.IntegerField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    error = serializers.CharField(read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    def get_chunk_size(self, obj):
+        return get_upload_setting("CHUNK_SIZE")
+
+    def validate_size(self, value):
+        if value > get_upload_setting("MAX_SIZE"):
+            raise serializers.ValidationError(f"Uploads are limited to {get_upload_setting('MAX_SIZE')} bytes")
+        return value
+
+
+class UploadSessionListView(APIView):
+    """
+    Start a resumable photo upload.
+    Body: target (task_completion or health_event), object_id, filename, size.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        farm = request.user.active_farm
+        if not farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if get_target(data["target"], data["object_id"], farm.id) is None:
+            return Response({"error": f"{data['target']} {data['object_id']} not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        session = start(request.user, farm, data["target"], data["object_id"], data["filename"], data["size"])
+        response = Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+        response["Upload-Offset"] = session.offset
+        return response
+
+
+class UploadSessionView(APIView):
+    """
+    Resume point (GET), next chunk (PATCH) or cancel (DELETE) of an upload.
+    PATCH sends the raw chunk bytes as the body with an Upload-Offset header
+    equal to the session's current offset.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self, request, pk):
+        from .models import UploadSession
+        return UploadSession.objects.filter(pk=pk, user=request.user).first()
+
+    def get(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(UploadSessionSerializer(session).data)
+        response["Upload-Offset"] = session.offset
+        return response
+
+    def patch(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers.get("Content-Length") or 0)
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length headers required", "offset": session.offset},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            # Read the raw body; request.data would buffer and parse it
+            session = receive(session, offset, length, request.stream)
+        except UploadError as exc:
+            response = Response({"error": str(exc), "offset": exc.offset}, status=status.HTTP_409_CONFLICT)
+            response["Upload-Offset"] = exc.offset
+            return response
+
+        response = Response(UploadSessionSerializer(session).data)
+        response["Upload-Offset"] = session.offset
+        return response
+
+    def delete(self, request, pk):
+        session = self.get_session(request, pk)
+        if session is None:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        cancel(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LabelSheetSerializer(serializers.Serializer):
+    id = serializers.UUIDField(read_only=True)
+    feed_items = serializers.BooleanField(default=True)
+    cows = serializers.BooleanField(default=False)
+    format = serializers.ChoiceField(choices=["pdf", "png"], default="pdf")
+    status = serializers.CharField(read_only=True)
+    label_count = serializers.IntegerField(read_only=True)
+    url = serializers.SerializerMethodField()
+    error = serializers.CharField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+    def get_url(self, obj):
+        if obj.status != "complete" or not obj.file:
+            return None
+        request = self.context.get("request")
+        return request.build_absolute_uri(obj.file.url) if request else obj.file.url
+
+    def validate(self, attrs):
+        if not attrs.get("feed_items") and not attrs.get("cows"):
+            raise serializers.ValidationError("Choose feed_items, cows or both")
+        return attrs
+
+
+class LabelSheetListView(APIView):
+    """
+    Recent QR label sheets of the active farm (GET) or a new one (POST).
+    Body: feed_items (default true), cows (default false), format (pdf or png).
+    Sheets render in the background; poll the sheet until it has a url.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from .models import LabelSheet
+
+        farm_id = request.user.active_farm_id
+        if not farm_id:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+        sheets = LabelSheet.objects.filter(farm_id=farm_id)[:20]
+        return Response(LabelSheetSerializer(sheets, many=True, context={"request": request}).data)
+
+    def post(self, request):
+        from .labels import enqueue
+        from .models import LabelSheet
+
+        farm = request.user.active_farm
+        if not farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = LabelSheetSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sheet = LabelSheet.objects.create(farm=farm, requested_by=request.user, **serializer.validated_data)
+        transaction.on_commit(lambda: enqueue(sheet.pk))
+        return Response(
+            LabelSheetSerializer(sheet, context={"request": request}).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class LabelSheetView(APIView):
+    """Status of a QR label sheet, with its download url once complete."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        from .models import LabelSheet
+
+        sheet = LabelSheet.objects.filter(pk=pk, farm_id=request.user.active_farm_id).first()
+        if sheet is None:
+            return Response({"error": "Label sheet not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(LabelSheetSerializer(sheet, context={"request": request}).data)
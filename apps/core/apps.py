@@ -6,3 +6,10 @@ class CoreConfig(AppConfig):
     name = 'apps.core'
     label = 'core'
     verbose_name = 'Core'
+
+    def ready(self):
+        from . import caching, events, images, versions
+        versions.connect_signals()
+        events.connect_signals()
+        images.connect_signals()
+        caching.connect_signals()
@@ -0,0 +1,219 @@
+"""
+Koimeret Dairies - Cold Data Archive
+
+Months older than the hot window are moved out of the high-volume log tables
+into compressed ArchiveChunk rows (one per farm, model and month).
+read_history() merges hot rows and archived rows, so history queries do not
+need to know where a month currently lives. Archived months are only read
+for a range with a start date, so an open-ended query never decodes a
+farm's whole archive.
+"""
+import json
+import zlib
+from datetime import date
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from .models import ArchiveChunk
+from .versions import mark_changed
+
+DEFAULTS = {
+    "HOT_MONTHS": 13,
+    "MODELS": ["dairy.MilkLog", "feeds.FeedUsageLog", "feeds.InventoryMovement"],
+    "COMPRESSION_LEVEL": 6,
+}
+
+DELETE_BATCH_SIZE = 1000
+
+
+def get_archive_setting(name):
+    return getattr(settings, "ARCHIVE", {}).get(name, DEFAULTS[name])
+
+
+def month_start(value):
+    return value.replace(day=1)
+
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def hot_cutoff(hot_months=None, today=None):
+    """First day of the oldest month that stays in the hot tables."""
+    hot_months = hot_months or get_archive_setting("HOT_MONTHS")
+    return add_months(month_start(today or date.today()), -(hot_months - 1))
+
+
+def _field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _encode(rows):
+    data = json.dumps(rows, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    return zlib.compress(data, get_archive_setting("COMPRESSION_LEVEL"))
+
+
+def _decode(payload):
+    if not payload:
+        return []
+    return json.loads(zlib.decompress(bytes(payload)))
+
+
+def _to_instance(model, row):
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.attname in row:
+            values[field.attname] = field.to_python(row[field.attname])
+    instance = model(**values)
+    instance._state.adding = False
+    instance.is_archived = True
+    return instance
+
+
+def archive_month(model, farm_id, month):
+    """Move one farm-month of rows into its ArchiveChunk. Returns rows moved."""
+    label = model._meta.label
+    queryset = model.objects.filter(
+        farm_id=farm_id,
+        date__gte=month,
+        date__lt=add_months(month, 1),
+    )
+
+    with transaction.atomic():
+        rows = list(queryset.values(*_field_names(model)))
+        if not rows:
+            return 0
+
+        chunk, _ = ArchiveChunk.objects.select_for_update().get_or_create(
+            farm_id=farm_id,
+            model_label=label,
+            month=month,
+            defaults={"payload": b""},
+        )
+        archived = _decode(chunk.payload) + json.loads(json.dumps(rows, cls=DjangoJSONEncoder))
+        chunk.payload = _encode(archived)
+        chunk.row_count = len(archived)
+        chunk.save(update_fields=["payload", "row_count"])
+
+        ids = [row["id"] for row in rows]
+        if any(field.name == "previous_revision" for field in model._meta.concrete_fields):
+            # Revisions still in the hot table must not point at archived rows
+            model.objects.filter(previous_revision_id__in=ids).exclude(id__in=ids).update(previous_revision=None)
+
+        # Raw delete: the rows are moved, not removed, so skip per-row signals
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            model.objects.filter(id__in=ids[start:start + DELETE_BATCH_SIZE])._raw_delete(queryset.db)
+        mark_changed(farm_id, label)
+
+    return len(rows)
+
+
+def archive_cold(model_labels=None, hot_months=None, farm_ids=None):
+    """
+    Archive every farm-month older than the hot window.
+    Returns {model_label: rows_moved}.
+    """
+    cutoff = hot_cutoff(hot_months)
+    moved = {}
+    for label in model_labels or get_archive_setting("MODELS"):
+        model = apps.get_model(label)
+        cold = model.objects.filter(date__lt=cutoff)
+        if farm_ids:
+            cold = cold.filter(farm_id__in=farm_ids)
+
+        moved[label] = 0
+        for farm_id in cold.values_list("farm_id", flat=True).distinct().order_by():
+            for month in cold.filter(farm_id=farm_id).dates("date", "month"):
+                moved[label] += archive_month(model, farm_id, month)
+    return moved
+
+
+def parse_range(params):
+    """
+    (date_from, date_to) from a request's date_from and date_to query
+    parameters, either of which may be missing. Raises ValueError for a
+    malformed date or a range that ends before it starts.
+    """
+    dates = []
+    for name in ("date_from", "date_to"):
+        value = params.get(name)
+        if not value:
+            dates.append(None)
+            continue
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2024-02-30
+            parsed = None
+        if parsed is None:
+            raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+        dates.append(parsed)
+    if dates[0] and dates[1] and dates[0] > dates[1]:
+        raise ValueError("date_from must not be after date_to")
+    return tuple(dates)
+
+
+def archived_months(label, date_from, date_to, farm_ids=None):
+    """{(farm_id, month)} of a model's archived farm-months overlapping a date range."""
+    chunks = ArchiveChunk.objects.filter(model_label=label, month__gte=month_start(date_from), month__lte=date_to)
+    if farm_ids:
+        chunks = chunks.filter(farm_id__in=farm_ids)
+    return set(chunks.values_list("farm_id", "month"))
+
+
+def exclude_months(queryset, months):
+    """`queryset` without the rows dated in the given (farm_id, month) pairs."""
+    if not months:
+        return queryset
+    condition = Q()
+    for farm_id, month in months:
+        condition |= Q(farm_id=farm_id, date__gte=month, date__lt=add_months(month, 1))
+    return queryset.exclude(condition)
+
+
+def read_history(model, farm, date_from=None, date_to=None, **filters):
+    """
+    Rows of a date-keyed farm model from both the hot table and the archive,
+    newest first. Without `date_from` only the hot table is read. Extra
+    filters are plain equality lookups on field attnames (e.g. cow_id=3,
+    is_latest=True) so they can be applied to archived rows.
+    """
+    if isinstance(date_from, str):
+        date_from = parse_date(date_from)
+    if isinstance(date_to, str):
+        date_to = parse_date(date_to)
+
+    queryset = model.objects.filter(farm=farm, **filters)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    results = list(queryset)
+    if not date_from:
+        results.sort(key=lambda obj: (obj.date, obj.created_at), reverse=True)
+        return results
+
+    chunks = ArchiveChunk.objects.filter(
+        farm=farm, model_label=model._meta.label, month__gte=month_start(date_from),
+    )
+    if date_to:
+        chunks = chunks.filter(month__lte=date_to)
+
+    for payload in chunks.values_list("payload", flat=True):
+        for row in _decode(payload):
+            instance = _to_instance(model, row)
+            if instance.date < date_from:
+                continue
+            if date_to and instance.date > date_to:
+                continue
+            if all(getattr(instance, name) == value for name, value in filters.items()):
+                results.append(instance)
+
+    results.sort(key=lambda obj: (obj.date, obj.created_at), reverse=True)
+    return results
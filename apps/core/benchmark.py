@@ -0,0 +1,257 @@
+"""
+Koimeret Dairies - API Benchmarks
+
+Runs the hot API endpoints through the DRF test client against a generated
+dataset and records latency (p50/p95), SQL query count and rows fetched per
+request. Results are compared with a committed baseline so regressions fail
+the run. Write scenarios run inside a rolled-back transaction so every
+iteration sees the same data.
+"""
+import gc
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test.utils import CaptureQueriesContext
+
+# name, method, path, payload builder (context -> data) or None
+SCENARIOS = [
+    ("owner_dashboard", "get", "/api/v1/dashboard/owner/", None),
+    ("worker_dashboard", "get", "/api/v1/dashboard/worker/", None),
+    ("owner_portfolio", "get", "/api/v1/dashboard/portfolio/", None),
+    ("milk_log_list", "get", "/api/v1/milk/logs/", None),
+    ("milk_log_summary", "get", "/api/v1/milk/logs/summary/", None),
+    ("milk_log_bulk_create", "post", "/api/v1/milk/logs/bulk_create/", lambda ctx: {
+        "logs": [
+            {"cow": cow_id, "date": str(date.today()), "session": "evening", "liters": "9.5"}
+            for cow_id in ctx["cow_ids"][:20]
+        ],
+    }),
+    ("qr_scan", "post", "/api/v1/feeds/scan/", lambda ctx: {
+        "qr_code": ctx["qr_code"],
+        "quantity": "25.00",
+    }),
+    ("qr_scan_batch", "post", "/api/v1/feeds/scan/batch/", lambda ctx: {
+        "scans": [
+            {"qr_code": ctx["qr_codes"][i % len(ctx["qr_codes"])], "quantity": "5.00", "cow_id": cow_id}
+            for i, cow_id in enumerate(ctx["cow_ids"][:50])
+        ],
+    }),
+    ("inventory_summary", "get", "/api/v1/inventory/balances/summary/", None),
+    ("sales_summary", "get", "/api/v1/sales/summary/", None),
+    ("tasks_today", "get", "/api/v1/tasks/today/", None),
+    ("tasks_overdue", "get", "/api/v1/tasks/overdue/", None),
+]
+
+# Slack added to latency budgets so tiny endpoints do not flap
+MIN_SLACK_MS = 15.0
+
+
+class _RowCounter:
+    """execute_wrapper that sums rows reported by the driver for each query."""
+
+    def __init__(self):
+        self.rows = 0
+        self.supported = True
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if not many and sql.lstrip()[:6].upper() == "SELECT":
+            rowcount = context["cursor"].rowcount
+            if rowcount is None or rowcount < 0:
+                self.supported = False
+            else:
+                self.rows += rowcount
+        return result
+
+
+@contextmanager
+def _rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def _noop():
+    yield
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    return statistics.quantiles(ordered, n=100, method="inclusive")[pct - 1]
+
+
+def prepare_dataset(dataset, write=print):
+    """Generate the benchmark dataset unless it exists. Returns (farm, owner) to benchmark as."""
+    from apps.core.datagen import DataGenerator
+    from apps.farm.models import Farm, User
+
+    farm = Farm.objects.filter(name="Load Test Farm 1").first()
+    if farm is None:
+        write(
+            "Generating dataset: {farms} farm(s) x {cows_per_farm} cows x {days} days (seed {seed})...".format(**dataset)
+        )
+        DataGenerator(
+            farms=dataset["farms"],
+            cows_per_farm=dataset["cows_per_farm"],
+            days=dataset["days"],
+            seed=dataset["seed"],
+        ).run()
+        farm = Farm.objects.get(name="Load Test Farm 1")
+
+    owner = User.objects.get(phone="0799000000")
+    owner.active_farm = farm
+    owner.save(update_fields=["active_farm"])
+    return farm, owner
+
+
+def run_scenario(client, method, path, payload, iterations=20, warmup=3):
+    """Time one endpoint. Returns p50/p95 latency, queries and rows per request."""
+    timings = []
+    queries = 0
+    rows = 0
+    rows_supported = True
+    status_code = None
+
+    for index in range(warmup + iterations):
+        # Garbage from earlier iterations is not this request's cost; collecting
+        # it here keeps those pauses out of the timings
+        gc.collect()
+        counter = _RowCounter()
+        with _rolled_back() if method != "get" else _noop():
+            with CaptureQueriesContext(connection) as captured, connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                if method == "get":
+                    response = client.get(path)
+                else:
+                    response = client.post(path, payload, format="json")
+                elapsed = (time.perf_counter() - started) * 1000
+        status_code = response.status_code
+        if index < warmup:
+            continue
+        timings.append(elapsed)
+        queries = max(queries, len(captured))
+        rows = max(rows, counter.rows)
+        rows_supported = rows_supported and counter.supported
+
+    return {
+        "status": status_code,
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "queries": queries,
+        "rows": rows if rows_supported else None,
+    }
+
+
+def run_all(client, context, iterations=20, warmup=3, only=None):
+    results = {}
+    for name, method, path, build in SCENARIOS:
+        if only and name not in only:
+            continue
+        payload = build(context) if build else None
+        results[name] = run_scenario(client, method, path, payload, iterations, warmup)
+    return results
+
+
+def load_test(user, paths, threads=8, requests_per_thread=50):
+    """
+    Hit `paths` from `threads` concurrent clients, each with its own database
+    connection, closing or keeping connections after every request the way
+    the request handler does (close_old_connections, honouring CONN_MAX_AGE).
+    Returns throughput, latency and the number of connections opened.
+    """
+    from rest_framework.test import APIClient
+
+    opened = []
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def on_connect(sender, connection, **kwargs):
+        with lock:
+            opened.append(connection.alias)
+
+    def worker():
+        client = APIClient()
+        client.force_authenticate(user)
+        local = []
+        try:
+            for index in range(requests_per_thread):
+                path = paths[index % len(paths)]
+                close_old_connections()
+                started = time.perf_counter()
+                response = client.get(path)
+                local.append((time.perf_counter() - started) * 1000)
+                close_old_connections()
+                if response.status_code != 200:
+                    errors.append(f"{path}: {response.status_code}")
+        finally:
+            connections.close_all()
+            with lock:
+                timings.extend(local)
+
+    connection_created.connect(on_connect, dispatch_uid="benchmark_load_test")
+    try:
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        connection_created.disconnect(dispatch_uid="benchmark_load_test")
+
+    return {
+        "requests": len(timings),
+        "errors": len(errors),
+        "requests_per_second": round(len(timings) / elapsed, 1),
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "connections": len(opened),
+    }
+
+
+def compare(results, baseline, tolerance=0.5):
+    """
+    Regressions against a baseline. Query counts are exact budgets; latency
+    and rows may grow by `tolerance` (latency also by MIN_SLACK_MS).
+    Returns a list of human-readable regression messages.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if not expected:
+            continue
+        if result["status"] != expected["status"]:
+            regressions.append(f"{name}: status {result['status']} (baseline {expected['status']})")
+        if result["queries"] > expected["queries"]:
+            regressions.append(f"{name}: {result['queries']} queries (budget {expected['queries']})")
+        for key in ("p50_ms", "p95_ms"):
+            budget = expected[key] * (1 + tolerance) + MIN_SLACK_MS
+            if result[key] > budget:
+                regressions.append(f"{name}: {key[:3]} {result[key]}ms (budget {budget:.1f}ms)")
+        if result["rows"] is not None and expected.get("rows") is not None:
+            if result["rows"] > expected["rows"] * (1 + tolerance):
+                regressions.append(f"{name}: {result['rows']} rows fetched (baseline {expected['rows']})")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(path, dataset, results):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump({"dataset": dataset, "vendor": connection.vendor, "results": results}, handle, indent=2, sort_keys=True)
+        handle.write("\n")
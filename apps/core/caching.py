@@ -0,0 +1,334 @@
+"""
+Koimeret Dairies - Tiered Cache
+
+The shared cache is Redis (django-redis; fakeredis in dev). `fetch` puts
+two things in front of it for expensive, versioned values such as cached
+dashboards, summaries, herd analytics and QR maps:
+
+- A per-process LRU. It is only used for keys that never change once
+  written, i.e. keys that include the model versions they depend on
+  (apps.core.versions), so it can never serve a stale value.
+- Stampede protection. Entries carry the time their value took to compute
+  and are recomputed early with a probability that grows as they near
+  expiry. Only the process holding a short lock recomputes; others keep
+  serving the old value, or wait briefly for the new one when there is none.
+  When the lock cannot be taken because the cache is down, the value is
+  computed straight away rather than waited for.
+
+`fetch_many` reads and computes a batch of such values (one per farm, say)
+with one round trip and one computation for all the misses.
+
+Keys built with `farm_key` share a `farm:<id>:` namespace, which
+`clear_farm` drops in one pass. Lookups are counted per tier for the
+request metrics and for the process-wide stats behind the metrics endpoint.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import record_cache
+
+DEFAULTS = {
+    "LOCAL_SIZE": 512,
+    "LOCAL_TTL": 300,
+    "LOCK_TIMEOUT": 30,
+    "LOCK_WAIT": 5.0,
+    "EARLY_RECOMPUTE_BETA": 1.0,
+}
+
+# How often a waiting process checks whether the lock holder has stored the value
+POLL_INTERVAL = 0.05
+
+
+def get_tiered_cache_setting(name):
+    return getattr(settings, "TIERED_CACHE", {}).get(name, DEFAULTS[name])
+
+
+class LocalLRU:
+    """Thread-safe LRU of {key: value} whose entries expire after `ttl` seconds."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TierStats:
+    """Process-wide lookup counts per tier."""
+
+    FIELDS = ["local_hits", "shared_hits", "misses", "early_recomputes", "lock_waits"]
+
+    def __init__(self):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def add(self, field):
+        with self.lock:
+            self.counts[field] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+    def snapshot(self):
+        with self.lock:
+            counts = {field: self.counts[field] for field in self.FIELDS}
+        lookups = counts["local_hits"] + counts["shared_hits"] + counts["misses"]
+        hits = counts["local_hits"] + counts["shared_hits"]
+        return {
+            **counts,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "local_hit_rate": round(counts["local_hits"] / lookups, 3) if lookups else None,
+        }
+
+
+_local = None
+stats = TierStats()
+
+
+def get_local_cache():
+    global _local
+    if _local is None:
+        _local = LocalLRU(get_tiered_cache_setting("LOCAL_SIZE"), get_tiered_cache_setting("LOCAL_TTL"))
+    return _local
+
+
+def farm_key(farm_id, *parts):
+    return ":".join(["farm", str(farm_id), *map(str, parts)])
+
+
+def _lock_key(key):
+    return f"lock:{key}"
+
+
+def _lock(key):
+    """
+    True if this process took the recompute lock, False if another process
+    holds it, None if the cache could not tell (django-redis returns None
+    for ignored connection errors).
+    """
+    try:
+        return cache.add(_lock_key(key), 1, get_tiered_cache_setting("LOCK_TIMEOUT"))
+    except Exception:
+        return None
+
+
+async def _alock(key):
+    try:
+        return await cache.aadd(_lock_key(key), 1, get_tiered_cache_setting("LOCK_TIMEOUT"))
+    except Exception:
+        return None
+
+
+def _count(field):
+    stats.add(field)
+    if field in ("local_hits", "shared_hits", "misses"):
+        record_cache(field != "misses")
+
+
+def _stale(envelope):
+    """Whether to recompute an entry before it expires (probabilistic early expiry)."""
+    _, delta, expires_at = envelope
+    beta = get_tiered_cache_setting("EARLY_RECOMPUTE_BETA")
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _envelope(value, started, timeout):
+    return (value, time.time() - started, time.time() + timeout)
+
+
+def fetch(key, compute, timeout, local=False, cacheable=None):
+    """
+    `compute()` through the tiers. `local=True` also keeps the value in this
+    process (unless LOCAL_SIZE is 0), so only pass it for keys that include
+    their versions. Values for which `cacheable(value)` is false are
+    returned but not stored.
+    """
+    local = local and get_tiered_cache_setting("LOCAL_SIZE") > 0
+    if local:
+        value = get_local_cache().get(key)
+        if value is not None:
+            _count("local_hits")
+            return value
+
+    envelope = cache.get(key)
+    if envelope is not None and not _stale(envelope):
+        _count("shared_hits")
+        if local:
+            get_local_cache().set(key, envelope[0])
+        return envelope[0]
+
+    locked = _lock(key)
+    if locked is False:
+        if envelope is not None:
+            # Someone else is already recomputing; the current value is still valid
+            _count("shared_hits")
+            return envelope[0]
+        _count("lock_waits")
+        deadline = time.monotonic() + get_tiered_cache_setting("LOCK_WAIT")
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            envelope = cache.get(key)
+            if envelope is not None:
+                _count("shared_hits")
+                return envelope[0]
+        # The holder is slow or gone; compute without the lock rather than fail
+
+    _count("misses" if envelope is None else "early_recomputes")
+    try:
+        started = time.time()
+        value = compute()
+        if cacheable is None or cacheable(value):
+            cache.set(key, _envelope(value, started, timeout), timeout)
+            if local:
+                get_local_cache().set(key, value)
+    finally:
+        if locked:
+            cache.delete(_lock_key(key))
+    return value
+
+
+async def afetch(key, compute, timeout, local=False, cacheable=None):
+    """`fetch` for async views: `compute` is a coroutine function."""
+    local = local and get_tiered_cache_setting("LOCAL_SIZE") > 0
+    if local:
+        value = get_local_cache().get(key)
+        if value is not None:
+            _count("local_hits")
+            return value
+
+    envelope = await cache.aget(key)
+    if envelope is not None and not _stale(envelope):
+        _count("shared_hits")
+        if local:
+            get_local_cache().set(key, envelope[0])
+        return envelope[0]
+
+    locked = await _alock(key)
+    if locked is False:
+        if envelope is not None:
+            _count("shared_hits")
+            return envelope[0]
+        _count("lock_waits")
+        deadline = time.monotonic() + get_tiered_cache_setting("LOCK_WAIT")
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            envelope = await cache.aget(key)
+            if envelope is not None:
+                _count("shared_hits")
+                return envelope[0]
+
+    _count("misses" if envelope is None else "early_recomputes")
+    try:
+        started = time.time()
+        value = await compute()
+        if cacheable is None or cacheable(value):
+            await cache.aset(key, _envelope(value, started, timeout), timeout)
+            if local:
+                get_local_cache().set(key, value)
+    finally:
+        if locked:
+            await cache.adelete(_lock_key(key))
+    return value
+
+
+def fetch_many(keys, compute, timeout, local=False, cacheable=None):
+    """
+    {item: value} for `keys` ({item: cache key}), with one
+    `compute(missing items)` -> {item: value} call for everything not
+    cached. Batches take no lock; entries near expiry are recomputed
+    early with the rest of the batch.
+    """
+    local = local and get_tiered_cache_setting("LOCAL_SIZE") > 0
+    values = {}
+    if local:
+        for item, key in keys.items():
+            value = get_local_cache().get(key)
+            if value is not None:
+                _count("local_hits")
+                values[item] = value
+
+    remaining = {item: key for item, key in keys.items() if item not in values}
+    found = cache.get_many(list(remaining.values())) if remaining else {}
+    missing = []
+    for item, key in remaining.items():
+        envelope = found.get(key)
+        if envelope is None or _stale(envelope):
+            _count("misses" if envelope is None else "early_recomputes")
+            missing.append(item)
+            continue
+        _count("shared_hits")
+        values[item] = envelope[0]
+        if local:
+            get_local_cache().set(key, envelope[0])
+
+    if missing:
+        started = time.time()
+        computed = compute(missing)
+        values.update(computed)
+        if cacheable is None or cacheable(computed):
+            cache.set_many({keys[item]: _envelope(value, started, timeout) for item, value in computed.items()}, timeout)
+            if local:
+                for item, value in computed.items():
+                    get_local_cache().set(keys[item], value)
+    return values
+
+
+def clear_farm(farm_id):
+    """Drop every key in a farm's namespace from this process and the shared cache."""
+    get_local_cache().delete_prefix(farm_key(farm_id, ""))
+    # Only django-redis can delete by pattern; elsewhere the entries simply expire
+    delete_pattern = getattr(cache, "delete_pattern", None)
+    if delete_pattern is not None:
+        delete_pattern(farm_key(farm_id, "*"))
+
+
+def on_farm_delete(sender, instance, **kwargs):
+    clear_farm(instance.pk)
+
+
+def connect_signals():
+    """Clear a deleted farm's cache namespace."""
+    from django.apps import apps
+    from django.db.models.signals import post_delete
+
+    post_delete.connect(on_farm_delete, sender=apps.get_model("farm.Farm"), dispatch_uid="tiered_cache_farm_delete")
@@ -0,0 +1,490 @@
+"""
+Koimeret Dairies - Synthetic Data Generator
+
+Builds deterministic, production-scale farm data for load testing and
+benchmarks. Rows are generated in memory and written in batches with
+bulk_create (COPY on PostgreSQL for the high-volume tables), so no per-row
+signals fire. Derived data - inventory balances and movements, daily milk,
+feed and profit rollups - is computed alongside, so the dataset is
+consistent with what the signals would have produced.
+"""
+import math
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+# name, category, unit, cost per unit, reorder level, daily usage per milking cow
+FEED_ITEMS = [
+    ("Dairy Meal", "concentrate", "kg", "70.00", 500, 4.0),
+    ("Hay Bales", "roughage", "bales", "350.00", 50, 0.15),
+    ("Silage", "roughage", "kg", "8.00", 1000, 8.0),
+    ("Napier Grass", "roughage", "kg", "3.00", 500, 10.0),
+    ("Mineral Lick", "mineral", "kg", "120.00", 20, 0.08),
+    ("Molasses", "supplement", "liters", "40.00", 50, 0.25),
+]
+
+# name, type, price per liter range
+BUYERS = [
+    ("Brookside Dairy", "dairy_collection_center", (48, 52)),
+    ("New KCC", "dairy_collection_center", (47, 51)),
+    ("Kapsabet Creameries", "regular", (52, 58)),
+    ("Walk-in Customers", "walk_in", (58, 65)),
+]
+
+TASKS = [
+    ("Morning Milking", time(5, 30)),
+    ("Feed Cows - Morning", time(7, 0)),
+    ("Clean Milking Area", time(9, 0)),
+    ("Evening Milking", time(17, 0)),
+    ("Check Water Troughs", time(18, 0)),
+]
+
+LACTATION_DAYS = 305
+CALVING_INTERVAL = 365
+
+# Tables large enough to be written with COPY on PostgreSQL
+COPY_MODELS = {"dairy.MilkLog", "feeds.InventoryMovement", "tasks.TaskInstance"}
+
+
+def _lactation_shape(dim):
+    """Relative daily yield by day in milk (peaks at 1.0 around day 60)."""
+    t = dim / 60
+    return t ** 0.25 * math.exp(0.25 * (1 - t))
+
+
+LACTATION_SHAPE = [0.0] + [_lactation_shape(dim) for dim in range(1, LACTATION_DAYS + 1)]
+
+# Dry season dips, long and short rains lift yields
+SEASONAL_FACTOR = {1: 0.85, 2: 0.85, 3: 0.9, 4: 1.1, 5: 1.1, 10: 1.05, 11: 1.1}
+
+
+def _money(value):
+    return Decimal(f"{value:.2f}")
+
+
+def _liters(value):
+    return Decimal(f"{value:.1f}")
+
+
+class RowWriter:
+    """
+    Buffers rows for one model and writes them in batches.
+    Rows are tuples matching `columns` (field attnames).
+    """
+
+    def __init__(self, model, columns, batch_size, use_copy):
+        self.model = model
+        self.columns = columns
+        self.batch_size = batch_size
+        self.use_copy = use_copy and model._meta.label in COPY_MODELS
+        self.rows = []
+        self.written = 0
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self._copy(self.rows)
+        else:
+            self.model.objects.bulk_create(
+                [self.model(**dict(zip(self.columns, row))) for row in self.rows],
+                batch_size=self.batch_size,
+            )
+        self.written += len(self.rows)
+        self.rows = []
+
+    def _copy(self, rows):
+        quote = connection.ops.quote_name
+        sql = "COPY {} ({}) FROM STDIN".format(
+            quote(self.model._meta.db_table),
+            ", ".join(quote(column) for column in self.columns),
+        )
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+
+class DataGenerator:
+    """
+    Generate `farms` farms of `cows_per_farm` cows with `days` days of history
+    ending today. The same seed always produces the same data.
+    """
+
+    def __init__(self, farms=1, cows_per_farm=100, days=365, seed=0, batch_size=5000,
+                 use_copy=True, end_date=None, log=None):
+        self.farms = farms
+        self.cows_per_farm = cows_per_farm
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.end_date = end_date or date.today()
+        self.start_date = self.end_date - timedelta(days=days - 1)
+        self.log = log or (lambda message: None)
+        self.tz = timezone.get_current_timezone()
+        self.counts = {}
+
+    def run(self):
+        """Generate everything. Returns the generated farms."""
+        from apps.farm.models import Farm, FarmMembership, Role, User
+
+        owner, _ = User.objects.get_or_create(
+            phone="0799000000",
+            defaults={"full_name": "Load Test Owner"},
+        )
+        owner_role, _ = Role.objects.get_or_create(name="owner")
+
+        farms = []
+        for index in range(self.farms):
+            rng = random.Random(self.seed * 100003 + index)
+            with transaction.atomic():
+                farm = Farm.objects.create(name=f"Load Test Farm {index + 1}", owner=owner)
+                FarmMembership.objects.create(user=owner, farm=farm, role=owner_role)
+                self._generate_farm(farm, owner, rng)
+            farms.append(farm)
+            self.log(f"  {farm.name}: done")
+
+        owner.active_farm = farms[0] if farms else None
+        owner.save(update_fields=["active_farm"])
+
+        self._refresh_rollups([farm.id for farm in farms])
+        return farms
+
+    def _count(self, label, number):
+        self.counts[label] = self.counts.get(label, 0) + number
+
+    def _at(self, day, clock):
+        return datetime.combine(day, clock, tzinfo=self.tz)
+
+    def _dates(self):
+        return [self.start_date + timedelta(days=offset) for offset in range(self.days)]
+
+    def _writer(self, model, columns):
+        return RowWriter(model, columns, self.batch_size, self.use_copy)
+
+    def _generate_farm(self, farm, owner, rng):
+        cows = self._create_cows(farm, rng)
+        daily_milk = self._generate_milk(farm, owner, cows, rng)
+        milking_counts = self._milking_counts(cows)
+        self._generate_feed(farm, owner, milking_counts, rng)
+        self._generate_sales(farm, owner, daily_milk, rng)
+        self._generate_treatments(farm, owner, cows, rng)
+        self._generate_tasks(farm, rng)
+
+    def _create_cows(self, farm, rng):
+        from apps.dairy.models import Cow
+
+        cows = []
+        profiles = []
+        for number in range(1, self.cows_per_farm + 1):
+            heifer = rng.random() < 0.1
+            # Position in the calving cycle on the first generated day
+            offset = rng.randrange(CALVING_INTERVAL)
+            peak = rng.uniform(14, 32)
+            end_position = (offset + self.days - 1) % CALVING_INTERVAL
+            if heifer:
+                status = "heifer"
+            elif end_position < LACTATION_DAYS:
+                status = "milking"
+            else:
+                status = "dry"
+
+            purchased = not heifer and rng.random() < 0.3
+            cows.append(Cow(
+                farm=farm,
+                tag_number=f"LT{number:05d}",
+                name=f"Cow {number}",
+                breed=rng.choice(["Friesian", "Ayrshire", "Jersey", "Guernsey"]),
+                date_of_birth=self.start_date - timedelta(days=rng.randrange(700, 3000)),
+                purchase_date=self.start_date + timedelta(days=rng.randrange(self.days)) if purchased else None,
+                purchase_price=_money(rng.uniform(80000, 180000)) if purchased else None,
+                status=status,
+            ))
+            profiles.append((heifer, offset, peak))
+
+        Cow.objects.bulk_create(cows, batch_size=self.batch_size)
+        self._count("cows", len(cows))
+        return [(cow, *profile) for cow, profile in zip(cows, profiles)]
+
+    def _milking_counts(self, cows):
+        counts = []
+        for day_index in range(self.days):
+            counts.append(sum(
+                1 for _, heifer, offset, _ in cows
+                if not heifer and (offset + day_index) % CALVING_INTERVAL < LACTATION_DAYS
+            ))
+        return counts
+
+    def _generate_milk(self, farm, owner, cows, rng):
+        from apps.dairy.models import MilkLog
+
+        columns = (
+            "farm_id", "cow_id", "date", "session", "liters", "milked_by_id", "notes",
+            "sync_status", "device_id", "local_id", "revision", "is_latest",
+            "created_at", "updated_at",
+        )
+        writer = self._writer(MilkLog, columns)
+        daily_milk = []
+
+        for day_index, day in enumerate(self._dates()):
+            seasonal = SEASONAL_FACTOR.get(day.month, 1.0)
+            morning_at = self._at(day, time(6, 30))
+            evening_at = self._at(day, time(17, 30))
+            total = Decimal("0")
+            for cow, heifer, offset, peak in cows:
+                if heifer:
+                    continue
+                position = (offset + day_index) % CALVING_INTERVAL
+                if position >= LACTATION_DAYS:
+                    continue
+                liters = peak * LACTATION_SHAPE[position + 1] * seasonal * rng.uniform(0.9, 1.1)
+                morning = _liters(liters * rng.uniform(0.52, 0.6))
+                evening = _liters(liters) - morning
+                total += morning + evening
+                writer.add((farm.id, cow.id, day, "morning", morning, owner.id, "",
+                            "synced", "", "", 1, True, morning_at, morning_at))
+                writer.add((farm.id, cow.id, day, "evening", evening, owner.id, "",
+                            "synced", "", "", 1, True, evening_at, evening_at))
+            daily_milk.append(total)
+
+        writer.flush()
+        self._count("milk_logs", writer.written)
+        return daily_milk
+
+    def _generate_feed(self, farm, owner, milking_counts, rng):
+        from apps.feeds.models import FeedItem, FeedPurchase, FeedUsageLog, InventoryBalance, InventoryMovement
+
+        items = FeedItem.objects.bulk_create([
+            FeedItem(
+                farm=farm,
+                name=name,
+                category=category,
+                unit=unit,
+                qr_code=f"LT{farm.id}-{number}",
+                cost_per_unit=Decimal(cost),
+                reorder_level=Decimal(reorder),
+            )
+            for number, (name, category, unit, cost, reorder, _) in enumerate(FEED_ITEMS, 1)
+        ])
+        per_cow = {item.id: spec[5] for item, spec in zip(items, FEED_ITEMS)}
+
+        # Build purchases and usage first; movements need their ids
+        purchases = []
+        usage = []
+        dates = self._dates()
+        for day_index, day in enumerate(dates):
+            restock = day_index == 0 or day.weekday() == 0
+            for item in items:
+                daily = per_cow[item.id] * milking_counts[day_index]
+                if restock:
+                    quantity = _liters(daily * 7 * rng.uniform(1.2, 1.4) + 1)
+                    price = item.cost_per_unit * Decimal(f"{rng.uniform(0.95, 1.05):.3f}")
+                    purchases.append(FeedPurchase(
+                        farm=farm,
+                        feed_item=item,
+                        date=day,
+                        quantity=quantity,
+                        unit=item.unit,
+                        unit_price=_money(price),
+                        total_cost=_money(price * quantity),
+                        supplier=rng.choice(["Unga Feeds Ltd", "Pembe Flour Mills", "Local Supplier"]),
+                        recorded_by=owner,
+                        sync_status="synced",
+                    ))
+                if daily:
+                    usage.append(FeedUsageLog(
+                        farm=farm,
+                        feed_item=item,
+                        date=day,
+                        quantity=_liters(daily * rng.uniform(0.9, 1.1) + 0.1),
+                        unit=item.unit,
+                        logged_by=owner,
+                        sync_status="synced",
+                    ))
+
+        FeedPurchase.objects.bulk_create(purchases, batch_size=self.batch_size)
+        FeedUsageLog.objects.bulk_create(usage, batch_size=self.batch_size)
+        self._count("feed_purchases", len(purchases))
+        self._count("feed_usage_logs", len(usage))
+
+        # Replay purchases then usage per day, as the inventory signals would
+        columns = (
+            "farm_id", "feed_item_id", "date", "movement_type", "quantity", "unit",
+            "balance_before", "balance_after", "source_type", "source_id",
+            "recorded_by_id", "notes", "created_at", "updated_at",
+        )
+        writer = self._writer(InventoryMovement, columns)
+        events = sorted(
+            [(p.date, 0, p) for p in purchases] + [(u.date, 1, u) for u in usage],
+            key=lambda event: (event[0], event[1]),
+        )
+        balances = {item.id: Decimal("0") for item in items}
+        restocked = {}
+        used = {}
+        for day, kind, record in events:
+            before = balances[record.feed_item_id]
+            if kind == 0:
+                after = before + record.quantity
+                movement_type, source_type, quantity = "purchase_in", "FeedPurchase", record.quantity
+                restocked[record.feed_item_id] = self._at(day, time(10, 0))
+            else:
+                after = before - record.quantity
+                movement_type, source_type, quantity = "usage_out", "FeedUsageLog", -record.quantity
+                used[record.feed_item_id] = self._at(day, time(16, 0))
+            balances[record.feed_item_id] = after
+            stamp = self._at(day, time(10, 0) if kind == 0 else time(16, 0))
+            writer.add((farm.id, record.feed_item_id, day, movement_type, quantity, record.unit,
+                        before, after, source_type, record.id, owner.id, "", stamp, stamp))
+        writer.flush()
+        self._count("inventory_movements", writer.written)
+
+        InventoryBalance.objects.bulk_create([
+            InventoryBalance(
+                farm=farm,
+                feed_item=item,
+                quantity_on_hand=balances[item.id],
+                unit=item.unit,
+                last_restocked_at=restocked.get(item.id),
+                last_usage_at=used.get(item.id),
+            )
+            for item in items
+        ])
+
+    def _generate_sales(self, farm, owner, daily_milk, rng):
+        from apps.sales.models import Buyer, Payment, Sale
+
+        buyers = Buyer.objects.bulk_create([
+            Buyer(farm=farm, name=name, buyer_type=buyer_type, credit_limit=Decimal("100000"))
+            for name, buyer_type, _ in BUYERS
+        ])
+        price_ranges = [spec[2] for spec in BUYERS]
+        channels = {
+            "dairy_collection_center": "dairy_collection_center",
+            "regular": "regular_customer",
+            "walk_in": "walk_in",
+        }
+
+        sales = []
+        for day, produced in zip(self._dates(), daily_milk):
+            remaining = produced * Decimal(f"{rng.uniform(0.9, 0.97):.3f}")
+            if remaining <= 0:
+                continue
+            chosen = rng.sample(range(len(buyers)), rng.randint(1, 3))
+            for position, buyer_index in enumerate(chosen):
+                if position == len(chosen) - 1:
+                    liters = _liters(remaining)
+                else:
+                    liters = _liters(remaining * Decimal(f"{rng.uniform(0.3, 0.6):.3f}"))
+                remaining -= liters
+                if liters <= 0:
+                    continue
+                price = _money(rng.uniform(*price_ranges[buyer_index]))
+                buyer = buyers[buyer_index]
+                sales.append(Sale(
+                    farm=farm,
+                    buyer=buyer,
+                    date=day,
+                    channel=channels[buyer.buyer_type],
+                    liters_sold=liters,
+                    price_per_liter=price,
+                    total_amount=_money(liters * price),
+                    payment_method="credit" if buyer.buyer_type == "dairy_collection_center" else "mpesa",
+                    paid_status="paid" if rng.random() < 0.85 else "unpaid",
+                    recorded_by=owner,
+                    sync_status="synced",
+                ))
+
+        Sale.objects.bulk_create(sales, batch_size=self.batch_size)
+        payments = [
+            Payment(
+                farm=farm,
+                sale=sale,
+                date=sale.date,
+                method="mpesa",
+                amount=sale.total_amount,
+                recorded_by=owner,
+                sync_status="synced",
+            )
+            for sale in sales
+            if sale.paid_status == "paid"
+        ]
+        Payment.objects.bulk_create(payments, batch_size=self.batch_size)
+        self._count("sales", len(sales))
+        self._count("payments", len(payments))
+
+    def _generate_treatments(self, farm, owner, cows, rng):
+        from apps.health.models import Treatment
+
+        treatments = []
+        for day in self._dates():
+            for _ in range(self._poisson(rng, len(cows) * 0.002)):
+                cow = rng.choice(cows)[0]
+                treatments.append(Treatment(
+                    farm=farm,
+                    cow=cow,
+                    date=day,
+                    treatment_name=rng.choice(["Penicillin injection", "Hoof trimming", "Deworming", "Eye ointment"]),
+                    administered_by=owner,
+                    cost=_money(rng.uniform(500, 3000)),
+                    sync_status="synced",
+                ))
+        Treatment.objects.bulk_create(treatments, batch_size=self.batch_size)
+        self._count("treatments", len(treatments))
+
+    @staticmethod
+    def _poisson(rng, mean):
+        # Knuth's method; means here are small
+        limit = math.exp(-mean)
+        count, product = 0, rng.random()
+        while product > limit:
+            count += 1
+            product *= rng.random()
+        return count
+
+    def _generate_tasks(self, farm, rng):
+        from apps.tasks.models import TaskInstance, TaskTemplate
+
+        templates = TaskTemplate.objects.bulk_create([
+            TaskTemplate(farm=farm, name=name, category="daily", default_time=due, order=order)
+            for order, (name, due) in enumerate(TASKS)
+        ])
+
+        columns = (
+            "farm_id", "template_id", "name", "description", "task_date", "due_time",
+            "status", "priority", "sync_status", "device_id", "local_id", "created_at", "updated_at",
+        )
+        writer = self._writer(TaskInstance, columns)
+        for day in self._dates():
+            created = self._at(day, time(0, 5))
+            for template in templates:
+                if day == self.end_date:
+                    status = "pending"
+                elif rng.random() < 0.03:
+                    status = "pending"  # overdue
+                else:
+                    status = "done" if rng.random() < 0.92 else "skipped"
+                writer.add((farm.id, template.id, template.name, "", day, template.default_time,
+                            status, "normal", "synced", "", "", created, created))
+        writer.flush()
+        self._count("task_instances", writer.written)
+
+    def _refresh_rollups(self, farm_ids):
+        from apps.feeds.efficiency import refresh_rollups
+        from apps.sales.profitability import rebuild
+
+        from .versions import bump, farm_scoped_labels
+
+        refresh_rollups(self.start_date, self.end_date, farm_ids)
+        rebuild(farm_ids=farm_ids)
+        # COPY bypasses the ORM, so no version was bumped while writing
+        for farm_id in farm_ids:
+            bump(farm_id, farm_scoped_labels())
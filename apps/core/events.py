@@ -0,0 +1,316 @@
+"""
+Koimeret Dairies - Change Event Stream
+
+A transactional outbox for downstream consumers (analytics, SMS, the data
+warehouse). Every write to a farm-scoped model appends a compact
+OutboxEvent row in the same database transaction: saves and deletes
+through model signals, and bulk_create, bulk_update, update() and delete()
+of FarmScopedQuerySet directly. Events raised inside a `batched()` block,
+which FarmScopedModel.save() and delete() and the bulk operations open, are
+inserted together with one query when the block ends. A cascading delete
+or a bulk write therefore costs one extra INSERT, not one per row. Nothing
+on the request path talks to Redis.
+
+The relay (manage.py relayevents) publishes pending events in id order to
+a Redis Stream and marks them published. A crash between the two
+publishes a batch again, so delivery is at-least-once and every entry
+carries its event_id for consumers to drop duplicates. Consumers read
+through Redis consumer groups (StreamConsumer): the group keeps each
+consumer's offset, and an entry stays pending until it is acknowledged.
+Published rows are pruned after RETENTION_HOURS.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.expressions import Combinable
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger("smartdairy.events")
+
+DEFAULTS = {
+    "ENABLED": True,
+    "URL": None,
+    "STREAM": "smartdairy:events",
+    # Approximate stream length kept in Redis; consumers further behind lose entries
+    "MAXLEN": 100_000,
+    "BATCH_SIZE": 500,
+    "POLL_INTERVAL": 1.0,
+    "RETENTION_HOURS": 72,
+    "EXCLUDE": [],
+}
+
+# Field types left out of event data to keep events compact
+SKIPPED_FIELDS = (models.TextField, models.JSONField, models.BinaryField, models.FileField)
+
+
+def get_event_setting(name):
+    return getattr(settings, "EVENT_STREAM", {}).get(name, DEFAULTS[name])
+
+
+def emits_events(model):
+    if not get_event_setting("ENABLED"):
+        return False
+    from .models import FarmScopedModel
+    return issubclass(model, FarmScopedModel) and model._meta.label not in get_event_setting("EXCLUDE")
+
+
+def _data(instance, fields=None):
+    data = {}
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, SKIPPED_FIELDS) or (fields is not None and field.name not in fields):
+            continue
+        data[field.attname] = field.value_from_object(instance)
+    return data
+
+
+def _event(model, farm_id, pk, action, data):
+    from .models import OutboxEvent
+
+    return OutboxEvent(
+        farm_id=farm_id, label=model._meta.label, object_id=str(pk), action=action, data=data,
+    )
+
+
+# Events waiting for the outermost batched() block to end
+_buffer = threading.local()
+
+
+@contextmanager
+def batched(using=DEFAULT_DB_ALIAS):
+    """
+    Run a block in a transaction and insert the events it raises with one
+    query at its end. Nested blocks join the outermost one.
+    """
+    from .models import OutboxEvent
+
+    if not get_event_setting("ENABLED"):
+        yield
+        return
+    outermost = getattr(_buffer, "events", None) is None
+    if outermost:
+        _buffer.events = []
+    try:
+        with transaction.atomic(using=using, savepoint=False):
+            yield
+            if outermost and _buffer.events:
+                OutboxEvent.objects.using(using).bulk_create(_buffer.events, batch_size=1000)
+    finally:
+        if outermost:
+            _buffer.events = None
+
+
+def append(events, using=DEFAULT_DB_ALIAS):
+    from .models import OutboxEvent
+
+    buffered = getattr(_buffer, "events", None)
+    if buffered is not None:
+        buffered.extend(events)
+    elif events:
+        OutboxEvent.objects.using(using).bulk_create(events, batch_size=1000)
+
+
+def record_bulk(model, objs, action, fields=None, using=DEFAULT_DB_ALIAS):
+    """Events for rows written by bulk_create or bulk_update."""
+    if emits_events(model):
+        # Rows bulk_create(ignore_conflicts=True) may have skipped come back without a pk
+        append([_event(model, obj.farm_id, obj.pk, action, _data(obj, fields)) for obj in objs if obj.pk is not None], using)
+
+
+def record_update(model, rows, values, using=DEFAULT_DB_ALIAS):
+    """Events for queryset.update(): `rows` are (pk, farm_id) pairs, `values` its keyword arguments."""
+    if not emits_events(model):
+        return
+    data = {}
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if isinstance(field, SKIPPED_FIELDS):
+            continue
+        # Expressions (F() + 1 and the like) are named without a value
+        data[field.attname] = None if isinstance(value, Combinable) else field.get_prep_value(
+            getattr(value, "pk", value)
+        )
+    append([_event(model, farm_id, pk, "updated", data) for pk, farm_id in rows], using)
+
+
+def on_save(sender, instance, created=False, raw=False, update_fields=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    if raw or not instance.farm_id:
+        return
+    action = "created" if created else "updated"
+    append([_event(sender, instance.farm_id, instance.pk, action, _data(instance, update_fields))], using)
+
+
+def on_delete(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if instance.farm_id:
+        append([_event(sender, instance.farm_id, instance.pk, "deleted", {})], using)
+
+
+def connect_signals():
+    """Append an outbox event for every save and delete of a farm-scoped model."""
+    from django.apps import apps
+
+    from .versions import farm_scoped_labels
+
+    for label in farm_scoped_labels():
+        model = apps.get_model(label)
+        if emits_events(model):
+            post_save.connect(on_save, sender=model, dispatch_uid=f"outbox_save_{label}")
+            post_delete.connect(on_delete, sender=model, dispatch_uid=f"outbox_delete_{label}")
+
+
+_client = None
+
+
+def get_client():
+    """Redis client for the stream (in-process fakeredis when no URL is set)."""
+    global _client
+    if _client is None:
+        url = get_event_setting("URL")
+        if url:
+            import redis
+            _client = redis.Redis.from_url(url, decode_responses=True)
+        else:
+            import fakeredis
+            _client = fakeredis.FakeRedis(decode_responses=True)
+    return _client
+
+
+def message(event):
+    """The stream entry of an event (Redis stores flat string fields)."""
+    return {
+        "event_id": str(event.pk),
+        "farm_id": str(event.farm_id),
+        "model": event.label,
+        "object_id": event.object_id,
+        "action": event.action,
+        "occurred_at": event.created_at.isoformat(),
+        "data": json.dumps(event.data, cls=DjangoJSONEncoder),
+    }
+
+
+def publish_batch(client=None):
+    """Publish the oldest pending events and mark them published. Returns how many."""
+    from .models import OutboxEvent
+
+    client = client or get_client()
+    with transaction.atomic():
+        # Relays running side by side take different batches
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(published_at__isnull=True).order_by("id")[:get_event_setting("BATCH_SIZE")]
+        )
+        if not events:
+            return 0
+        pipeline = client.pipeline(transaction=False)
+        for event in events:
+            pipeline.xadd(get_event_setting("STREAM"), message(event), maxlen=get_event_setting("MAXLEN"), approximate=True)
+        pipeline.execute()
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(published_at=timezone.now())
+    return len(events)
+
+
+def relay(stop=None, client=None):
+    """Publish events until `stop()` is true, sleeping while there are none."""
+    from django.db import close_old_connections
+
+    while not (stop and stop()):
+        close_old_connections()
+        try:
+            published = publish_batch(client)
+        except Exception:
+            logger.exception("Publishing outbox events failed")
+            published = 0
+        if published < get_event_setting("BATCH_SIZE"):
+            time.sleep(get_event_setting("POLL_INTERVAL"))
+
+
+def prune_events():
+    """Delete published events past the retention window. Returns rows deleted."""
+    from .models import OutboxEvent
+
+    cutoff = timezone.now() - timedelta(hours=get_event_setting("RETENTION_HOURS"))
+    deleted, _ = OutboxEvent.objects.filter(published_at__lt=cutoff).delete()
+    return deleted
+
+
+def pending_count():
+    from .models import OutboxEvent
+
+    return OutboxEvent.objects.filter(published_at__isnull=True).count()
+
+
+class StreamConsumer:
+    """
+    One consumer in a Redis consumer group. `read()` returns the consumer's
+    unacknowledged entries first (left over from a crash), then new ones;
+    `ack()` moves the group's offset past them.
+    """
+
+    def __init__(self, group, name, stream=None, client=None, start="0"):
+        self.group = group
+        self.name = name
+        self.stream = stream or get_event_setting("STREAM")
+        self.client = client or get_client()
+        # Position in this consumer's pending entries; None once they are all read
+        self.backlog = "0"
+        self._create_group(start)
+
+    def _create_group(self, start):
+        import redis
+
+        try:
+            # start="$" skips everything already in the stream
+            self.client.xgroup_create(self.stream, self.group, id=start, mkstream=True)
+        except redis.ResponseError as error:
+            if "BUSYGROUP" not in str(error):
+                raise
+
+    def read(self, count=100, block=5000):
+        """[(entry_id, event)], with the event's data decoded."""
+        backlog = self.backlog is not None
+        entries = self.client.xreadgroup(
+            self.group, self.name, {self.stream: self.backlog if backlog else ">"},
+            count=count, block=None if backlog else block,
+        )
+        entries = entries[0][1] if entries else []
+        if backlog:
+            if not entries:
+                self.backlog = None
+                return self.read(count, block)
+            self.backlog = entries[-1][0]
+        # Pending entries trimmed from the stream (MAXLEN) come back without fields
+        self.ack([entry_id for entry_id, fields in entries if fields is None])
+        return [
+            (entry_id, {**fields, "data": json.loads(fields["data"])})
+            for entry_id, fields in entries if fields is not None
+        ]
+
+    def ack(self, entry_ids):
+        if entry_ids:
+            self.client.xack(self.stream, self.group, *entry_ids)
+
+    def claim_stale(self, min_idle_ms=60_000, count=100):
+        """Take over entries another consumer read but never acknowledged. Returns how many."""
+        _, claimed, *_ = self.client.xautoclaim(self.stream, self.group, self.name, min_idle_ms, count=count)
+        if claimed:
+            self.backlog = "0"
+        return len(claimed)
+
+    def run(self, handler, stop=None, count=100):
+        """Call `handler(event)` for each entry and acknowledge the ones it handled."""
+        while not (stop and stop()):
+            handled = []
+            try:
+                for entry_id, event in self.read(count):
+                    handler(event)
+                    handled.append(entry_id)
+            finally:
+                # Entries after a failure stay pending and are read again after a restart
+                self.ack(handled)
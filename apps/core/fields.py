@@ -0,0 +1,25 @@
+"""
+Koimeret Dairies - Shared Serializer Fields
+
+Kept apart from the modules they read from, which are loaded with the app
+registry by every process (Celery workers included), so that only the API
+imports DRF serializers.
+"""
+from rest_framework import serializers
+
+from .images import variant_urls
+
+
+class ImageVariantsField(serializers.Field):
+    """Read-only URLs of an image and its size variants (absolute when a request is in context)."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        urls = variant_urls(value)
+        request = self.context.get("request")
+        if urls and request is not None:
+            urls = {key: request.build_absolute_uri(url) for key, url in urls.items()}
+        return urls
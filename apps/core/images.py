@@ -0,0 +1,219 @@
+"""
+Koimeret Dairies - Image Variants
+
+Uploaded photos (cows, health events, feed receipts, task proofs) are stored
+as sent and processed off the request by a Celery task. The original is
+rewritten without EXIF metadata (after applying its orientation), and WebP
+size variants are written next to it under `variants/`. Variant names are
+derived from the original's name, so processing is idempotent and the
+`processimages` command can backfill existing media at any time.
+
+Serializers expose the variants with ImageVariantsField (apps.core.fields);
+until an image has been processed every variant URL points at the original.
+Whether it has is kept in a `<field>_processed` flag on the row, so
+serializing needs no storage lookup. Setting the flag bumps the row's
+version (apps.core.versions), so cached responses pick up the variants.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .versions import mark_instance_changed
+
+logger = logging.getLogger("smartdairy.images")
+
+DEFAULTS = {
+    "ENABLED": True,
+    # name -> longest side in pixels, largest first (the last one marks an image as processed)
+    "VARIANTS": {"medium": 800, "thumbnail": 200},
+    "QUALITY": 80,
+}
+
+# Image fields processed into variants: (model label, field name)
+IMAGE_FIELDS = [
+    ("dairy.Cow", "photo"),
+    ("feeds.FeedPurchase", "receipt_image"),
+    ("health.HealthEvent", "photo"),
+    ("tasks.TaskCompletion", "photo"),
+]
+
+
+def get_image_setting(name):
+    return getattr(settings, "IMAGE_VARIANTS", {}).get(name, DEFAULTS[name])
+
+
+def variant_name(name, variant):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, "variants", f"{stem}_{variant}.webp")
+
+
+def variant_names(name):
+    return {variant: variant_name(name, variant) for variant in get_image_setting("VARIANTS")}
+
+
+def processed_flag(field):
+    return f"{field}_processed"
+
+
+def is_processed(fieldfile):
+    """Whether the variants exist in storage (the flag on the row says so without a lookup)."""
+    last = list(get_image_setting("VARIANTS"))[-1]
+    return fieldfile.storage.exists(variant_name(fieldfile.name, last))
+
+
+def set_processed(instance, field, processed):
+    """Store the flag for the row's current file and bump the version of the responses showing it."""
+    flag = processed_flag(field)
+    setattr(instance, flag, processed)
+    # Not save(): that would run the model's signals and audit an internal change
+    rows = type(instance)._base_manager.filter(pk=instance.pk, **{field: getattr(instance, field).name})
+    if rows.update(**{flag: processed}):
+        mark_instance_changed(instance)
+
+
+def variant_urls(fieldfile):
+    """{"original": url, <variant>: url, ...}; variants fall back to the original until processed."""
+    if not fieldfile:
+        return None
+    original = fieldfile.url
+    urls = {"original": original}
+    processed = getattr(fieldfile.instance, processed_flag(fieldfile.field.name), False)
+    for variant, name in variant_names(fieldfile.name).items():
+        urls[variant] = fieldfile.storage.url(name) if processed else original
+    return urls
+
+
+def _encode(image, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def _webp_mode(image):
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    has_alpha = image.mode in ("LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def process(fieldfile, force=False):
+    """
+    Strip EXIF from an image and write its variants. Returns the names
+    written (empty when there was nothing to do).
+    """
+    from PIL import Image, ImageOps
+
+    storage = fieldfile.storage
+    name = fieldfile.name
+    if not force and is_processed(fieldfile):
+        return []
+
+    with storage.open(name, "rb") as handle:
+        image = Image.open(handle)
+        image.load()
+    source_format = image.format
+    exif = image.getexif()
+    written = []
+
+    if exif:
+        upright = ImageOps.exif_transpose(image)
+        options = {"quality": 90, "optimize": True} if source_format == "JPEG" else {}
+        if source_format == "JPEG" and upright.mode not in ("RGB", "L", "CMYK"):
+            upright = upright.convert("RGB")
+        data = _encode(upright, source_format, **options)
+        # Same name, so rows and URLs pointing at the original stay valid
+        storage.delete(name)
+        saved = storage.save(name, ContentFile(data))
+        if saved != name:
+            logger.warning("Re-saved %s as %s; the original name was taken", name, saved)
+        written.append(saved)
+        image = upright
+
+    image = _webp_mode(image)
+    quality = get_image_setting("QUALITY")
+    for variant, size in get_image_setting("VARIANTS").items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        target = variant_name(name, variant)
+        if storage.exists(target):
+            storage.delete(target)
+        written.append(storage.save(target, ContentFile(_encode(resized, "WEBP", quality=quality, method=4))))
+    return written
+
+
+def process_instance(label, pk, field, force=False):
+    """Process one stored image by model label, primary key and field name."""
+    from PIL import Image
+
+    model = apps.get_model(label)
+    instance = model._base_manager.filter(pk=pk).first()
+    if instance is None:
+        return []
+    fieldfile = getattr(instance, field)
+    if not fieldfile:
+        return []
+    try:
+        written = process(fieldfile, force=force)
+        if not getattr(instance, processed_flag(field)):
+            set_processed(instance, field, True)
+        return written
+    except FileNotFoundError:
+        logger.warning("Image %s of %s %s is missing from storage", fieldfile.name, label, pk)
+    except (OSError, Image.DecompressionBombError):
+        # Pillow raises OSError subclasses for formats it cannot read
+        logger.warning("Could not process image %s of %s %s", fieldfile.name, label, pk, exc_info=True)
+    return []
+
+
+def enqueue(label, pk, field):
+    from .tasks import process_image
+
+    try:
+        process_image.delay(label, pk, field)
+    except Exception:
+        # A broker outage must not fail the upload; processimages picks it up later
+        logger.warning("Could not queue image processing for %s %s", label, pk, exc_info=True)
+
+
+def delete_variants(storage, name):
+    for variant in variant_names(name).values():
+        if storage.exists(variant):
+            storage.delete(variant)
+
+
+def on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not get_image_setting("ENABLED"):
+        return
+    for label, field in IMAGE_FIELDS:
+        if label != sender._meta.label or (update_fields is not None and field not in update_fields):
+            continue
+        fieldfile = getattr(instance, field)
+        processed = bool(fieldfile) and is_processed(fieldfile)
+        if getattr(instance, processed_flag(field)) != processed:
+            # A new file (or a backfilled one) was saved over the flag of the previous one
+            set_processed(instance, field, processed)
+        if fieldfile and not processed:
+            transaction.on_commit(lambda pk=instance.pk, label=label, field=field: enqueue(label, pk, field))
+
+
+def on_file_deleted(sender, file=None, file_name=None, success=False, **kwargs):
+    # django-cleanup removed a replaced or deleted original; its variants go with it
+    if success and file is not None and file_name:
+        delete_variants(file.storage, file_name)
+
+
+def connect_signals():
+    """Queue processing for new uploads and remove variants with their originals."""
+    from django_cleanup.signals import cleanup_post_delete
+
+    for label, _ in IMAGE_FIELDS:
+        post_save.connect(on_save, sender=apps.get_model(label), dispatch_uid=f"image_variants_save_{label}")
+    cleanup_post_delete.connect(on_file_deleted, dispatch_uid="image_variants_cleanup")
+
@@ -0,0 +1,288 @@
+"""
+Koimeret Dairies - QR Label Sheets
+
+Printable sheets of QR code labels for a farm's feed items (the codes
+scanned by apps.feeds.scans) and, optionally, cow tags. Sheets are rendered
+by a Celery task, never on a web worker:
+
+- The labels are collected and hashed together with the format and layout.
+  A sheet with the same hash is already in storage when nothing changed
+  since the last run, so it is reused without rendering anything.
+- QR tiles are rendered and cached by the hash of their payload and size,
+  so a re-label run only renders codes that are new.
+- Tiles are composed onto A4 pages (a 3 x 7 grid at 300 dpi by default) and
+  saved as a PDF, or as a zip of PNG pages.
+
+Celery's prefork workers are daemonic processes, which may not start
+children, so the task renders in-process. A process pool is only used
+where one can be started: the generatelabels command, or workers running
+a threads or solo pool.
+
+Feed items without a QR code are given one (FEED-<farm>-<id>) first.
+"""
+import hashlib
+import io
+import json
+import logging
+import math
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger("smartdairy.labels")
+
+DEFAULTS = {
+    "PROCESSES": 4,
+    "DPI": 300,
+    # A4 portrait at DPI
+    "PAGE_SIZE": (2480, 3508),
+    "COLUMNS": 3,
+    "ROWS": 7,
+}
+
+# Rendered tiles are kept this long in the cache
+TILE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Below this many tiles per process a pool costs more than it saves
+TILES_PER_PROCESS = 50
+
+
+def get_label_setting(name):
+    return getattr(settings, "LABEL_SHEETS", {}).get(name, DEFAULTS[name])
+
+
+def layout():
+    """Page geometry in pixels, derived from the settings."""
+    dpi = get_label_setting("DPI")
+    width, height = get_label_setting("PAGE_SIZE")
+    columns, rows = get_label_setting("COLUMNS"), get_label_setting("ROWS")
+    margin = dpi * 2 // 5
+    cell = ((width - 2 * margin) // columns, (height - 2 * margin) // rows)
+    padding = dpi // 20
+    title_size, code_size = dpi // 8, dpi // 11
+    text_height = title_size + code_size + 3 * padding
+    qr_size = min(cell[0], cell[1] - text_height) - 2 * padding
+    return {
+        "dpi": dpi, "page": (width, height), "columns": columns, "rows": rows, "margin": margin,
+        "cell": cell, "padding": padding, "qr_size": qr_size, "title_size": title_size, "code_size": code_size,
+    }
+
+
+def collect_labels(farm, feed_items=True, cows=False):
+    """[(payload, title), ...] for a farm, assigning codes to feed items without one."""
+    from apps.dairy.models import Cow
+    from apps.feeds.models import FeedItem
+
+    labels = []
+    if feed_items:
+        # farm_id too: bulk_update reads it to bump the FeedItem version
+        items = list(
+            FeedItem.objects.filter(farm=farm, is_active=True).only("pk", "farm_id", "name", "qr_code").order_by("name")
+        )
+        unassigned = [item for item in items if not item.qr_code]
+        for item in unassigned:
+            item.qr_code = f"FEED-{farm.id}-{item.pk}"
+        if unassigned:
+            # Bumps the FeedItem version, so cached QR maps pick the codes up
+            FeedItem.objects.bulk_update(unassigned, ["qr_code"])
+        labels += [(item.qr_code, item.name) for item in items]
+    if cows:
+        rows = Cow.objects.filter(farm=farm, is_active=True).order_by("tag_number").values_list("tag_number", "name")
+        labels += [(f"COW-{tag}", f"{tag} - {name}" if name else tag) for tag, name in rows]
+    return labels
+
+
+def content_hash(labels, format):
+    payload = json.dumps({"format": format, "layout": layout(), "labels": labels}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def sheet_name(farm_id, digest, format):
+    return f"labels/{farm_id}/{digest}.{'pdf' if format == 'pdf' else 'zip'}"
+
+
+def render_tile(payload, size):
+    """PNG bytes of one QR code, `size` pixels square (runs in pool processes)."""
+    import qrcode
+    from PIL import Image
+
+    code = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=10, border=2)
+    code.add_data(payload)
+    code.make(fit=True)
+    image = code.make_image().get_image().convert("1").resize((size, size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _tile_key(payload, size):
+    return "label-tile:" + hashlib.sha256(f"{size}|{payload}".encode()).hexdigest()
+
+
+def pool_map(function, *iterables, count, weight=1):
+    """
+    map() over a process pool sized for `count` items of `weight` tiles'
+    work each, or in-process when a pool is not worth starting or this
+    process may not start one (a daemonic Celery prefork child).
+    """
+    processes = min(
+        get_label_setting("PROCESSES"), os.cpu_count() or 1, count, math.ceil(count * weight / TILES_PER_PROCESS)
+    )
+    if processes > 1 and not multiprocessing.current_process().daemon:
+        try:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                return list(pool.map(function, *iterables, chunksize=max(1, count // (processes * 4))))
+        except (OSError, BrokenProcessPool):
+            logger.warning("Could not render labels in a process pool; rendering in-process", exc_info=True)
+    return list(map(function, *iterables))
+
+
+def render_tiles(payloads, size):
+    """{payload: PNG bytes}, from the cache where possible."""
+    keys = {_tile_key(payload, size): payload for payload in set(payloads)}
+    found = cache.get_many(list(keys))
+    tiles = {keys[key]: data for key, data in found.items()}
+    missing = sorted(payload for payload in keys.values() if payload not in tiles)
+    if missing:
+        rendered = dict(zip(missing, pool_map(render_tile, missing, repeat(size), count=len(missing))))
+        cache.set_many({_tile_key(payload, size): data for payload, data in rendered.items()}, TILE_TIMEOUT)
+        tiles.update(rendered)
+    return tiles
+
+
+def _fit(draw, text, font, width):
+    length = draw.textlength(text, font=font)
+    if length <= width:
+        return text
+    # Cut to the estimated fit, then trim until the ellipsis fits too
+    text = text[:int(len(text) * width / length)]
+    while text and draw.textlength(text + "…", font=font) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def compose_page(labels, tiles, geometry, format):
+    """
+    One bitonal page with `labels` laid out in a grid, as PNG bytes for the
+    png format and raw pixels for the PDF (runs in pool processes).
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    columns = geometry["columns"]
+    cell_width, cell_height = geometry["cell"]
+    padding, qr_size = geometry["padding"], geometry["qr_size"]
+    title_font = ImageFont.load_default(size=geometry["title_size"])
+    code_font = ImageFont.load_default(size=geometry["code_size"])
+
+    page = Image.new("1", geometry["page"], 1)
+    draw = ImageDraw.Draw(page)
+    for position, (payload, title) in enumerate(labels):
+        left = geometry["margin"] + (position % columns) * cell_width
+        top = geometry["margin"] + (position // columns) * cell_height
+        page.paste(Image.open(io.BytesIO(tiles[payload])), (left + (cell_width - qr_size) // 2, top + padding))
+        text_top = top + 2 * padding + qr_size
+        center = left + cell_width // 2
+        width = cell_width - 2 * padding
+        draw.text((center, text_top), _fit(draw, title, title_font, width), font=title_font, fill=0, anchor="ma")
+        draw.text(
+            (center, text_top + geometry["title_size"] + padding),
+            _fit(draw, payload, code_font, width), font=code_font, fill=0, anchor="ma",
+        )
+    if format != "pdf":
+        buffer = io.BytesIO()
+        page.save(buffer, format="PNG", dpi=(geometry["dpi"],) * 2)
+        return buffer.getvalue()
+    return page.tobytes()
+
+
+def compose_pages(labels, tiles, format):
+    """The pages holding `labels` (see compose_page), composed in the process pool."""
+    geometry = layout()
+    per_page = geometry["columns"] * geometry["rows"]
+    chunks = [labels[start:start + per_page] for start in range(0, len(labels), per_page)]
+    page_tiles = [{payload: tiles[payload] for payload, _ in chunk} for chunk in chunks]
+    # Composing a page costs about as much as rendering a pool slot's worth of tiles
+    return pool_map(
+        compose_page, chunks, page_tiles, repeat(geometry), repeat(format),
+        count=len(chunks), weight=TILES_PER_PROCESS,
+    )
+
+
+def encode(pages, format):
+    """The sheet file: a PDF of the raw pages, or a zip of the PNG pages."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    if format == "pdf":
+        geometry = layout()
+        images = [Image.frombytes("1", geometry["page"], data) for data in pages]
+        images[0].save(buffer, format="PDF", save_all=True, append_images=images[1:], resolution=geometry["dpi"])
+    else:
+        # PNG is already compressed
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            for number, data in enumerate(pages, 1):
+                archive.writestr(f"labels-{number:03d}.png", data)
+    return buffer.getvalue()
+
+
+def render(sheet):
+    """Render (or reuse) the sheet's file and mark it complete."""
+    labels = collect_labels(sheet.farm, feed_items=sheet.feed_items, cows=sheet.cows)
+    if not labels:
+        _fail(sheet, "Nothing to label")
+        return sheet
+
+    digest = content_hash(labels, sheet.format)
+    name = sheet_name(sheet.farm_id, digest, sheet.format)
+    if not default_storage.exists(name):
+        tiles = render_tiles([payload for payload, _ in labels], layout()["qr_size"])
+        name = default_storage.save(name, ContentFile(encode(compose_pages(labels, tiles, sheet.format), sheet.format)))
+
+    sheet.content_hash = digest
+    sheet.file.name = name
+    sheet.label_count = len(labels)
+    sheet.status = "complete"
+    sheet.save(update_fields=["content_hash", "file", "label_count", "status", "updated_at"])
+    return sheet
+
+
+def _fail(sheet, error):
+    sheet.status = "failed"
+    sheet.error = error[:255]
+    sheet.save(update_fields=["status", "error", "updated_at"])
+
+
+def render_sheet(sheet_id):
+    """Task body: render a pending sheet, recording failures on it."""
+    from .models import LabelSheet
+
+    updated = LabelSheet.objects.filter(pk=sheet_id, status="pending").update(status="rendering")
+    if not updated:
+        return None
+    sheet = LabelSheet.objects.select_related("farm").get(pk=sheet_id)
+    try:
+        return render(sheet)
+    except Exception:
+        logger.exception("Rendering label sheet %s failed", sheet_id)
+        _fail(sheet, "Rendering failed")
+        return sheet
+
+
+def enqueue(sheet_id):
+    from .models import LabelSheet
+    from .tasks import render_label_sheet
+
+    try:
+        render_label_sheet.delay(str(sheet_id))
+    except Exception:
+        logger.warning("Could not queue label sheet %s", sheet_id, exc_info=True)
+        # Nothing retries a pending sheet; the client can request a new one
+        LabelSheet.objects.filter(pk=sheet_id, status="pending").update(status="failed", error="Could not be queued")
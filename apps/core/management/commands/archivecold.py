@@ -0,0 +1,46 @@
+"""
+Move cold months of log tables into compressed archive chunks
+Run: python manage.py archivecold --months 13
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Archive farm-months older than the hot window into compressed archive chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=None,
+            help="Number of recent months kept in the hot tables (default: ARCHIVE['HOT_MONTHS'])",
+        )
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Model label to archive, e.g. dairy.MilkLog (repeatable; default: ARCHIVE['MODELS'])",
+        )
+        parser.add_argument(
+            "--farm",
+            type=int,
+            action="append",
+            dest="farms",
+            help="Restrict to a farm ID (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        from apps.core.archive import archive_cold, hot_cutoff
+
+        cutoff = hot_cutoff(options["months"])
+        self.stdout.write(f"Archiving rows dated before {cutoff}...")
+
+        moved = archive_cold(
+            model_labels=options["models"],
+            hot_months=options["months"],
+            farm_ids=options["farms"],
+        )
+        for label, count in moved.items():
+            self.stdout.write(f"  {label}: {count} rows archived")
+
+        self.stdout.write(self.style.SUCCESS("Archive complete"))
@@ -0,0 +1,137 @@
+"""
+Benchmark the hot API endpoints against a generated dataset
+Run: python manage.py benchmarkapi
+     python manage.py benchmarkapi --update-baseline
+"""
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = "Measure latency, query count and rows fetched for hot endpoints and compare with a baseline"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--farms", type=int, default=2, help="Farms in the generated dataset")
+        parser.add_argument("--cows-per-farm", type=int, default=300, help="Cows per generated farm")
+        parser.add_argument("--days", type=int, default=365, help="Days of generated history")
+        parser.add_argument("--seed", type=int, default=1, help="Dataset seed")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per endpoint")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Only run this scenario (repeatable)",
+        )
+        parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON path")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed latency and rows growth over the baseline (default: 0.5)",
+        )
+        parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+        parser.add_argument("--output", type=Path, help="Also write results JSON here")
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database (and its dataset) between runs",
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            "farms": options["farms"],
+            "cows_per_farm": options["cows_per_farm"],
+            "days": options["days"],
+            "seed": options["seed"],
+        }
+
+        baseline = None
+        if not options["update_baseline"]:
+            if not options["baseline"].exists():
+                raise CommandError(f"No baseline at {options['baseline']}; run with --update-baseline first")
+            from apps.core.benchmark import load_baseline
+            baseline = load_baseline(options["baseline"])
+            if baseline["dataset"] != dataset:
+                raise CommandError(
+                    f"Baseline was recorded with dataset {baseline['dataset']}; "
+                    "pass matching options or --update-baseline"
+                )
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, keepdb=options["keepdb"])
+        try:
+            # Audit events are written by a background thread; keep it out of the timings.
+            # Async views run their queries one after another so every query is counted.
+            # Budgets measure the uncached work, so repeated requests must not hit a cache.
+            with override_settings(
+                AUDIT_LOG={**getattr(settings, "AUDIT_LOG", {}), "ENABLED": False},
+                ASYNC_READS={**getattr(settings, "ASYNC_READS", {}), "CONCURRENT": False},
+                CACHES={alias: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"} for alias in settings.CACHES},
+                TIERED_CACHE={**getattr(settings, "TIERED_CACHE", {}), "LOCAL_SIZE": 0},
+            ):
+                results = self._run(dataset, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        self._report(results, baseline)
+
+        if options["output"]:
+            options["output"].write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+        if options["update_baseline"]:
+            from apps.core.benchmark import load_baseline, save_baseline
+            if options["scenarios"] and options["baseline"].exists():
+                # Re-recording some scenarios keeps the others' entries from the same dataset
+                previous = load_baseline(options["baseline"])
+                if previous["dataset"] == dataset and previous.get("vendor") == connection.vendor:
+                    results = {**previous["results"], **results}
+            save_baseline(options["baseline"], dataset, results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+            return
+
+        from apps.core.benchmark import compare
+        regressions = compare(results, baseline["results"], options["tolerance"])
+        if regressions:
+            for message in regressions:
+                self.stdout.write(self.style.ERROR(f"  REGRESSION {message}"))
+            raise CommandError(f"{len(regressions)} performance regression(s)")
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def _run(self, dataset, options):
+        from rest_framework.test import APIClient
+
+        from apps.core.benchmark import prepare_dataset, run_all
+
+        farm, owner = prepare_dataset(dataset, self.stdout.write)
+
+        client = APIClient()
+        client.force_authenticate(owner)
+        context = {
+            "cow_ids": list(farm.cow_records.filter(status="milking").values_list("id", flat=True)[:50]),
+            "qr_code": farm.feeditem_records.exclude(qr_code="").values_list("qr_code", flat=True).first(),
+            "qr_codes": list(farm.feeditem_records.exclude(qr_code="").values_list("qr_code", flat=True)[:10]),
+        }
+
+        self.stdout.write(f"Running scenarios ({options['iterations']} iterations, {options['warmup']} warmup)...")
+        return run_all(client, context, options["iterations"], options["warmup"], options["scenarios"])
+
+    def _report(self, results, baseline):
+        expected = (baseline or {}).get("results", {})
+        self.stdout.write(f"\n{'scenario':<22} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8} {'rows':>8}")
+        for name, result in results.items():
+            line = "{:<22} {:>6} {:>9} {:>9} {:>8} {:>8}".format(
+                name, result["status"], result["p50_ms"], result["p95_ms"], result["queries"],
+                "n/a" if result["rows"] is None else result["rows"],
+            )
+            if name in expected:
+                line += f"   (baseline p95 {expected[name]['p95_ms']}, queries {expected[name]['queries']})"
+            self.stdout.write(line)
@@ -0,0 +1,105 @@
+"""
+Load test light API endpoints with and without persistent DB connections
+Run: python manage.py benchmarkconnections
+     python manage.py benchmarkconnections --threads 16 --requests 100 --keepdb
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+DEFAULT_SCENARIOS = ["tasks_today", "tasks_overdue", "worker_dashboard", "milk_log_list"]
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and connections opened with CONN_MAX_AGE=0 against persistent connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--farms", type=int, default=2, help="Farms in the generated dataset")
+        parser.add_argument("--cows-per-farm", type=int, default=300, help="Cows per generated farm")
+        parser.add_argument("--days", type=int, default=365, help="Days of generated history")
+        parser.add_argument("--seed", type=int, default=1, help="Dataset seed")
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent clients")
+        parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            help="CONN_MAX_AGE for the persistent run (default: DATABASE_CONN_MAX_AGE, or 60 if that is 0)",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help=f"GET scenario from benchmarkapi to request (repeatable; default: {', '.join(DEFAULT_SCENARIOS)})",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database (and its dataset) between runs",
+        )
+
+    def handle(self, *args, **options):
+        from apps.core.benchmark import SCENARIOS
+
+        names = options["scenarios"] or DEFAULT_SCENARIOS
+        paths = [path for name, method, path, _ in SCENARIOS if name in names and method == "get"]
+        if not paths:
+            raise CommandError("No GET scenarios selected")
+
+        max_age = options["max_age"] or connection.settings_dict.get("CONN_MAX_AGE") or 60
+        dataset = {
+            "farms": options["farms"],
+            "cows_per_farm": options["cows_per_farm"],
+            "days": options["days"],
+            "seed": options["seed"],
+        }
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, keepdb=options["keepdb"])
+        try:
+            with override_settings(AUDIT_LOG={**getattr(settings, "AUDIT_LOG", {}), "ENABLED": False}):
+                results = self._run(dataset, paths, max_age, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        self._report(results, options)
+
+    def _run(self, dataset, paths, max_age, options):
+        from apps.core.benchmark import load_test, prepare_dataset
+
+        _, owner = prepare_dataset(dataset, self.stdout.write)
+        self.stdout.write(
+            f"Load testing {len(paths)} endpoint(s) with {options['threads']} clients x {options['requests']} requests..."
+        )
+
+        results = {}
+        saved = {alias: connections.settings[alias].get("CONN_MAX_AGE", 0) for alias in connections.settings}
+        try:
+            for age in (0, max_age):
+                # Worker threads open their connections from these settings
+                for alias in saved:
+                    connections.settings[alias]["CONN_MAX_AGE"] = age
+                results[f"CONN_MAX_AGE={age}"] = load_test(owner, paths, options["threads"], options["requests"])
+        finally:
+            for alias, age in saved.items():
+                connections.settings[alias]["CONN_MAX_AGE"] = age
+        return results
+
+    def _report(self, results, options):
+        self.stdout.write(
+            f"\n{'mode':<18} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}"
+        )
+        for mode, result in results.items():
+            self.stdout.write("{:<18} {:>8} {:>7} {:>8} {:>8} {:>8} {:>12}".format(
+                mode, result["requests"], result["errors"], result["requests_per_second"],
+                result["p50_ms"], result["p95_ms"], result["connections"],
+            ))
+
+        closed, persistent = results.values()
+        if any(result["errors"] for result in results.values()):
+            raise CommandError("Some requests failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Persistent connections opened {persistent['connections']} connection(s) instead of "
+            f"{closed['connections']} ({persistent['requests_per_second']} vs {closed['requests_per_second']} req/s)"
+        ))
@@ -0,0 +1,69 @@
+"""
+Prepare the database and static files at container start, in one process
+Run: python manage.py bootstrap
+     python manage.py bootstrap --force
+"""
+import hashlib
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+# Fingerprint of the static sources last collected, kept with the collected files
+STAMP_NAME = ".static-fingerprint"
+
+
+def pending_migrations(using=DEFAULT_DB_ALIAS):
+    executor = MigrationExecutor(connections[using])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def static_fingerprint():
+    """Hash of every static source file's path, size and modification time, and the storage in use."""
+    digest = hashlib.sha256(settings.STATICFILES_STORAGE.encode())
+    entries = []
+    for finder in get_finders():
+        for path, storage in finder.list([]):
+            prefix = getattr(storage, "prefix", None) or ""
+            stat = Path(storage.path(path)).stat()
+            entries.append(f"{prefix}/{path}:{stat.st_size}:{stat.st_mtime_ns}")
+    for entry in sorted(entries):
+        digest.update(entry.encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply pending migrations, collect static files when their sources changed "
+        "and seed an empty database, skipping each step that has nothing to do"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Run every step even if nothing changed")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        verbosity = options["verbosity"]
+
+        plan = pending_migrations()
+        if plan or force:
+            self.stdout.write(f"Applying {len(plan)} migration(s)...")
+            call_command("migrate", interactive=False, verbosity=verbosity)
+        else:
+            self.stdout.write("No migrations to apply.")
+
+        stamp = Path(settings.STATIC_ROOT) / STAMP_NAME
+        fingerprint = static_fingerprint()
+        if force or not stamp.exists() or stamp.read_text().strip() != fingerprint:
+            self.stdout.write("Collecting static files...")
+            call_command("collectstatic", interactive=False, clear=True, verbosity=verbosity)
+            stamp.write_text(fingerprint)
+        else:
+            self.stdout.write("Static files are up to date.")
+
+        # A single query when the database is already seeded
+        call_command("initdb", skip_if_exists=True, verbosity=verbosity)
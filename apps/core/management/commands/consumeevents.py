@@ -0,0 +1,35 @@
+"""
+Read the event stream as a consumer group member and print each event
+Run: python manage.py consumeevents --group debug
+     python manage.py consumeevents --group debug --count 10 --no-ack
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Print events from the Redis event stream as a member of a consumer group, acknowledging them"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", required=True, help="Consumer group (created at the start of the stream)")
+        parser.add_argument("--name", default="cli", help="Consumer name within the group")
+        parser.add_argument("--count", type=int, help="Stop after this many events")
+        parser.add_argument("--no-ack", action="store_true", help="Leave the events pending")
+
+    def handle(self, *args, **options):
+        from apps.core.events import StreamConsumer
+
+        consumer = StreamConsumer(options["group"], options["name"])
+        seen = 0
+        try:
+            while options["count"] is None or seen < options["count"]:
+                limit = 100 if options["count"] is None else min(100, options["count"] - seen)
+                entries = consumer.read(limit)
+                for entry_id, event in entries:
+                    self.stdout.write(json.dumps({"id": entry_id, **event}))
+                if not options["no_ack"]:
+                    consumer.ack([entry_id for entry_id, _ in entries])
+                seen += len(entries)
+        except KeyboardInterrupt:
+            pass
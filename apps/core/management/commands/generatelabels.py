@@ -0,0 +1,48 @@
+"""
+Render a QR label sheet for a farm here instead of in a Celery task
+Run: python manage.py generatelabels --farm 1
+     python manage.py generatelabels --farm 1 --cows --format png
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Render a printable QR label sheet for a farm's feed items (and optionally cows) and report timings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--farm", type=int, required=True, help="Farm ID")
+        parser.add_argument("--cows", action="store_true", help="Include cow tags")
+        parser.add_argument("--no-feed-items", action="store_true", help="Leave feed items out")
+        parser.add_argument("--format", choices=["pdf", "png"], default="pdf", help="PDF or zip of PNG pages")
+        parser.add_argument("--processes", type=int, help="Pool size (default: LABEL_SHEETS['PROCESSES'])")
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+        from django.test.utils import override_settings
+
+        from apps.core.labels import DEFAULTS, render_sheet
+        from apps.core.models import LabelSheet
+        from apps.farm.models import Farm
+
+        farm = Farm.objects.filter(pk=options["farm"]).first()
+        if farm is None:
+            raise CommandError(f"Farm {options['farm']} does not exist")
+
+        sheet = LabelSheet.objects.create(
+            farm=farm, feed_items=not options["no_feed_items"], cows=options["cows"], format=options["format"],
+        )
+        label_settings = {**DEFAULTS, **getattr(settings, "LABEL_SHEETS", {})}
+        if options["processes"]:
+            label_settings["PROCESSES"] = options["processes"]
+
+        started = time.perf_counter()
+        with override_settings(LABEL_SHEETS=label_settings):
+            sheet = render_sheet(sheet.pk)
+        elapsed = time.perf_counter() - started
+
+        if sheet.status != "complete":
+            raise CommandError(f"Label sheet failed: {sheet.error}")
+        self.stdout.write(f"{sheet.label_count} label(s) in {elapsed:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Written to {sheet.file.name}"))
@@ -0,0 +1,70 @@
+"""
+Strip EXIF and write size variants for uploaded images (backfill)
+Run: python manage.py processimages
+     python manage.py processimages --model dairy.Cow --force
+     python manage.py processimages --queue
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Process stored cow photos, receipts and task proofs that have no size variants yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            dest="models",
+            help="Only process this model label, e.g. dairy.Cow (repeatable)",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-process images that already have variants")
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Queue a Celery task per image instead of processing here",
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows loaded per query (default: 500)")
+
+    def handle(self, *args, **options):
+        from django.apps import apps
+
+        from apps.core.images import (
+            IMAGE_FIELDS,
+            enqueue,
+            is_processed,
+            process_instance,
+            processed_flag,
+            set_processed,
+        )
+
+        fields = IMAGE_FIELDS
+        if options["models"]:
+            fields = [(label, field) for label, field in IMAGE_FIELDS if label in options["models"]]
+            if not fields:
+                raise CommandError(f"Choose from: {', '.join(label for label, _ in IMAGE_FIELDS)}")
+
+        for label, field in fields:
+            model = apps.get_model(label)
+            rows = (
+                model._base_manager.exclude(**{f"{field}__isnull": True}).exclude(**{field: ""})
+                .only("pk", field, processed_flag(field)).order_by("pk")
+            )
+            pending = processed = 0
+            for instance in rows.iterator(chunk_size=options["batch_size"]):
+                pk, fieldfile = instance.pk, getattr(instance, field)
+                if not options["force"] and is_processed(fieldfile):
+                    # Variants written before the flag existed
+                    if not getattr(instance, processed_flag(field)):
+                        set_processed(instance, field, True)
+                    continue
+                pending += 1
+                if options["queue"]:
+                    enqueue(label, pk, field)
+                elif process_instance(label, pk, field, force=options["force"]):
+                    processed += 1
+
+            if options["queue"]:
+                self.stdout.write(f"{label}.{field}: queued {pending} image(s)")
+            else:
+                self.stdout.write(f"{label}.{field}: processed {processed} of {pending} image(s)")
+        self.stdout.write(self.style.SUCCESS("Done"))
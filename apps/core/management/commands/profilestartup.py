@@ -0,0 +1,119 @@
+"""
+Profile process start-up: import time per module and per app
+Run: python manage.py profilestartup
+     python manage.py profilestartup --urls --celery --settings=smartdairy.settings.slim
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime, so nothing is imported yet
+PROBE = """
+import json, sys, time
+phases = {}
+started = time.perf_counter()
+from django.conf import settings
+settings.INSTALLED_APPS
+phases["settings"] = time.perf_counter() - started
+import django
+mark = time.perf_counter()
+django.setup()
+phases["apps"] = time.perf_counter() - mark
+if "urls" in sys.argv:
+    from django.urls import get_resolver
+    mark = time.perf_counter()
+    get_resolver().url_patterns
+    phases["urls"] = time.perf_counter() - mark
+if "celery" in sys.argv:
+    from smartdairy.celery import app
+    mark = time.perf_counter()
+    app.loader.import_default_modules()
+    phases["celery"] = time.perf_counter() - mark
+phases["total"] = time.perf_counter() - started
+from django.apps import apps
+print(json.dumps({"phases": phases, "apps": [config.name for config in apps.get_app_configs()]}))
+"""
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulative µs, depth)] from -X importtime output."""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative), len(indent) // 2))
+    return modules
+
+
+def owner(module, app_names):
+    """The installed app a module belongs to, else its top-level package."""
+    best = None
+    for name in app_names:
+        if (module == name or module.startswith(name + ".")) and (best is None or len(name) > len(best)):
+            best = name
+    return best or module.split(".")[0]
+
+
+class Command(BaseCommand):
+    help = "Report how long start-up takes per phase, per imported module and per app"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--urls", action="store_true", help="Also load the URLconf (views and serializers)")
+        parser.add_argument("--celery", action="store_true", help="Also import every app's Celery tasks")
+        parser.add_argument("--top", type=int, default=20, help="Modules and apps to list (default: 20)")
+        parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+
+    def handle(self, *args, **options):
+        phases = [phase for phase in ("urls", "celery") if options[phase]]
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, *phases],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Start-up failed:\n{result.stderr[-2000:]}")
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+
+        by_app = defaultdict(lambda: [0, 0])
+        for name, self_us, _, _ in modules:
+            entry = by_app[owner(name, probe["apps"])]
+            entry[0] += self_us
+            entry[1] += 1
+        report = {
+            "settings_module": os.environ.get("DJANGO_SETTINGS_MODULE"),
+            "phases": {name: round(seconds * 1000, 1) for name, seconds in probe["phases"].items()},
+            "module_count": len(modules),
+            "apps": [
+                {"app": app, "ms": round(total / 1000, 1), "modules": count}
+                for app, (total, count) in sorted(by_app.items(), key=lambda item: -item[1][0])
+            ],
+            "modules": [
+                {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative / 1000, 1)}
+                for name, self_us, cumulative, _ in sorted(modules, key=lambda module: -module[1])
+            ],
+        }
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self._print(report, options["top"])
+
+    def _print(self, report, top):
+        self.stdout.write(f"Settings: {report['settings_module']}  ({report['module_count']} modules imported)")
+        self.stdout.write("Phases (wall clock, including -X importtime overhead):")
+        for name, ms in report["phases"].items():
+            self.stdout.write(f"  {name:<10} {ms:>9.1f} ms")
+        self.stdout.write(f"\nImport time by app (top {top}):")
+        for entry in report["apps"][:top]:
+            self.stdout.write(f"  {entry['ms']:>9.1f} ms  {entry['modules']:>5} modules  {entry['app']}")
+        self.stdout.write(f"\nSlowest modules, own time (top {top}):")
+        for entry in report["modules"][:top]:
+            self.stdout.write(f"  {entry['self_ms']:>9.1f} ms  {entry['cumulative_ms']:>9.1f} ms cumulative  {entry['module']}")
@@ -0,0 +1,57 @@
+"""
+Delete superseded milk log revisions past the retention window
+Run: python manage.py prunerevisions --days 180
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete is_latest=False revisions that were superseded more than --days ago"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=180,
+            help="Keep superseded revisions for this many days (default: 180)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows deleted per batch (default: 2000)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many revisions would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        from apps.dairy.models import MilkLog
+
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        batch_size = options["batch_size"]
+
+        # A revision is superseded when its successor is created
+        superseded = MilkLog.objects.filter(
+            is_latest=False,
+            next_revisions__created_at__lt=cutoff,
+        ).values_list("id", flat=True).distinct().order_by()
+
+        if options["dry_run"]:
+            self.stdout.write(f"{superseded.count()} superseded revisions would be deleted")
+            return
+
+        total = 0
+        while True:
+            ids = list(superseded[:batch_size])
+            if not ids:
+                break
+            deleted, _ = MilkLog.objects.filter(id__in=ids).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} superseded revisions older than {options['days']} days"))
@@ -0,0 +1,36 @@
+"""
+Publish outbox events to the Redis event stream
+Run: python manage.py relayevents
+     python manage.py relayevents --once
+"""
+import signal
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Relay pending outbox events of farm-scoped models to the Redis Stream until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Publish everything pending, then exit")
+
+    def handle(self, *args, **options):
+        from apps.core.events import get_event_setting, pending_count, publish_batch, relay
+
+        stream = get_event_setting("STREAM")
+        if options["once"]:
+            total = 0
+            while published := publish_batch():
+                total += published
+            self.stdout.write(self.style.SUCCESS(f"{total} event(s) published to {stream}"))
+            return
+
+        stopping = []
+        # Finish the current batch on SIGTERM (container stop) instead of dying mid-publish
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        self.stdout.write(f"Relaying {pending_count()} pending event(s) and new ones to {stream}...")
+        try:
+            relay(stop=lambda: bool(stopping))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS("Relay stopped"))
@@ -0,0 +1,185 @@
+"""
+Koimeret Dairies - Request Metrics
+
+Per-request instrumentation: total time, DB time, query count, duplicate
+query fingerprints and cache hits/misses. Sampled requests are logged as one
+JSON line, reported in a Server-Timing header and folded into rolling
+per-view aggregates (kept per process) for the admin metrics endpoint.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger("smartdairy.metrics")
+
+# Metrics of the request currently being handled (set by RequestMetricsMiddleware)
+current_metrics = ContextVar("request_metrics", default=None)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "SAMPLE_RATE": 1.0,
+    "SERVER_TIMING": True,
+    "LOG": True,
+    "WINDOW_SIZE": 500,
+    "SLOW_REQUEST_MS": 1000,
+}
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def get_metrics_setting(name):
+    return getattr(settings, "REQUEST_METRICS", {}).get(name, DEFAULTS[name])
+
+
+def fingerprint(sql):
+    """Normalise a query so repeats with different parameters compare equal."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _IN_LIST.sub("IN (...)", sql)
+
+
+def record_cache(hit):
+    """Count a cache lookup against the current request, if it is sampled."""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        if hit:
+            metrics.cache_hits += 1
+        else:
+            metrics.cache_misses += 1
+
+
+class RequestMetrics:
+    """Collector for one request; also the execute_wrapper timing its queries."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = ""
+        self.db_time = 0.0
+        self.queries = 0
+        self.fingerprints = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+    def summary(self, request, response):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        duplicates = self.duplicates
+        return {
+            "view": self.view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 2),
+            "db_ms": round(self.db_time * 1000, 2),
+            "queries": self.queries,
+            "duplicate_queries": sum(duplicates.values()) - len(duplicates),
+            "duplicates": [
+                {"sql": sql[:300], "count": count}
+                for sql, count in sorted(duplicates.items(), key=lambda item: -item[1])[:5]
+            ],
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def server_timing(self, summary):
+        return ", ".join([
+            f'total;dur={summary["total_ms"]}',
+            f'db;dur={summary["db_ms"]};desc="{summary["queries"]} queries, {summary["duplicate_queries"]} duplicate"',
+            f'cache;desc="{summary["cache_hits"]} hit, {summary["cache_misses"]} miss"',
+        ])
+
+
+class MetricsAggregator:
+    """Rolling window of recent samples per view (process-local)."""
+
+    def __init__(self, window_size=500):
+        self.window_size = window_size
+        self.samples = {}
+        self.duplicate_fingerprints = {}
+        self.lock = threading.Lock()
+
+    def add(self, summary):
+        with self.lock:
+            samples = self.samples.setdefault(summary["view"], deque(maxlen=self.window_size))
+            samples.append((
+                summary["total_ms"],
+                summary["db_ms"],
+                summary["queries"],
+                summary["duplicate_queries"],
+                summary["cache_hits"],
+                summary["cache_misses"],
+            ))
+            if summary["duplicates"]:
+                fingerprints = self.duplicate_fingerprints.setdefault(summary["view"], Counter())
+                for duplicate in summary["duplicates"]:
+                    fingerprints[duplicate["sql"]] += duplicate["count"]
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.duplicate_fingerprints.clear()
+
+    def snapshot(self):
+        with self.lock:
+            views = {name: list(samples) for name, samples in self.samples.items()}
+            fingerprints = {name: counter.most_common(3) for name, counter in self.duplicate_fingerprints.items()}
+
+        report = []
+        for name, samples in views.items():
+            totals = sorted(sample[0] for sample in samples)
+            count = len(samples)
+            hits = sum(sample[4] for sample in samples)
+            lookups = hits + sum(sample[5] for sample in samples)
+            report.append({
+                "view": name,
+                "requests": count,
+                "p50_ms": totals[count // 2],
+                "p95_ms": totals[min(count - 1, int(count * 0.95))],
+                "avg_db_ms": round(sum(sample[1] for sample in samples) / count, 2),
+                "avg_queries": round(sum(sample[2] for sample in samples) / count, 1),
+                "max_queries": max(sample[2] for sample in samples),
+                "avg_duplicate_queries": round(sum(sample[3] for sample in samples) / count, 1),
+                "cache_hit_rate": round(hits / lookups, 3) if lookups else None,
+                "top_duplicates": [{"sql": sql, "count": total} for sql, total in fingerprints.get(name, [])],
+            })
+        report.sort(key=lambda row: row["p95_ms"], reverse=True)
+        return {"pid": os.getpid(), "window_size": self.window_size, "views": report}
+
+
+_aggregator = None
+
+
+def get_aggregator():
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = MetricsAggregator(get_metrics_setting("WINDOW_SIZE"))
+    return _aggregator
+
+
+def emit(summary):
+    """Log one sampled request and fold it into the rolling aggregates."""
+    get_aggregator().add(summary)
+    if get_metrics_setting("LOG"):
+        level = logging.WARNING if summary["total_ms"] >= get_metrics_setting("SLOW_REQUEST_MS") else logging.INFO
+        logger.log(level, json.dumps(summary, separators=(",", ":")))
@@ -0,0 +1,109 @@
+"""
+Koimeret Dairies - Core Middleware
+"""
+import random
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from .metrics import RequestMetrics, current_metrics, emit, get_metrics_setting
+from .routers import pin, replica_configured
+
+
+class RequestMetricsMiddleware:
+    """
+    Time sampled requests and their SQL. Results are logged, folded into the
+    rolling aggregates and returned in a Server-Timing header.
+
+    On the async path the collector is only published in `current_metrics`;
+    async views attach it in the threads that run their queries (apps.core.aio).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return get_metrics_setting("ENABLED") and random.random() < get_metrics_setting("SAMPLE_RATE")
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            metrics.view = match.view_name or match._func_path
+        else:
+            metrics.view = "<unresolved>"
+
+        summary = metrics.summary(request, response)
+        emit(summary)
+        if get_metrics_setting("SERVER_TIMING"):
+            timing = metrics.server_timing(summary)
+            if response.has_header("Server-Timing"):
+                timing = f"{response['Server-Timing']}, {timing}"
+            response["Server-Timing"] = timing
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    After a user's successful write, send their replica reads to the primary
+    for a few seconds so they see their own changes (apps.core.routers).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        self.finish(request, response)
+        return response
+
+    def finish(self, request, response):
+        if request.method in ("GET", "HEAD", "OPTIONS") or response.status_code >= 400:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and replica_configured():
+            pin(user.pk)
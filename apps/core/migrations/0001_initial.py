@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('farm', '0002_auditlog_farm_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('month', models.DateField(help_text='First day of the archived month')),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_chunks', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'archive chunk',
+                'verbose_name_plural': 'archive chunks',
+                'ordering': ['model_label', '-month'],
+                'unique_together': {('farm', 'model_label', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0002_auditlog_farm_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0002_modelversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('offset', models.BigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('receiving', 'Receiving'), ('assembling', 'Assembling'), ('complete', 'Complete'), ('failed', 'Failed')], default='receiving', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('expires_at', models.DateTimeField()),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='farm.farm')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'upload session',
+                'verbose_name_plural': 'upload sessions',
+                'indexes': [models.Index(fields=['status', 'expires_at'], name='core_upload_status_ee95ef_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('farm', '0002_auditlog_farm_created_index'),
+        ('core', '0003_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LabelSheet',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('feed_items', models.BooleanField(default=True)),
+                ('cows', models.BooleanField(default=False)),
+                ('format', models.CharField(choices=[('pdf', 'PDF'), ('png', 'PNG pages (zip)')], default='pdf', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('rendering', 'Rendering'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('file', models.FileField(blank=True, upload_to='labels/')),
+                ('label_count', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='label_sheets', to='farm.farm')),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='label_sheets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'label sheet',
+                'verbose_name_plural': 'label sheets',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
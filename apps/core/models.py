@@ -1,9 +1,15 @@
 """
 Koimeret Dairies - Core Models and Mixins
 """
+import uuid
+from contextvars import ContextVar
+
 from django.conf import settings
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, router
+from django.db.models.lookups import Exact, In
 from django.utils import timezone
+from django_cleanup import cleanup
 
 
 class TimeStampedModel(models.Model):
@@ -70,6 +76,94 @@ class SoftDeleteModel(models.Model):
         self.save(update_fields=["is_deleted", "deleted_at", "deleted_by"])
 
 
+# Set while bulk_update() runs: it reports its farms itself, so the update()
+# it issues underneath needs no farm lookup
+_bulk_updating = ContextVar("bulk_updating", default=False)
+
+
+class FarmScopedQuerySet(models.QuerySet):
+    """
+    QuerySet whose bulk writes bump the model's per-farm version and append
+    outbox events (apps.core.events), since bulk_create, bulk_update and
+    update() skip model signals. update() reads the farms it touches from a
+    farm filter when it has one, and queries them otherwise.
+    """
+
+    def _changed(self, farm_ids):
+        from .versions import mark_changed
+        for farm_id in farm_ids:
+            if farm_id:
+                mark_changed(farm_id, self.model._meta.label)
+
+    def _filtered_farm_ids(self):
+        """
+        The farms a farm=/farm_id=/farm__in= filter with literal values limits
+        the queryset to, or None when its filter does not say.
+        """
+        where = self.query.where
+        if where.connector != "AND" or where.negated:
+            return None
+        farm = self.model._meta.get_field("farm")
+        for lookup in where.children:
+            lhs = getattr(lookup, "lhs", None)
+            if getattr(lhs, "target", None) is not farm or lhs.alias != self.query.base_table:
+                continue
+            if isinstance(lookup, Exact) and isinstance(lookup.rhs, int):
+                return {lookup.rhs}
+            if isinstance(lookup, In) and isinstance(lookup.rhs, (list, tuple, set)):
+                return set(lookup.rhs)
+        return None
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from . import events
+        with events.batched(self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            events.record_bulk(self.model, objs, "created", using=self.db)
+        self._changed({obj.farm_id for obj in objs})
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        from . import events
+        objs = list(objs)
+        token = _bulk_updating.set(True)
+        try:
+            with events.batched(self.db):
+                rows = super().bulk_update(objs, fields, *args, **kwargs)
+                events.record_bulk(self.model, objs, "updated", fields, using=self.db)
+        finally:
+            _bulk_updating.reset(token)
+        self._changed({obj.farm_id for obj in objs})
+        return rows
+
+    def update(self, **kwargs):
+        from . import events
+        if _bulk_updating.get():
+            return super().update(**kwargs)
+        with events.batched(self.db):
+            if events.emits_events(self.model):
+                # The rows are needed for their events anyway; their farms come with them
+                rows = list(self.order_by().values_list("pk", "farm_id"))
+                farm_ids = {farm_id for _, farm_id in rows}
+            else:
+                rows = None
+                farm_ids = self._filtered_farm_ids()
+                if farm_ids is None:
+                    farm_ids = set(self.order_by().values_list("farm_id", flat=True).distinct())
+            updated = super().update(**kwargs)
+            if updated and rows:
+                events.record_update(self.model, rows, kwargs, using=self.db)
+        if updated:
+            farm_ids.add(getattr(kwargs.get("farm"), "pk", kwargs.get("farm_id")))
+            self._changed(farm_ids)
+        return updated
+
+    def delete(self):
+        from . import events
+        # One INSERT for the events of every row deleted, cascades included
+        with events.batched(self.db):
+            return super().delete()
+
+
 class FarmScopedModel(models.Model):
     """
     Abstract base model for farm-scoped records.
@@ -80,9 +174,25 @@ class FarmScopedModel(models.Model):
         related_name="%(class)s_records",
     )
 
+    objects = FarmScopedQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
+    def _write_db(self, using):
+        return using or router.db_for_write(self.__class__, instance=self)
+
+    def save(self, *args, **kwargs):
+        from . import events
+        # The outbox event is written in the same transaction as the row
+        with events.batched(self._write_db(kwargs.get("using"))):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from . import events
+        with events.batched(self._write_db(kwargs.get("using"))):
+            return super().delete(*args, **kwargs)
+
 
 class SyncableModel(models.Model):
     """
@@ -142,3 +252,174 @@ class RevisionMixin(models.Model):
         new_data["previous_revision"] = self
 
         return self.__class__.objects.create(**new_data)
+
+
+class ArchiveChunk(models.Model):
+    """
+    One farm-month of cold rows moved out of a hot table, stored as
+    zlib-compressed JSON. Read back through apps.core.archive.
+    """
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="archive_chunks",
+    )
+    model_label = models.CharField(max_length=100)
+    month = models.DateField(help_text="First day of the archived month")
+    row_count = models.PositiveIntegerField(default=0)
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "archive chunk"
+        verbose_name_plural = "archive chunks"
+        unique_together = ["farm", "model_label", "month"]
+        ordering = ["model_label", "-month"]
+
+    def __str__(self):
+        return f"{self.model_label} {self.month:%Y-%m} ({self.row_count} rows)"
+
+
+class ModelVersion(models.Model):
+    """
+    Version counter of one model's rows on one farm (see apps.core.versions).
+    """
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="model_versions",
+    )
+    label = models.CharField(max_length=100)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "model version"
+        verbose_name_plural = "model versions"
+        unique_together = ["farm", "label"]
+
+    def __str__(self):
+        return f"{self.farm_id} {self.label} v{self.version}"
+
+
+class UploadSession(TimeStampedModel):
+    """
+    A resumable, chunked photo upload. Chunks are kept on disk until every
+    byte has arrived; apps.core.uploads then assembles the file and attaches
+    it to its target record in a background task.
+    """
+    STATUS_CHOICES = [
+        ("receiving", "Receiving"),
+        ("assembling", "Assembling"),
+        ("complete", "Complete"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sessions",
+    )
+    target = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="receiving")
+    error = models.CharField(max_length=255, blank=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "upload session"
+        verbose_name_plural = "upload sessions"
+        indexes = [models.Index(fields=["status", "expires_at"])]
+
+    def __str__(self):
+        return f"{self.target} {self.object_id}: {self.offset}/{self.size} ({self.status})"
+
+
+@cleanup.ignore
+class LabelSheet(TimeStampedModel):
+    """
+    A printable sheet of QR code labels for a farm's feed items and, on
+    request, its cows. Rendered in a background task by apps.core.labels;
+    sheets with the same content share one stored file, so django-cleanup
+    must not delete it with a sheet.
+    """
+    FORMAT_CHOICES = [
+        ("pdf", "PDF"),
+        ("png", "PNG pages (zip)"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("rendering", "Rendering"),
+        ("complete", "Complete"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="label_sheets",
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="label_sheets",
+    )
+    feed_items = models.BooleanField(default=True)
+    cows = models.BooleanField(default=False)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="pdf")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    content_hash = models.CharField(max_length=64, blank=True)
+    file = models.FileField(upload_to="labels/", blank=True)
+    label_count = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        verbose_name = "label sheet"
+        verbose_name_plural = "label sheets"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.farm_id} labels {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class OutboxEvent(models.Model):
+    """
+    A write to a farm-scoped record, waiting to be published to the event
+    stream or kept briefly after (see apps.core.events).
+    """
+    ACTION_CHOICES = [
+        ("created", "Created"),
+        ("updated", "Updated"),
+        ("deleted", "Deleted"),
+    ]
+
+    # Not a foreign key: events of a deleted farm's rows outlive the farm
+    farm_id = models.BigIntegerField()
+    label = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "outbox event"
+        verbose_name_plural = "outbox events"
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(published_at__isnull=True), name="outbox_pending_idx"),
+            models.Index(fields=["published_at"], name="outbox_published_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.label} {self.object_id} {self.action}"
@@ -0,0 +1,153 @@
+"""
+Koimeret Dairies - Owner Portfolio
+
+Owner dashboard KPIs for every farm a user owns or administers, in one
+request. Snapshots are cached per farm under that farm's model versions
+and today's date, so a change on one farm recomputes only that farm. The
+farms that missed are computed together: each KPI is one aggregate query
+grouped by farm, so the query count does not grow with the number of farms.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .caching import farm_key, fetch_many
+from .routers import replica_reads
+from .versions import get_versions_many
+
+PORTFOLIO_MODELS = [
+    "farm.Farm", "dairy.Cow", "dairy.MilkLog", "sales.Sale", "feeds.InventoryBalance", "feeds.FeedItem",
+    "health.Withdrawal", "health.Vaccination", "alerts.Alert",
+]
+
+# Roles whose farms are included (the KPIs cover sales)
+PORTFOLIO_ROLES = {"owner", "admin"}
+
+CACHE_TIMEOUT = 60 * 15
+
+
+def portfolio_farms(context):
+    """[(farm_id, name, roles)] of the farms in a user's portfolio, from their cached farm context."""
+    farms = {}
+    for membership in context.memberships:
+        if membership["role"] in PORTFOLIO_ROLES:
+            farms.setdefault(membership["farm_id"], (membership["farm_name"], set()))[1].add(membership["role"])
+    return [(farm_id, name, sorted(roles)) for farm_id, (name, roles) in sorted(farms.items())]
+
+
+def _grouped(queryset, **aggregate):
+    """{farm_id: value} of one aggregate over `queryset`, grouped by farm."""
+    (name, expression), = aggregate.items()
+    return dict(queryset.values("farm_id").annotate(**{name: expression}).order_by().values_list("farm_id", name))
+
+
+def compute_snapshots(farm_ids):
+    """{farm_id: snapshot} for several farms with one grouped query per KPI."""
+    from apps.alerts.models import Alert
+    from apps.dairy.models import Cow, MilkLog
+    from apps.feeds.models import InventoryBalance
+    from apps.health.models import Vaccination, Withdrawal
+    from apps.sales.models import Sale
+
+    today = timezone.localdate()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    today_milk = _grouped(
+        MilkLog.objects.filter(farm_id__in=farm_ids, date=today, is_latest=True), total=Sum("liters"),
+    )
+    cows = defaultdict(lambda: {"total": 0, "milking": 0})
+    rows = (
+        Cow.objects.filter(farm_id__in=farm_ids).values("farm_id")
+        .annotate(total=Count("id", filter=Q(is_active=True)), milking=Count("id", filter=Q(status="milking")))
+        .order_by()
+    )
+    for row in rows:
+        cows[row["farm_id"]] = row
+    week_totals = defaultdict(list)
+    rows = (
+        MilkLog.objects.filter(farm_id__in=farm_ids, date__gte=week_ago, is_latest=True)
+        .values("farm_id", "date").annotate(total=Sum("liters")).order_by()
+    )
+    for row in rows:
+        week_totals[row["farm_id"]].append(row["total"])
+    month_sales = _grouped(Sale.objects.filter(farm_id__in=farm_ids, date__gte=month_ago), total=Sum("total_amount"))
+    # Same rule as InventoryBalance.is_low_stock
+    low_stock = _grouped(
+        InventoryBalance.objects.filter(farm_id__in=farm_ids, quantity_on_hand__lte=F("feed_item__reorder_level")),
+        count=Count("id"),
+    )
+    withdrawals = _grouped(
+        Withdrawal.objects.filter(farm_id__in=farm_ids, is_active=True, end_date__gte=today), count=Count("id"),
+    )
+    vaccines_due = _grouped(
+        Vaccination.objects.filter(
+            farm_id__in=farm_ids, next_due_date__gte=today, next_due_date__lte=today + timedelta(days=7),
+        ),
+        count=Count("id"),
+    )
+    open_alerts = _grouped(Alert.objects.filter(farm_id__in=farm_ids, status="open"), count=Count("id"))
+
+    snapshots = {}
+    for farm_id in farm_ids:
+        milk = today_milk.get(farm_id) or Decimal("0")
+        milking = cows[farm_id]["milking"]
+        totals = week_totals.get(farm_id)
+        week_avg = sum(totals) / len(totals) if totals else Decimal("0")
+        snapshots[farm_id] = {
+            "kpis": {
+                "total_liters_today": float(milk),
+                "liters_per_cow_today": float(round(milk / milking, 2)) if milking else 0.0,
+                "avg_7day_liters_per_cow": float(round(week_avg / max(milking, 1), 2)),
+                "sales_this_month": float(month_sales.get(farm_id) or 0),
+                "low_stock_items": low_stock.get(farm_id, 0),
+                "open_alerts": open_alerts.get(farm_id, 0),
+                "active_withdrawals": withdrawals.get(farm_id, 0),
+                "vaccines_due_7days": vaccines_due.get(farm_id, 0),
+            },
+            "total_cows": cows[farm_id]["total"],
+            "milking_cows": milking,
+        }
+    return snapshots
+
+
+def snapshot_key(farm_id, versions, today):
+    parts = [today.isoformat()] + [f"{label}={versions[label]}" for label in PORTFOLIO_MODELS]
+    return farm_key(farm_id, "portfolio", hashlib.md5("|".join(parts).encode()).hexdigest())
+
+
+def get_snapshots(farm_ids, user=None):
+    """
+    Cached compute_snapshots: one version lookup, one cache read and at most
+    one computation, on the replica once it has replayed those versions.
+    """
+    if not farm_ids:
+        return {}
+    today = timezone.localdate()
+    versions = get_versions_many(farm_ids, PORTFOLIO_MODELS)
+    keys = {farm_id: snapshot_key(farm_id, versions[farm_id], today) for farm_id in farm_ids}
+
+    def compute(missing):
+        wanted = {(farm_id, label): versions[farm_id][label] for farm_id in missing for label in PORTFOLIO_MODELS}
+        with replica_reads(user, wanted):
+            return compute_snapshots(missing)
+
+    return fetch_many(keys, compute, CACHE_TIMEOUT, local=True)
+
+
+def totals(snapshots):
+    """Portfolio-wide sums of the per-farm snapshots."""
+    summed = ["total_liters_today", "sales_this_month", "low_stock_items", "open_alerts",
+              "active_withdrawals", "vaccines_due_7days"]
+    result = {name: sum(snapshot["kpis"][name] for snapshot in snapshots) for name in summed}
+    result["total_liters_today"] = round(result["total_liters_today"], 2)
+    result["sales_this_month"] = round(result["sales_this_month"], 2)
+    result["total_cows"] = sum(snapshot["total_cows"] for snapshot in snapshots)
+    result["milking_cows"] = sum(snapshot["milking_cows"] for snapshot in snapshots)
+    milking = result["milking_cows"]
+    result["liters_per_cow_today"] = round(result["total_liters_today"] / milking, 2) if milking else 0.0
+    return result
@@ -0,0 +1,211 @@
+"""
+Koimeret Dairies - Database Routing
+
+Reads made inside `replica_reads()` go to the `replica` database when
+DATABASE_REPLICA_URL is set: summary and analytics actions (marked with
+`replica_action`), herd analytics and the nightly rollup tasks. Writes,
+migrations and every other read stay on `default`, so without a replica
+nothing changes.
+
+A block falls back to the primary when the user wrote something within the
+last STICKY_SECONDS (read-your-writes, see ReplicaPinMiddleware), when the
+replica lags more than MAX_LAG seconds or cannot be reached, and for reads
+inside a transaction on the primary. A block whose result is cached or
+validated under model versions (apps.core.versions) also falls back when
+the replica has not replayed those versions yet, since its data could be
+older than they say; the lag check alone cannot tell, as it reports 0 for
+a replica that has replayed all it received.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger("smartdairy.db")
+
+REPLICA = "replica"
+
+DEFAULTS = {
+    "STICKY_SECONDS": 15,
+    "MAX_LAG": 10,
+    "LAG_CHECK_INTERVAL": 5,
+}
+
+# Lag is 0 while the replica has replayed everything it received, so an idle
+# primary does not look like a lagging replica
+LAG_SQL = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Replication lag of the block in progress, or None when it reads from the primary;
+# unset outside replica_reads()
+_route = ContextVar("replica_route")
+
+
+def get_replica_setting(name):
+    return getattr(settings, "DATABASE_REPLICA", {}).get(name, DEFAULTS[name])
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class LagMonitor:
+    """Replica lag in seconds, measured at most once per interval per process."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.checked_at = None
+        self.lag = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < self.interval:
+                return self.lag
+            self.checked_at = time.monotonic()
+        lag = self.measure()
+        with self.lock:
+            self.lag = lag
+        return lag
+
+    def measure(self):
+        """Seconds behind the primary, or None if the replica cannot be queried."""
+        connection = connections[REPLICA]
+        if connection.vendor != "postgresql":
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                row = cursor.fetchone()
+        except DatabaseError:
+            logger.warning("Replica lag check failed; reading from the primary", exc_info=True)
+            return None
+        # NULL when the database is not in recovery (a primary configured as replica)
+        return float(row[0]) if row and row[0] is not None else 0.0
+
+
+_monitor = None
+
+
+def get_lag_monitor():
+    global _monitor
+    if _monitor is None:
+        _monitor = LagMonitor(get_replica_setting("LAG_CHECK_INTERVAL"))
+    return _monitor
+
+
+def _pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin(user_id):
+    """Send the user's replica reads to the primary for STICKY_SECONDS."""
+    cache.set(_pin_key(user_id), True, get_replica_setting("STICKY_SECONDS"))
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def replayed(versions):
+    """Whether the replica has replayed `versions` ({(farm_id, label): version})."""
+    from .models import ModelVersion
+
+    farm_ids = {farm_id for farm_id, _ in versions}
+    labels = {label for _, label in versions}
+    try:
+        rows = ModelVersion.objects.using(REPLICA).filter(farm_id__in=farm_ids, label__in=labels)
+        found = {(farm_id, label): version for farm_id, label, version in rows.values_list("farm_id", "label", "version")}
+    except DatabaseError:
+        logger.warning("Replica version check failed; reading from the primary", exc_info=True)
+        return False
+    return all(found.get(key, 0) >= version for key, version in versions.items())
+
+
+def choose(user=None, versions=None):
+    """Replica lag if reads for this user may use the replica now, else None."""
+    if not replica_configured():
+        return None
+    if user is not None and user.is_authenticated and is_pinned(user.pk):
+        return None
+    lag = get_lag_monitor().get()
+    if lag is None or lag > get_replica_setting("MAX_LAG"):
+        return None
+    if versions and not replayed(versions):
+        return None
+    return lag
+
+
+@contextmanager
+def replica_reads(user=None, versions=None):
+    """
+    Route reads in this block to the replica when it is usable for `user`
+    and has replayed `versions` ({(farm_id, label): version}, the versions
+    the block's result is cached or validated under). Yields the replica's
+    lag in seconds, or None when reads stay on the primary. Nested blocks
+    keep the outermost decision.
+    """
+    lag = _route.get(False)
+    if lag is not False:
+        yield lag
+        return
+    lag = choose(user, versions)
+    token = _route.set(lag)
+    try:
+        yield lag
+    finally:
+        _route.reset(token)
+
+
+def replica_action(view):
+    """
+    Serve a read-only view method from the replica when it is usable for
+    the requesting user and has replayed the versions that `conditional` or
+    `versioned_cache` (apps.core.versions), stacked above, looked up for
+    the request. The lag is kept on `request.replica_lag`.
+    """
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(self, request, *args, **kwargs)
+        versions = {
+            (farm_id, label): version
+            for (farm_id, _), found in request.__dict__.get("_model_versions", {}).items()
+            for label, version in found.items()
+        }
+        with replica_reads(request.user, versions) as lag:
+            request.replica_lag = lag
+            return view(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _route.get(None) is None:
+            return None
+        # Reads inside a write transaction must see its own changes
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        # Objects loaded from the replica are still saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
@@ -0,0 +1,41 @@
+"""
+Koimeret Dairies - Core Background Tasks
+"""
+from celery import shared_task
+
+
+@shared_task
+def process_image(label, pk, field, force=False):
+    """Strip EXIF from an uploaded image and write its size variants."""
+    from .images import process_instance
+    return process_instance(label, pk, field, force=force)
+
+
+@shared_task
+def assemble_upload(session_id):
+    """Assemble a finished resumable upload and attach it to its record."""
+    from .uploads import assemble
+    session = assemble(session_id)
+    return session.status if session else None
+
+
+@shared_task
+def prune_upload_sessions():
+    """Hourly cleanup of expired resumable uploads."""
+    from .uploads import prune_sessions
+    return prune_sessions()
+
+
+@shared_task
+def render_label_sheet(sheet_id):
+    """Render a requested QR label sheet."""
+    from .labels import render_sheet
+    sheet = render_sheet(sheet_id)
+    return sheet.status if sheet else None
+
+
+@shared_task
+def prune_outbox_events():
+    """Hourly cleanup of published outbox events past the retention window."""
+    from .events import prune_events
+    return prune_events()
@@ -0,0 +1,230 @@
+"""
+Koimeret Dairies - Resumable Uploads
+
+Photos for task completions and health events can be sent in chunks over
+flaky links instead of one multipart POST. Each chunk is its own short
+request (capped at MAX_CHUNK_SIZE): its body is streamed to a temporary file
+and only counted once it has fully arrived, so a dropped connection costs
+one chunk, not the whole photo. The client asks for the session's offset
+and continues from there.
+
+When the last byte arrives a Celery task concatenates the chunk files on
+disk, verifies the image and saves it to the target record's image field,
+all streamed in blocks. Saving the field queues the usual EXIF stripping
+and size variants (apps.core.images) and bumps the version of the record
+(for a task completion, its task; apps.core.versions). Unfinished sessions
+expire and take no more chunks.
+"""
+import logging
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger("smartdairy.uploads")
+
+DEFAULTS = {
+    "ROOT": None,
+    "CHUNK_SIZE": 1024 * 1024,
+    "MAX_CHUNK_SIZE": 5 * 1024 * 1024,
+    "MAX_SIZE": 50 * 1024 * 1024,
+    "EXPIRE_HOURS": 24,
+}
+
+# target -> (model label, image field, farm lookup)
+TARGETS = {
+    "task_completion": ("tasks.TaskCompletion", "photo", "task__farm"),
+    "health_event": ("health.HealthEvent", "photo", "farm"),
+}
+
+# Block size for streaming request bodies and chunk files
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk that cannot be accepted; `offset` is where the client should resume."""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def get_upload_setting(name):
+    return getattr(settings, "UPLOAD_SESSIONS", {}).get(name, DEFAULTS[name])
+
+
+def upload_root():
+    return Path(get_upload_setting("ROOT") or Path(settings.MEDIA_ROOT) / "uploads-partial")
+
+
+def session_dir(session):
+    return upload_root() / str(session.id)
+
+
+def get_target(target, object_id, farm_id):
+    """The record a session would attach to, or None if it is not on the farm."""
+    label, _, farm_lookup = TARGETS[target]
+    model = apps.get_model(label)
+    return model._base_manager.filter(pk=object_id, **{farm_lookup: farm_id}).first()
+
+
+def start(user, farm, target, object_id, filename, size):
+    from .models import UploadSession
+
+    session = UploadSession.objects.create(
+        farm=farm,
+        user=user,
+        target=target,
+        object_id=object_id,
+        filename=os.path.basename(filename),
+        size=size,
+        expires_at=timezone.now() + timedelta(hours=get_upload_setting("EXPIRE_HOURS")),
+    )
+    session_dir(session).mkdir(parents=True, exist_ok=True)
+    return session
+
+
+def receive(session, offset, length, stream):
+    """
+    Stream one chunk of `length` bytes starting at `offset` to disk. Returns
+    the session with its new offset; raises UploadError if the chunk does
+    not line up or arrives incomplete.
+    """
+    from .models import UploadSession
+
+    if session.status != "receiving":
+        raise UploadError(f"Upload is {session.status}", session.offset)
+    if session.expires_at <= timezone.now():
+        # prune_sessions deletes it and its chunks; the client starts a new session
+        raise UploadError("Upload session has expired", session.offset)
+    if offset != session.offset:
+        raise UploadError(f"Expected offset {session.offset}", session.offset)
+    if length <= 0 or length > get_upload_setting("MAX_CHUNK_SIZE"):
+        raise UploadError(f"Chunks must be 1-{get_upload_setting('MAX_CHUNK_SIZE')} bytes", session.offset)
+    if offset + length > session.size:
+        raise UploadError(f"Chunk runs past the declared size of {session.size} bytes", session.offset)
+
+    directory = session_dir(session)
+    directory.mkdir(parents=True, exist_ok=True)
+    # The body is read before any row lock is taken, so a slow client holds no transaction
+    with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as handle:
+        received = 0
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            handle.write(block)
+            received += len(block)
+    if received != length:
+        os.unlink(handle.name)
+        raise UploadError(f"Chunk ended after {received} of {length} bytes", session.offset)
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.status != "receiving" or session.offset != offset:
+            # Another request delivered this chunk first
+            os.unlink(handle.name)
+            raise UploadError(f"Expected offset {session.offset}", session.offset)
+        os.replace(handle.name, directory / f"{offset:012d}.part")
+        session.offset = offset + length
+        if session.offset == session.size:
+            session.status = "assembling"
+            transaction.on_commit(lambda pk=session.pk: enqueue(pk))
+        session.save(update_fields=["offset", "status", "updated_at"])
+    return session
+
+
+def enqueue(session_id):
+    from .tasks import assemble_upload
+
+    try:
+        assemble_upload.delay(str(session_id))
+    except Exception:
+        # Sessions left assembling are retried by prune_sessions
+        logger.warning("Could not queue assembly of upload %s", session_id, exc_info=True)
+
+
+def _fail(session, error):
+    session.status = "failed"
+    session.error = error[:255]
+    session.save(update_fields=["status", "error", "updated_at"])
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+
+
+def assemble(session_id):
+    """Concatenate a finished session's chunks and attach the file to its target."""
+    from PIL import Image
+
+    from .models import UploadSession
+
+    session = UploadSession.objects.filter(pk=session_id, status="assembling").first()
+    if session is None:
+        return None
+
+    directory = session_dir(session)
+    parts = sorted(directory.glob("*.part"))
+    if sum(part.stat().st_size for part in parts) != session.size:
+        _fail(session, "Chunks on disk do not add up to the declared size")
+        return session
+
+    assembled = directory / "assembled"
+    with open(assembled, "wb") as output:
+        for part in parts:
+            with open(part, "rb") as chunk:
+                shutil.copyfileobj(chunk, output, BLOCK_SIZE)
+
+    try:
+        with Image.open(assembled) as image:
+            image.verify()
+    except Exception:
+        _fail(session, "Not a valid image")
+        return session
+
+    record = get_target(session.target, session.object_id, session.farm_id)
+    if record is None:
+        _fail(session, "Target record no longer exists")
+        return session
+
+    field = TARGETS[session.target][1]
+    with open(assembled, "rb") as handle:
+        getattr(record, field).save(session.filename, File(handle), save=False)
+    record.save(update_fields=[field])
+
+    session.status = "complete"
+    session.save(update_fields=["status", "updated_at"])
+    shutil.rmtree(directory, ignore_errors=True)
+    return session
+
+
+def cancel(session):
+    shutil.rmtree(session_dir(session), ignore_errors=True)
+    session.delete()
+
+
+def prune_sessions():
+    """Delete expired sessions and their chunks; retry (or, once expired, fail) stuck assemblies."""
+    from .models import UploadSession
+
+    now = timezone.now()
+    expired = UploadSession.objects.filter(expires_at__lt=now).exclude(status="assembling")
+    removed = 0
+    for session in expired.iterator():
+        cancel(session)
+        removed += 1
+
+    stuck = UploadSession.objects.filter(status="assembling", updated_at__lt=now - timedelta(minutes=15))
+    requeued = 0
+    for session in stuck.iterator():
+        if session.expires_at < now:
+            _fail(session, "Assembly did not finish before the session expired")
+        else:
+            enqueue(session.pk)
+            requeued += 1
+    return {"removed": removed, "requeued": requeued}
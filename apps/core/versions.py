@@ -0,0 +1,297 @@
+"""
+Koimeret Dairies - Model Versions
+
+Per-farm, per-model version counters: the shared invalidation signal behind
+ETags, cached dashboards, inventory summaries and herd analytics. A version
+is bumped whenever a farm-scoped record is saved or deleted and by the bulk
+operations of FarmScopedQuerySet (bulk_create, bulk_update, update), which
+skip model signals. Bumps happen once per (farm, model) when the transaction
+commits, so a new version never points at uncommitted data.
+
+Versions live in ModelVersion rows and are read through the cache. They are
+microsecond timestamps that only move forward, so they also serve as
+Last-Modified times.
+
+`conditional` builds ETag/Last-Modified validators for a GET endpoint from
+these counters alone and answers 304 Not Modified without touching the
+tables behind the response. `versioned_cache` caches a view's response data
+under a key that includes the versions it depends on, through the tiered
+cache (apps.core.caching).
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from datetime import time as dt_time
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .caching import farm_key, fetch
+
+# Cached versions are refreshed from the database at least this often
+CACHE_TIMEOUT = 60 * 5
+
+# Rows without a farm of their own, served as part of a farm-scoped parent: label -> parent field
+PARENTS = {"tasks.TaskCompletion": "task"}
+
+
+def _key(farm_id, label):
+    return f"model-version:{farm_id}:{label}"
+
+
+def _now():
+    return time.time_ns() // 1000
+
+
+def _load_many(labels_by_farm):
+    """{farm_id: {label: version}} from the database in one query (two more for new counters)."""
+    from .models import ModelVersion
+
+    # Always the primary: a replica's older version would be cached as current
+    versions = ModelVersion.objects.using(DEFAULT_DB_ALIAS)
+    wanted = {(farm_id, label) for farm_id, labels in labels_by_farm.items() for label in labels}
+    all_labels = {label for _, label in wanted}
+    rows = {farm_id: {} for farm_id in labels_by_farm}
+
+    def read(farm_ids):
+        queryset = versions.filter(farm_id__in=farm_ids, label__in=all_labels)
+        for farm_id, label, version in queryset.values_list("farm_id", "label", "version"):
+            if (farm_id, label) in wanted:
+                rows[farm_id][label] = version
+
+    read(list(labels_by_farm))
+    missing = [(farm_id, label) for farm_id, label in wanted if label not in rows[farm_id]]
+    if missing:
+        ModelVersion.objects.bulk_create(
+            [ModelVersion(farm_id=farm_id, label=label, version=_now()) for farm_id, label in missing],
+            ignore_conflicts=True,
+        )
+        read(list({farm_id for farm_id, _ in missing}))
+    return rows
+
+
+def get_versions(farm_id, labels):
+    """{label: version} for one farm, from the cache with the database as fallback."""
+    return get_versions_many([farm_id], labels)[farm_id]
+
+
+def get_versions_many(farm_ids, labels):
+    """{farm_id: {label: version}} for several farms in one cache round trip."""
+    keys = {_key(farm_id, label): (farm_id, label) for farm_id in farm_ids for label in labels}
+    found = cache.get_many(list(keys))
+    missing = defaultdict(list)
+    for key, (farm_id, label) in keys.items():
+        if key not in found:
+            missing[farm_id].append(label)
+    if missing:
+        for farm_id, loaded in _load_many(missing).items():
+            for label, version in loaded.items():
+                # add() never overwrites a newer version set by a concurrent bump
+                cache.add(_key(farm_id, label), version, CACHE_TIMEOUT)
+                found[_key(farm_id, label)] = version
+    versions = {farm_id: {} for farm_id in farm_ids}
+    for key, (farm_id, label) in keys.items():
+        versions[farm_id][label] = found[key]
+    return versions
+
+
+def bump(farm_id, labels):
+    """Move the versions of `labels` forward for one farm."""
+    from .models import ModelVersion
+
+    labels = sorted(set(labels))
+    now = _now()
+    queryset = ModelVersion.objects.using(DEFAULT_DB_ALIAS).filter(farm_id=farm_id, label__in=labels)
+    updated = queryset.update(version=Greatest(F("version") + 1, Value(now)), updated_at=timezone.now())
+    if updated < len(labels):
+        found = set(queryset.values_list("label", flat=True))
+        ModelVersion.objects.bulk_create(
+            [ModelVersion(farm_id=farm_id, label=label, version=now) for label in labels if label not in found],
+            ignore_conflicts=True,
+        )
+    # Dropped rather than set: concurrent bumps are ordered by the database, so
+    # the next read caches the version it returns and never one it did not
+    cache.delete_many([_key(farm_id, label) for label in labels])
+
+
+# (farm_id, label) pairs waiting for the current transaction to commit
+_pending = threading.local()
+
+
+def mark_changed(farm_id, label):
+    changed = getattr(_pending, "changed", None)
+    if changed is None:
+        changed = _pending.changed = set()
+    changed.add((farm_id, label))
+    # Several callbacks may be queued; the first one drains the whole set
+    transaction.on_commit(flush)
+
+
+def mark_instance_changed(instance):
+    """mark_changed for a row, or for its parent when it has no farm of its own (PARENTS)."""
+    parent = PARENTS.get(instance._meta.label)
+    if parent is not None:
+        try:
+            instance = getattr(instance, parent)
+        except ObjectDoesNotExist:
+            # Deleted with its parent, whose own delete bumps the version
+            return
+    if instance.farm_id:
+        mark_changed(instance.farm_id, instance._meta.label)
+
+
+def flush():
+    changed = getattr(_pending, "changed", None)
+    _pending.changed = None
+    by_farm = defaultdict(set)
+    for farm_id, label in changed or ():
+        by_farm[farm_id].add(label)
+    for farm_id, labels in by_farm.items():
+        bump(farm_id, labels)
+
+
+def farm_scoped_labels():
+    from django.apps import apps
+
+    from .models import FarmScopedModel
+
+    return [model._meta.label for model in apps.get_models() if issubclass(model, FarmScopedModel)]
+
+
+def on_change(sender, instance, raw=False, **kwargs):
+    if not raw and instance.farm_id:
+        mark_changed(instance.farm_id, sender._meta.label)
+
+
+def on_farm_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_changed(instance.pk, sender._meta.label)
+
+
+def on_child_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        mark_instance_changed(instance)
+
+
+def connect_signals():
+    """
+    Bump the version of every farm-scoped model (and the farm itself) when
+    rows change, and the parent's version when a PARENTS row does.
+    """
+    from django.apps import apps
+
+    farm = apps.get_model("farm.Farm")
+    post_save.connect(on_farm_change, sender=farm, dispatch_uid="model_version_save_farm.Farm")
+
+    for label in PARENTS:
+        model = apps.get_model(label)
+        post_save.connect(on_child_change, sender=model, dispatch_uid=f"model_version_save_{label}")
+        post_delete.connect(on_child_change, sender=model, dispatch_uid=f"model_version_delete_{label}")
+
+    for label in farm_scoped_labels():
+        model = apps.get_model(label)
+        post_save.connect(on_change, sender=model, dispatch_uid=f"model_version_save_{label}")
+        post_delete.connect(on_change, sender=model, dispatch_uid=f"model_version_delete_{label}")
+
+
+def validator(request, farm_id, labels, daily=False, per_user=True):
+    """Hash of the farm's versions of `labels` and the request, plus the newest version time."""
+    # Stacked decorators on one view share a single lookup
+    memo = request.__dict__.setdefault("_model_versions", {})
+    if (farm_id, labels) not in memo:
+        memo[(farm_id, labels)] = get_versions(farm_id, labels)
+    versions = memo[(farm_id, labels)]
+    parts = [str(farm_id), request.get_full_path(), request.META.get("HTTP_ACCEPT", "")]
+    if per_user:
+        parts.append(str(request.user.pk))
+    parts += [f"{label}={versions[label]}" for label in labels]
+    last_modified = max(versions.values()) / 1_000_000
+    if daily:
+        today = timezone.localdate()
+        parts.append(today.isoformat())
+        midnight = timezone.make_aware(datetime.combine(today, dt_time.min))
+        last_modified = max(last_modified, midnight.timestamp())
+    return hashlib.md5("|".join(parts).encode()).hexdigest(), int(last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Authorization"])
+    return response
+
+
+def data_cache_key(request, farm_id, labels, daily=False, per_user=False):
+    digest, _ = validator(request, farm_id, labels, daily, per_user)
+    return farm_key(farm_id, "view", digest)
+
+
+def conditional(*labels, daily=False):
+    """
+    Conditional GET for a view method serving the user's active farm.
+
+    The ETag covers the farm's versions of `labels`, the user, the full path
+    and the Accept header; `daily=True` also includes today's date for
+    responses computed relative to today. Clients sending a matching
+    If-None-Match (or an If-Modified-Since not older than the newest
+    version) get 304 without the view running.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            farm_id = request.user.active_farm_id
+            if request.method not in ("GET", "HEAD") or not farm_id:
+                return view(self, request, *args, **kwargs)
+
+            digest, last_modified = validator(request, farm_id, labels, daily)
+            etag = quote_etag(digest)
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def versioned_cache(*labels, timeout=60 * 15, daily=False, per_user=False):
+    """
+    Cache a view method's response data per farm under a key that includes
+    the farm's versions of `labels`, so any change to those models misses.
+    Responses are shared by the farm's users unless `per_user` is set.
+    """
+    # Imported here so that loading the app registry does not pull in DRF
+    from rest_framework.response import Response
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            farm_id = request.user.active_farm_id
+            if request.method != "GET" or not farm_id:
+                return view(self, request, *args, **kwargs)
+
+            key = data_cache_key(request, farm_id, labels, daily, per_user)
+            response = None
+
+            def compute():
+                nonlocal response
+                response = view(self, request, *args, **kwargs)
+                return response.data
+
+            # replica_action below only reads from a replica that has replayed these versions
+            data = fetch(key, compute, timeout, local=True, cacheable=lambda data: response.status_code == 200)
+            return response if response is not None else Response(data)
+        return wrapper
+    return decorator
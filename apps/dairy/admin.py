@@ -46,4 +46,7 @@ class MilkProductionSummaryAdmin(admin.ModelAdmin):
     list_display = ["farm", "date", "total_liters", "cow_count", "avg_liters_per_cow"]
     list_filter = ["farm", "date"]
     date_hierarchy = "date"
-    readonly_fields = ["farm", "date", "total_liters", "cow_count", "avg_liters_per_cow", "morning_liters", "evening_liters"]
+    readonly_fields = [
+        "farm", "date", "total_liters", "cow_count", "avg_liters_per_cow", "morning_liters", "evening_liters",
+        "withheld_liters",
+    ]
@@ -0,0 +1,252 @@
+"""
+Koimeret Dairies - Herd Analytics
+
+Milk logs are pulled as flat columns (cow, day, session, liters) and every
+metric is computed with vectorised NumPy operations over those arrays:
+lactation detection, 305-day yields, days-in-milk curves, percentile
+rankings and morning/evening ratios. Results are cached per farm under the
+farm's milk log version, so any change to its milk logs misses the cache.
+The extract reads from the replica database when one is configured.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast
+
+from apps.core.caching import farm_key, fetch
+from apps.core.routers import replica_reads
+from apps.core.versions import get_versions
+
+# A gap longer than this between milkings starts a new lactation
+DRY_GAP_DAYS = 45
+STANDARD_LACTATION_DAYS = 305
+RECENT_DAYS = 7
+CACHE_TIMEOUT = 60 * 60
+# Longest ranges the API accepts; ten years of a large herd take over a second cold
+MAX_DAYS = 3 * 365
+MAX_RANKING_WINDOW = 365
+
+SESSION_CODES = {"morning": 0, "evening": 1, "once_daily": 2}
+
+
+def load_milk_arrays(farm_id, date_from=None):
+    """Latest milk log revisions of a farm as parallel NumPy arrays."""
+    from .models import MilkLog
+
+    queryset = MilkLog.objects.filter(farm_id=farm_id, is_latest=True)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+
+    rows = list(
+        queryset.annotate(
+            session_code=Case(
+                *[When(session=name, then=Value(code)) for name, code in SESSION_CODES.items()],
+                output_field=IntegerField(),
+            ),
+            liters_float=Cast("liters", FloatField()),
+        ).values_list("cow_id", "date", "session_code", "liters_float").order_by()
+    )
+
+    count = len(rows)
+    return {
+        "cow": np.fromiter((row[0] for row in rows), dtype=np.int64, count=count),
+        "day": np.fromiter((row[1].toordinal() for row in rows), dtype=np.int32, count=count),
+        "session": np.fromiter((row[2] for row in rows), dtype=np.int8, count=count),
+        "liters": np.fromiter((row[3] for row in rows), dtype=np.float64, count=count),
+    }
+
+
+# Above this many cells, fall back from dense bincount grids to sorting
+DENSE_LIMIT = 50_000_000
+
+
+def _dense_index(values):
+    """
+    Unique sorted values and the position of each element among them.
+    Uses a lookup table instead of a sort when the value range is compact.
+    """
+    low = int(values.min())
+    size = int(values.max()) - low + 1
+    if size > DENSE_LIMIT:
+        return np.unique(values, return_inverse=True)
+    present = np.zeros(size, dtype=bool)
+    present[values - low] = True
+    offsets = np.flatnonzero(present)
+    lookup = np.zeros(size, dtype=np.int64)
+    lookup[offsets] = np.arange(len(offsets))
+    return offsets + low, lookup[values - low]
+
+
+def _daily_totals(cow_index, day, liters, cow_count):
+    """Collapse sessions into one (cow, day) total, sorted by cow then day."""
+    first_day = int(day.min())
+    span = int(day.max()) - first_day + 1
+    keys = cow_index * span + (day - first_day)
+    if cow_count * span > DENSE_LIMIT:
+        keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=liters)
+    else:
+        grid = np.bincount(keys, weights=liters, minlength=cow_count * span)
+        keys = np.flatnonzero(np.bincount(keys, minlength=cow_count * span))
+        totals = grid[keys]
+    return keys // span, keys % span + first_day, totals
+
+
+def _lactations(d_cow, d_day, d_liters):
+    """Split each cow's daily series into lactations and compute per-lactation figures."""
+    new = np.ones(len(d_cow), dtype=bool)
+    new[1:] = (d_cow[1:] != d_cow[:-1]) | (np.diff(d_day) > DRY_GAP_DAYS)
+    lact_id = np.cumsum(new) - 1
+    starts = np.flatnonzero(new)
+
+    dim = d_day - d_day[starts][lact_id] + 1
+    max_dim = np.maximum.reduceat(dim, starts)
+
+    in_standard = dim <= STANDARD_LACTATION_DAYS
+    yield_to_date = np.bincount(lact_id, weights=d_liters * in_standard)
+
+    recent = dim > (max_dim[lact_id] - RECENT_DAYS)
+    recent_avg = np.bincount(lact_id, weights=d_liters * recent) / np.bincount(lact_id, weights=recent)
+
+    # Project unfinished lactations forward at their recent daily average
+    remaining = np.clip(STANDARD_LACTATION_DAYS - max_dim, 0, None)
+    projected = yield_to_date + recent_avg * remaining
+
+    return {
+        "cow": d_cow[starts],
+        "start_day": d_day[starts],
+        "dim": dim,
+        "lact_id": lact_id,
+        "max_dim": max_dim,
+        "yield_to_date": yield_to_date,
+        "projected_305": projected,
+        "recent_avg": recent_avg,
+    }
+
+
+def compute_herd_analytics(farm_id, days=730, ranking_window=30):
+    """Compute all herd metrics for a farm from one columnar extract."""
+    from .models import Cow
+
+    date_from = date.today() - timedelta(days=days) if days else None
+    data = load_milk_arrays(farm_id, date_from)
+    if len(data["cow"]) == 0:
+        return {"lactations": [], "dim_curve": [], "rankings": [], "session_ratios": []}
+
+    cow_ids, cow_index = _dense_index(data["cow"])
+    cow_count = len(cow_ids)
+    cow_labels = {
+        cow_id: (tag, name)
+        for cow_id, tag, name in Cow.objects.filter(id__in=cow_ids.tolist()).values_list("id", "tag_number", "name")
+    }
+
+    d_cow, d_day, d_liters = _daily_totals(cow_index, data["day"], data["liters"], cow_count)
+    lact = _lactations(d_cow, d_day, d_liters)
+
+    # Current lactation = last lactation of each cow (lactations are sorted by cow)
+    current = np.searchsorted(lact["cow"], np.arange(cow_count), side="right") - 1
+
+    # Days-in-milk curve: herd average liters per week of lactation
+    dim = lact["dim"]
+    in_curve = dim <= STANDARD_LACTATION_DAYS
+    week = (dim[in_curve] - 1) // 7
+    week_totals = np.bincount(week, weights=d_liters[in_curve])
+    week_counts = np.bincount(week)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        week_avg = week_totals / week_counts
+
+    # Percentile rankings over the trailing window
+    last_day = d_day.max()
+    in_window = d_day > last_day - ranking_window
+    window_totals = np.bincount(d_cow[in_window], weights=d_liters[in_window], minlength=cow_count)
+    window_days = np.bincount(d_cow[in_window], minlength=cow_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        window_avg = window_totals / window_days
+    ranked = ~np.isnan(window_avg)
+    sorted_avg = np.sort(window_avg[ranked])
+    percentile = np.full(cow_count, np.nan)
+    if len(sorted_avg):
+        percentile[ranked] = np.searchsorted(sorted_avg, window_avg[ranked], side="right") / len(sorted_avg) * 100
+
+    # Morning / evening ratio
+    by_session = np.bincount(
+        cow_index * len(SESSION_CODES) + data["session"],
+        weights=data["liters"],
+        minlength=cow_count * len(SESSION_CODES),
+    ).reshape(cow_count, len(SESSION_CODES))
+    morning = by_session[:, SESSION_CODES["morning"]]
+    evening = by_session[:, SESSION_CODES["evening"]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = morning / evening
+
+    def cow_info(index):
+        cow_id = int(cow_ids[index])
+        tag, name = cow_labels.get(cow_id, ("", ""))
+        return {"cow_id": cow_id, "cow_tag": tag, "cow_name": name}
+
+    def number(value, digits=2):
+        return None if np.isnan(value) or np.isinf(value) else round(float(value), digits)
+
+    lactations = []
+    for index in range(cow_count):
+        lact_index = current[index]
+        lactations.append({
+            **cow_info(index),
+            "lactation_start": date.fromordinal(int(lact["start_day"][lact_index])).isoformat(),
+            "days_in_milk": int(lact["max_dim"][lact_index]),
+            "yield_to_date": number(lact["yield_to_date"][lact_index]),
+            "projected_305_day_yield": number(lact["projected_305"][lact_index]),
+            "recent_daily_avg": number(lact["recent_avg"][lact_index]),
+            "is_complete": bool(lact["max_dim"][lact_index] >= STANDARD_LACTATION_DAYS),
+        })
+
+    rankings = sorted(
+        (
+            {**cow_info(index), "avg_daily_liters": number(window_avg[index]), "percentile": number(percentile[index], 1)}
+            for index in range(cow_count)
+            if ranked[index]
+        ),
+        key=lambda row: row["percentile"],
+        reverse=True,
+    )
+
+    return {
+        "lactations": lactations,
+        "dim_curve": [
+            {
+                "week": int(w) + 1,
+                "days_in_milk": int(w) * 7 + 1,
+                "avg_daily_liters": number(week_avg[w]),
+                "samples": int(week_counts[w]),
+            }
+            for w in range(len(week_counts))
+            if week_counts[w]
+        ],
+        "rankings": rankings,
+        "session_ratios": [
+            {
+                **cow_info(index),
+                "morning_liters": number(morning[index]),
+                "evening_liters": number(evening[index]),
+                "morning_evening_ratio": number(ratio[index], 3),
+            }
+            for index in range(cow_count)
+        ],
+    }
+
+
+def get_herd_analytics(farm_id, days=730, ranking_window=30, user=None):
+    """
+    Cached compute_herd_analytics, keyed on the farm's milk log version.
+    `user` is the user asking, whose recent writes keep reads on the primary.
+    """
+    version = get_versions(farm_id, ["dairy.MilkLog"])["dairy.MilkLog"]
+    key = farm_key(farm_id, "herd-analytics", version, days, ranking_window)
+
+    def compute():
+        # Only a replica that has replayed the version reads data as new as the key says
+        with replica_reads(user, {(farm_id, "dairy.MilkLog"): version}):
+            return compute_herd_analytics(farm_id, days, ranking_window)
+
+    return fetch(key, compute, CACHE_TIMEOUT, local=True)
@@ -3,18 +3,21 @@ Koimeret Dairies - Dairy API Serializers
 """
 from rest_framework import serializers
 
+from apps.core.events import batched
+from apps.core.fields import ImageVariantsField
 from apps.dairy.models import Cow, CowStatusHistory, MilkLog, MilkProductionSummary
 
 
 class CowSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source="get_status_display", read_only=True)
     mother_tag = serializers.CharField(source="mother.tag_number", read_only=True, allow_null=True)
+    photo_variants = ImageVariantsField(source="photo")
 
     class Meta:
         model = Cow
         fields = [
             "id", "tag_number", "name", "breed", "status", "status_display",
-            "date_of_birth", "purchase_date", "purchase_price", "photo",
+            "date_of_birth", "purchase_date", "purchase_price", "photo", "photo_variants",
             "notes", "is_active", "mother", "mother_tag", "farm",
             "created_at", "updated_at"
         ]
@@ -87,11 +90,13 @@ class MilkLogBulkSerializer(serializers.Serializer):
         request = self.context.get("request")
         created_logs = []
 
-        for log_data in logs_data:
-            if request and request.user:
-                log_data["milked_by"] = request.user
-                log_data["farm"] = request.user.active_farm
-            created_logs.append(MilkLog.objects.create(**log_data))
+        # All or nothing, with the change events of the whole batch in one insert
+        with batched():
+            for log_data in logs_data:
+                if request and request.user:
+                    log_data["milked_by"] = request.user
+                    log_data["farm"] = request.user.active_farm
+                created_logs.append(MilkLog.objects.create(**log_data))
 
         return created_logs
 
@@ -101,6 +106,6 @@ class MilkProductionSummarySerializer(serializers.ModelSerializer):
         model = MilkProductionSummary
         fields = [
             "id", "farm", "date", "total_liters", "cow_count",
-            "avg_liters_per_cow", "morning_liters", "evening_liters"
+            "avg_liters_per_cow", "morning_liters", "evening_liters", "withheld_liters"
         ]
         read_only_fields = fields
@@ -4,12 +4,13 @@ Koimeret Dairies - Dairy API URLs
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import CowViewSet, MilkLogViewSet, MilkProductionSummaryViewSet
+from .views import CowViewSet, MilkLogViewSet, MilkProductionSummaryViewSet, HerdAnalyticsViewSet
 
 router = DefaultRouter()
 router.register(r"cows", CowViewSet, basename="cow")
 router.register(r"milk/logs", MilkLogViewSet, basename="milk-log")
 router.register(r"milk/summaries", MilkProductionSummaryViewSet, basename="milk-summary")
+router.register(r"milk/analytics", HerdAnalyticsViewSet, basename="herd-analytics")
 
 urlpatterns = [
     path("", include(router.urls)),
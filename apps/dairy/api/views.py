@@ -12,6 +12,10 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from apps.core.archive import parse_range, read_history
+from apps.core.events import batched
+from apps.core.routers import replica_action
+from apps.core.versions import conditional
 from apps.dairy.models import Cow, CowStatusHistory, MilkLog, MilkProductionSummary
 from .serializers import (
     CowSerializer,
@@ -45,6 +49,10 @@ class CowViewSet(viewsets.ModelViewSet):
             return CowListSerializer
         return CowSerializer
 
+    @conditional("dairy.Cow")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(farm=self.request.user.active_farm)
 
@@ -59,22 +67,22 @@ class CowViewSet(viewsets.ModelViewSet):
         new_status = serializer.validated_data["to_status"]
         notes = serializer.validated_data.get("notes", "")
 
-        # Create status history record
-        CowStatusHistory.objects.create(
-            cow=cow,
-            from_status=old_status,
-            to_status=new_status,
-            changed_by=request.user,
-            notes=notes,
-        )
-
-        # Update cow status
-        cow.status = new_status
-        cow.save(update_fields=["status", "updated_at"])
+        # One transaction for the history row, the status and their change events
+        with batched():
+            CowStatusHistory.objects.create(
+                cow=cow,
+                from_status=old_status,
+                to_status=new_status,
+                changed_by=request.user,
+                notes=notes,
+            )
+            cow.status = new_status
+            cow.save(update_fields=["status", "updated_at"])
 
         return Response(CowSerializer(cow).data)
 
     @action(detail=True, methods=["get"])
+    @replica_action
     def history(self, request, pk=None):
         """Get cow status history."""
         cow = self.get_object()
@@ -86,14 +94,15 @@ class CowViewSet(viewsets.ModelViewSet):
     def milk_logs(self, request, pk=None):
         """Get milk logs for a specific cow."""
         cow = self.get_object()
-        date_from = request.query_params.get("date_from")
-        date_to = request.query_params.get("date_to")
-
-        logs = cow.milk_logs.filter(is_latest=True)
-        if date_from:
-            logs = logs.filter(date__gte=date_from)
-        if date_to:
-            logs = logs.filter(date__lte=date_to)
+        try:
+            date_from, date_to = parse_range(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Reads archived months too when the range reaches past the hot window
+        logs = read_history(
+            MilkLog, cow.farm_id, date_from, date_to, cow_id=cow.id, is_latest=True
+        )
 
         serializer = MilkLogSerializer(logs, many=True)
         return Response(serializer.data)
@@ -155,6 +164,28 @@ class MilkLogViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED
         )
 
+    @action(detail=False, methods=["get"])
+    @replica_action
+    def history(self, request):
+        """Get milk logs for a date range, including archived months."""
+        try:
+            date_from, date_to = parse_range(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if not date_from:
+            return Response({"error": "date_from required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {"is_latest": True}
+        if request.query_params.get("cow"):
+            try:
+                filters["cow_id"] = int(request.query_params["cow"])
+            except ValueError:
+                return Response({"error": "cow must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = read_history(MilkLog, request.user.active_farm, date_from, date_to, **filters)
+        serializer = MilkLogSerializer(logs, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=["get"])
     def today(self, request):
         """Get today's milk logs."""
@@ -164,6 +195,7 @@ class MilkLogViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @replica_action
     def summary(self, request):
         """Get milk production summary."""
         queryset = self.get_queryset()
@@ -203,3 +235,60 @@ class MilkProductionSummaryViewSet(viewsets.ReadOnlyModelViewSet):
         if user.active_farm:
             return MilkProductionSummary.objects.filter(farm=user.active_farm)
         return MilkProductionSummary.objects.none()
+
+
+class HerdAnalyticsViewSet(viewsets.ViewSet):
+    """Herd analytics computed from milk logs (lactations, DIM curve, rankings)."""
+    permission_classes = [IsAuthenticated]
+
+    def _analytics(self, request, days, window):
+        # NumPy is imported on the first analytics request, not when the URLconf loads
+        from apps.dairy.analytics import get_herd_analytics
+
+        # Picks the replica itself, once it knows the version the result is cached under
+        return get_herd_analytics(request.user.active_farm.id, days=days, ranking_window=window, user=request.user)
+
+    def _respond(self, request, section=None):
+        from apps.dairy.analytics import MAX_DAYS, MAX_RANKING_WINDOW
+
+        if not request.user.active_farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(request.query_params.get("days", 730))
+            window = int(request.query_params.get("window", 30))
+        except ValueError:
+            return Response({"error": "days and window must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= MAX_DAYS:
+            return Response(
+                {"error": f"days must be between 1 and {MAX_DAYS}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= window <= MAX_RANKING_WINDOW:
+            return Response(
+                {"error": f"window must be between 1 and {MAX_RANKING_WINDOW}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        data = self._analytics(request, days, window)
+        return Response(data if section is None else data[section])
+
+    def list(self, request):
+        """Get all herd analytics at once."""
+        return self._respond(request)
+
+    @action(detail=False, methods=["get"])
+    def lactations(self, request):
+        """Get current lactation and projected 305-day yield per cow."""
+        return self._respond(request, "lactations")
+
+    @action(detail=False, methods=["get"], url_path="dim-curve")
+    def dim_curve(self, request):
+        """Get the herd's average daily yield by week of lactation."""
+        return self._respond(request, "dim_curve")
+
+    @action(detail=False, methods=["get"])
+    def rankings(self, request):
+        """Get cows ranked by average daily yield over the trailing window."""
+        return self._respond(request, "rankings")
+
+    @action(detail=False, methods=["get"], url_path="session-ratios")
+    def session_ratios(self, request):
+        """Get morning/evening yield ratio per cow."""
+        return self._respond(request, "session_ratios")
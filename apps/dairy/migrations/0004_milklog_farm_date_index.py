@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dairy', '0003_cow_image_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='milklog',
+            index=models.Index(fields=['farm', 'date'], name='dairy_milklog_farm_date'),
+        ),
+    ]
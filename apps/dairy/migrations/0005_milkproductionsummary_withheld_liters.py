@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dairy', '0004_milklog_farm_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='milkproductionsummary',
+            name='withheld_liters',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dairy', '0005_milkproductionsummary_withheld_liters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cow',
+            name='photo_processed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -48,6 +48,8 @@ class Cow(TimeStampedModel, FarmScopedModel):
         null=True,
         blank=True,
     )
+    # Set once the size variants exist (apps.core.images)
+    photo_processed = models.BooleanField(default=False, editable=False)
     image_url = models.URLField(
         _("image URL"),
         max_length=500,
@@ -146,6 +148,9 @@ class MilkLog(TimeStampedModel, FarmScopedModel, SyncableModel, RevisionMixin):
         verbose_name = _("milk log")
         verbose_name_plural = _("milk logs")
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["farm", "date"], name="dairy_milklog_farm_date"),
+        ]
 
     def __str__(self):
         return f"{self.cow} - {self.date} {self.session}: {self.liters}L"
@@ -167,6 +172,8 @@ class MilkProductionSummary(models.Model):
     avg_liters_per_cow = models.DecimalField(max_digits=6, decimal_places=2, default=0)
     morning_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     evening_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Milk from cows under a milk withdrawal that day, which may not be sold
+    withheld_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     class Meta:
         verbose_name = _("milk production summary")
@@ -0,0 +1,70 @@
+"""
+Koimeret Dairies - Daily Milk Summaries
+
+Rebuilds MilkProductionSummary rows (one per farm and day) from the latest
+milk log revisions with a single grouped aggregation. Milk from cows under
+a milk withdrawal on the day is totalled separately as withheld. Months
+whose logs were moved to the archive keep the summaries they have, since
+their logs are no longer in the table the rebuild reads.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+
+from apps.core.archive import archived_months, exclude_months
+
+from .models import MilkLog, MilkProductionSummary
+
+
+def _milk_withdrawals():
+    """Milk withdrawals covering the outer milk log's cow and date."""
+    from apps.health.models import Withdrawal
+
+    return Withdrawal.objects.filter(
+        cow_id=OuterRef("cow_id"),
+        withdrawal_type="milk",
+        start_date__lte=OuterRef("date"),
+        end_date__gte=OuterRef("date"),
+    )
+
+
+def refresh_milk_summaries(date_from, date_to, farm_ids=None):
+    """Recompute daily summaries for a date range. Returns rows written."""
+    logs = MilkLog.objects.filter(is_latest=True, date__gte=date_from, date__lte=date_to)
+    summaries = MilkProductionSummary.objects.filter(date__gte=date_from, date__lte=date_to)
+    if farm_ids:
+        logs = logs.filter(farm_id__in=farm_ids)
+        summaries = summaries.filter(farm_id__in=farm_ids)
+    archived = archived_months(MilkLog._meta.label, date_from, date_to, farm_ids)
+    logs = exclude_months(logs, archived)
+    summaries = exclude_months(summaries, archived)
+
+    rows = logs.values("farm_id", "date").annotate(
+        total=Sum("liters"),
+        cows=Count("cow", distinct=True),
+        morning=Sum("liters", filter=Q(session="morning")),
+        evening=Sum("liters", filter=Q(session="evening")),
+        withheld=Sum("liters", filter=Q(Exists(_milk_withdrawals()))),
+    ).order_by()
+
+    objects = [
+        MilkProductionSummary(
+            farm_id=row["farm_id"],
+            date=row["date"],
+            total_liters=row["total"] or 0,
+            cow_count=row["cows"],
+            avg_liters_per_cow=(
+                (row["total"] / row["cows"]).quantize(Decimal("0.01")) if row["cows"] else 0
+            ),
+            morning_liters=row["morning"] or 0,
+            evening_liters=row["evening"] or 0,
+            withheld_liters=row["withheld"] or 0,
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        summaries.delete()
+        MilkProductionSummary.objects.bulk_create(objects, batch_size=1000)
+    return len(objects)
@@ -6,3 +6,9 @@ class FarmConfig(AppConfig):
     name = 'apps.farm'
     label = 'farm'
     verbose_name = 'Farm Management'
+
+    def ready(self):
+        from . import audit, membership, tokens
+        audit.connect_signals()
+        membership.connect_signals()
+        tokens.connect_signals()
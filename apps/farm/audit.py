@@ -0,0 +1,256 @@
+"""
+Koimeret Dairies - Audit Log Writer
+
+Audit events are pushed onto an in-process queue and written to AuditLog in
+batches by a background thread, so requests never wait on an INSERT. They
+are queued when the change's transaction commits, so a write that is
+rolled back leaves no audit row.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger("smartdairy.audit")
+
+# Request currently being handled (set by AuditContextMiddleware)
+current_request = ContextVar("audit_current_request", default=None)
+
+DEFAULTS = {
+    "ENABLED": True,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 2.0,
+    "MAX_QUEUE_SIZE": 10000,
+    "RETENTION_DAYS": 365,
+    # Reverse proxies in front of the app that append to X-Forwarded-For (nginx)
+    "TRUSTED_PROXIES": 1,
+    "EXCLUDE": ["feeds.InventoryBalance", "feeds.InventoryMovement"],
+}
+
+
+def get_audit_setting(name):
+    return getattr(settings, "AUDIT_LOG", {}).get(name, DEFAULTS[name])
+
+
+class AuditWriter:
+    """
+    Bounded queue drained by a daemon thread using bulk_create.
+
+    When the queue is full, new events are dropped and counted rather than
+    blocking the caller. A batch that fails to insert is retried row by row,
+    so only the events that cannot be written are logged and lost.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0, max_queue_size=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put(self, event):
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning("Audit queue full, %s events dropped so far", self.dropped)
+
+    def flush(self):
+        """Write everything currently queued from the calling thread."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _ensure_started(self):
+        # Restart the thread in forked workers, where it does not survive
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        from apps.farm.models import AuditLog
+
+        try:
+            try:
+                AuditLog.objects.bulk_create(
+                    [AuditLog(**_prepare(event)) for event in batch],
+                    batch_size=self.batch_size,
+                )
+                self.written += len(batch)
+            except Exception:
+                logger.warning("Bulk write of %s audit events failed, writing them one by one", len(batch), exc_info=True)
+                # Drop a connection the failure left unusable before retrying
+                close_old_connections()
+                for event in batch:
+                    try:
+                        AuditLog.objects.create(**_prepare(event))
+                        self.written += 1
+                    except Exception:
+                        self.failed += 1
+                        logger.exception(
+                            "Failed to write audit event %s %s:%s",
+                            event.get("action"), event.get("entity_type"), event.get("entity_id"),
+                        )
+        finally:
+            close_old_connections()
+
+
+def _prepare(event):
+    """Make the payload JSON-safe (done off the request path)."""
+    event = dict(event)
+    event["payload"] = json.loads(json.dumps(event.get("payload") or {}, cls=DjangoJSONEncoder))
+    return event
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter(
+            batch_size=get_audit_setting("BATCH_SIZE"),
+            flush_interval=get_audit_setting("FLUSH_INTERVAL"),
+            max_queue_size=get_audit_setting("MAX_QUEUE_SIZE"),
+        )
+        atexit.register(_writer.flush)
+    return _writer
+
+
+def client_ip(request):
+    """
+    The client's address. Behind TRUSTED_PROXIES proxies it is the entry the
+    outermost of them appended to X-Forwarded-For; entries left of it come
+    from the client and can be forged.
+    """
+    proxies = get_audit_setting("TRUSTED_PROXIES")
+    forwarded = [part.strip() for part in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if part.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR")
+
+
+def record(farm_id, action, entity_type, entity_id, payload=None, user=None, request=None):
+    """
+    Queue an audit event once the current transaction commits. Request
+    context is taken from the middleware if not given.
+    """
+    if not get_audit_setting("ENABLED") or farm_id is None:
+        return
+
+    request = request or current_request.get()
+    ip_address = None
+    user_agent = ""
+    if request is not None:
+        if user is None:
+            request_user = getattr(request, "user", None)
+            if request_user is not None and request_user.is_authenticated:
+                user = request_user
+        ip_address = client_ip(request)
+        user_agent = request.META.get("HTTP_USER_AGENT", "")
+
+    event = {
+        "farm_id": farm_id,
+        "user_id": getattr(user, "pk", None),
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": str(entity_id),
+        "payload": payload or {},
+        "ip_address": ip_address or None,
+        "user_agent": user_agent,
+    }
+    transaction.on_commit(lambda: get_writer().put(event))
+
+
+def _snapshot(instance, update_fields=None):
+    fields = instance._meta.concrete_fields
+    if update_fields:
+        fields = [f for f in fields if f.name in update_fields]
+    snapshot = {}
+    for field in fields:
+        value = getattr(instance, field.attname)
+        if field.get_internal_type() in ("FileField", "ImageField"):
+            value = value.name if value else ""
+        snapshot[field.attname] = value
+    return snapshot
+
+
+def on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    record(
+        instance.farm_id,
+        "create" if created else "update",
+        sender._meta.label,
+        instance.pk,
+        payload=_snapshot(instance, update_fields),
+    )
+
+
+def record_created(instances, user=None):
+    """Audit rows inserted with bulk_create, which sends no post_save."""
+    excluded = set(get_audit_setting("EXCLUDE"))
+    for instance in instances:
+        label = instance._meta.label
+        if label not in excluded:
+            record(instance.farm_id, "create", label, instance.pk, payload=_snapshot(instance), user=user)
+
+
+def on_delete(sender, instance, **kwargs):
+    record(instance.farm_id, "delete", sender._meta.label, instance.pk)
+
+
+def connect_signals():
+    """Attach audit hooks to every farm-scoped model not excluded in settings."""
+    from django.apps import apps
+
+    from apps.core.models import FarmScopedModel
+
+    excluded = set(get_audit_setting("EXCLUDE"))
+    for model in apps.get_models():
+        if issubclass(model, FarmScopedModel) and model._meta.label not in excluded:
+            post_save.connect(on_save, sender=model, dispatch_uid=f"audit_save_{model._meta.label}")
+            post_delete.connect(on_delete, sender=model, dispatch_uid=f"audit_delete_{model._meta.label}")
@@ -0,0 +1,45 @@
+"""
+Koimeret Dairies - API Authentication
+
+Token and session authentication that prime the authenticated user with
+their farm context, so `request.user.active_farm` is served from the cache
+instead of a query per request. Tokens are resolved through the token cache.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+
+from . import tokens
+from .membership import prime_user
+
+
+def _attach(request, result):
+    if result is not None:
+        request._request.farm_context = prime_user(result[0])
+    return result
+
+
+class FarmTokenAuthentication(TokenAuthentication):
+    def authenticate(self, request):
+        result = _attach(request, super().authenticate(request))
+        if result is not None and tokens.get_token_cache_setting("TRACK_DEVICES"):
+            device_id = request.META.get(tokens.get_token_cache_setting("DEVICE_HEADER"))
+            if device_id:
+                tokens.get_device_tracker().touch(result[0].pk, device_id)
+        return result
+
+    def authenticate_credentials(self, key):
+        if not tokens.get_token_cache_setting("ENABLED"):
+            return super().authenticate_credentials(key)
+
+        result = tokens.get_token(key)
+        if result is None:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not result[0].is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return result
+
+
+class FarmSessionAuthentication(SessionAuthentication):
+    def authenticate(self, request):
+        return _attach(request, super().authenticate(request))
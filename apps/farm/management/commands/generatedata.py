@@ -0,0 +1,50 @@
+"""
+Generate a large, reproducible synthetic dataset for load testing
+Run: python manage.py generatedata --farms 10 --cows-per-farm 1500 --days 365 --seed 1
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate synthetic farms, cows, milk logs, feed, sales and tasks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--farms", type=int, default=1, help="Number of farms to create")
+        parser.add_argument("--cows-per-farm", type=int, default=100, help="Cows per farm")
+        parser.add_argument("--days", type=int, default=365, help="Days of history ending today")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same data)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT/COPY batch")
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create even on PostgreSQL instead of COPY",
+        )
+
+    def handle(self, *args, **options):
+        from apps.core.datagen import DataGenerator
+
+        generator = DataGenerator(
+            farms=options["farms"],
+            cows_per_farm=options["cows_per_farm"],
+            days=options["days"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+            log=self.stdout.write,
+        )
+        method = "COPY" if generator.use_copy else "bulk_create"
+        self.stdout.write(
+            f"Generating {options['farms']} farm(s) x {options['cows_per_farm']} cows x "
+            f"{options['days']} days using {method}..."
+        )
+
+        started = time.monotonic()
+        generator.run()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write("\n--- GENERATED ---")
+        for name, count in generator.counts.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(f"Done in {elapsed:.1f}s"))
@@ -0,0 +1,49 @@
+"""
+Delete audit log entries older than the retention window
+Run: python manage.py pruneauditlog --days 365
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete audit log entries older than the retention window"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention window in days (default: AUDIT_LOG['RETENTION_DAYS'])",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows deleted per statement (default: 5000)",
+        )
+
+    def handle(self, *args, **options):
+        from apps.farm.audit import get_audit_setting
+        from apps.farm.models import AuditLog, Farm
+
+        days = options["days"] or get_audit_setting("RETENTION_DAYS")
+        batch_size = options["batch_size"]
+        cutoff = timezone.now() - timedelta(days=days)
+
+        total = 0
+        # Sweep farm by farm so each delete walks the (farm, created_at) index
+        for farm_id in Farm.objects.values_list("id", flat=True):
+            while True:
+                ids = list(
+                    AuditLog.objects.filter(farm_id=farm_id, created_at__lt=cutoff)
+                    .values_list("id", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                deleted, _ = AuditLog.objects.filter(id__in=ids).delete()
+                total += deleted
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} audit log entries older than {days} days"))
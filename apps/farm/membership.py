@@ -0,0 +1,152 @@
+"""
+Koimeret Dairies - Farm Context
+
+Resolves a user's active farm, memberships and roles once per request and
+caches the result across requests. Authentication primes the user's
+active_farm relation from it, so `request.user.active_farm` needs no query.
+Cached contexts are dropped when memberships, the user or a farm change.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+CACHE_TIMEOUT = 60 * 15
+
+
+def _cache_key(user_id):
+    return f"farm-context:{user_id}"
+
+
+class FarmContext:
+    """Active farm, memberships and roles of one user."""
+
+    def __init__(self, user_id, active_farm=None, memberships=None):
+        self.user_id = user_id
+        self.active_farm = active_farm
+        self.memberships = memberships or []
+
+    @property
+    def farm_ids(self):
+        return [membership["farm_id"] for membership in self.memberships]
+
+    @property
+    def roles(self):
+        """Roles held on the active farm."""
+        return self.roles_for(self.active_farm.id if self.active_farm else None)
+
+    def roles_for(self, farm_id):
+        return {m["role"] for m in self.memberships if m["farm_id"] == farm_id}
+
+    def has_role(self, *names, farm_id=None):
+        farm_id = farm_id or (self.active_farm.id if self.active_farm else None)
+        return bool(self.roles_for(farm_id) & set(names))
+
+    def to_cache(self):
+        farm = None
+        if self.active_farm is not None:
+            farm = {field.attname: getattr(self.active_farm, field.attname)
+                    for field in self.active_farm._meta.concrete_fields}
+        return {"active_farm": farm, "memberships": self.memberships}
+
+    @classmethod
+    def from_cache(cls, user_id, data):
+        from .models import Farm
+
+        farm = None
+        if data["active_farm"] is not None:
+            farm = Farm(**data["active_farm"])
+            farm._state.adding = False
+            farm._state.db = "default"
+        return cls(user_id, farm, data["memberships"])
+
+
+def build_farm_context(user):
+    """Load a user's farm context from the database."""
+    from .models import Farm, FarmMembership
+
+    memberships = []
+    active_farm = None
+    rows = FarmMembership.objects.filter(user_id=user.pk, is_active=True).select_related("farm", "role")
+    for membership in rows:
+        memberships.append({
+            "farm_id": membership.farm_id,
+            "farm_name": membership.farm.name,
+            "role": membership.role.name,
+        })
+        if membership.farm_id == user.active_farm_id:
+            active_farm = membership.farm
+
+    if active_farm is None and user.active_farm_id:
+        active_farm = Farm.objects.filter(pk=user.active_farm_id).first()
+    return FarmContext(user.pk, active_farm, memberships)
+
+
+def get_farm_context(user):
+    """Farm context for a user: request-scoped, then cached, then from the database."""
+    if user is None or not user.is_authenticated:
+        return FarmContext(None)
+
+    context = getattr(user, "_farm_context", None)
+    if context is not None:
+        return context
+
+    data = cache.get(_cache_key(user.pk))
+    if data is not None:
+        context = FarmContext.from_cache(user.pk, data)
+    else:
+        context = build_farm_context(user)
+        cache.set(_cache_key(user.pk), context.to_cache(), CACHE_TIMEOUT)
+
+    # A cached context from before an active farm switch is not trusted
+    active_id = context.active_farm.id if context.active_farm else None
+    if active_id != user.active_farm_id:
+        context = build_farm_context(user)
+        cache.set(_cache_key(user.pk), context.to_cache(), CACHE_TIMEOUT)
+
+    user._farm_context = context
+    return context
+
+
+def prime_user(user):
+    """Fill the user's active_farm relation cache from the farm context."""
+    context = get_farm_context(user)
+    if context.active_farm is not None:
+        type(user)._meta.get_field("active_farm").set_cached_value(user, context.active_farm)
+    return context
+
+
+def invalidate(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def invalidate_farm(farm):
+    """Drop the contexts of everyone attached to a farm."""
+    from .models import FarmMembership, User
+
+    user_ids = set(FarmMembership.objects.filter(farm=farm).values_list("user_id", flat=True))
+    user_ids.update(User.objects.filter(active_farm=farm).values_list("id", flat=True))
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def on_membership_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(instance.user_id)
+
+
+def on_user_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate(instance.pk)
+
+
+def on_farm_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_farm(instance)
+
+
+def connect_signals():
+    """Drop cached contexts when memberships, users or farms change."""
+    from .models import Farm, FarmMembership, User
+
+    post_save.connect(on_membership_change, sender=FarmMembership, dispatch_uid="farm_context_membership_save")
+    post_delete.connect(on_membership_change, sender=FarmMembership, dispatch_uid="farm_context_membership_delete")
+    post_save.connect(on_user_save, sender=User, dispatch_uid="farm_context_user_save")
+    post_save.connect(on_farm_change, sender=Farm, dispatch_uid="farm_context_farm_save")
@@ -0,0 +1,57 @@
+"""
+Koimeret Dairies - Farm Middleware
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.functional import SimpleLazyObject
+
+from .audit import current_request
+from .membership import get_farm_context
+
+
+class AuditContextMiddleware:
+    """
+    Expose the current request to audit hooks so model changes are recorded
+    with the acting user, IP address and user agent.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+
+class FarmContextMiddleware:
+    """
+    Attach the user's farm context (active farm, memberships, roles) to the
+    request. It is resolved lazily, once, and shared with the API
+    authentication classes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.farm_context = SimpleLazyObject(lambda: get_farm_context(request.user))
+        return self.get_response(request)
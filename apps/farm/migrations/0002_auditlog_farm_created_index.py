@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['farm', 'created_at'], name='farm_auditlog_farm_created'),
+        ),
+    ]
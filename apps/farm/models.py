@@ -205,6 +205,9 @@ class AuditLog(TimeStampedModel):
         verbose_name = _("audit log")
         verbose_name_plural = _("audit logs")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["farm", "created_at"], name="farm_auditlog_farm_created"),
+        ]
 
     def __str__(self):
         return f"{self.action} on {self.entity_type}:{self.entity_id} by {self.user}"
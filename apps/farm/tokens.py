@@ -0,0 +1,170 @@
+"""
+Koimeret Dairies - Token Cache
+
+Caches API token -> user in a small per-process LRU with a short TTL, backed
+by the shared cache, so polling tablets do not hit the Token + User join on
+every call. Entries are dropped when a token is deleted (logout) or its user
+is saved (deactivation, profile or farm changes); other processes converge
+within LOCAL_TTL. Only the user fields that authentication and permission
+checks read are cached (never the password hash); the rest are deferred
+and load from the database if a view touches them. Device last-seen times are buffered per process and
+written in one batched UPDATE per flush interval.
+"""
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from apps.core.caching import LocalLRU
+
+DEFAULTS = {
+    "ENABLED": True,
+    "LOCAL_TTL": 30,
+    "LOCAL_SIZE": 2048,
+    "SHARED_TTL": 300,
+    "TRACK_DEVICES": True,
+    "DEVICE_HEADER": "HTTP_X_DEVICE_ID",
+    "DEVICE_FLUSH_INTERVAL": 60,
+}
+
+
+def get_token_cache_setting(name):
+    return getattr(settings, "TOKEN_CACHE", {}).get(name, DEFAULTS[name])
+
+
+# User fields kept in the caches
+USER_FIELDS = ["id", "is_active", "is_staff", "is_superuser", "active_farm_id"]
+
+
+def _cache_key(key):
+    return "auth-token:v2:" + hashlib.sha256(key.encode()).hexdigest()[:40]
+
+
+_local = None
+
+
+def get_local_cache():
+    global _local
+    if _local is None:
+        _local = LocalLRU(get_token_cache_setting("LOCAL_SIZE"), get_token_cache_setting("LOCAL_TTL"))
+    return _local
+
+
+def _user_values(user):
+    return {name: getattr(user, name) for name in USER_FIELDS}
+
+
+def _rebuild_user(model, values):
+    """A user with the cached fields loaded and every other field deferred."""
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db("default", names, [values[name] for name in names])
+
+
+def _rebuild(model, values):
+    instance = model(**values)
+    instance._state.adding = False
+    instance._state.db = "default"
+    return instance
+
+
+def get_token(key):
+    """(user, token) for a token key, or None if the key does not exist."""
+    from rest_framework.authtoken.models import Token
+
+    from .models import User
+
+    values = get_local_cache().get(key)
+    if values is None:
+        values = cache.get(_cache_key(key))
+        if values is None:
+            token = Token.objects.select_related("user").filter(key=key).first()
+            if token is None:
+                return None
+            values = _user_values(token.user)
+            cache.set(_cache_key(key), values, get_token_cache_setting("SHARED_TTL"))
+        get_local_cache().set(key, values)
+
+    user = _rebuild_user(User, values)
+    token = _rebuild(Token, {"key": key, "user_id": user.pk})
+    token.user = user
+    return user, token
+
+
+def invalidate(key):
+    get_local_cache().delete(key)
+    cache.delete(_cache_key(key))
+
+
+def invalidate_user(user_id):
+    from rest_framework.authtoken.models import Token
+
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        invalidate(key)
+
+
+class DeviceTracker:
+    """Buffers device sightings and writes them in one UPDATE per interval."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.seen = set()
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def touch(self, user_id, device_id):
+        with self.lock:
+            self.seen.add((user_id, device_id))
+            if time.monotonic() - self.flushed_at < self.interval:
+                return
+            seen, self.seen = self.seen, set()
+            self.flushed_at = time.monotonic()
+        self.flush(seen)
+
+    def flush(self, seen):
+        from django.db.models import Q
+
+        from .models import Device
+
+        if not seen:
+            return
+        now = timezone.now()
+        owned = Q()
+        for user_id, device_id in seen:
+            owned |= Q(user_id=user_id, device_id=device_id)
+        # Devices already marked within the interval (by another process) are skipped
+        stale = Q(last_seen_at__isnull=True) | Q(last_seen_at__lt=now - timedelta(seconds=self.interval))
+        Device.objects.filter(owned).filter(stale).update(last_seen_at=now)
+
+
+_tracker = None
+
+
+def get_device_tracker():
+    global _tracker
+    if _tracker is None:
+        _tracker = DeviceTracker(get_token_cache_setting("DEVICE_FLUSH_INTERVAL"))
+    return _tracker
+
+
+def on_token_delete(sender, instance, **kwargs):
+    invalidate(instance.key)
+
+
+def on_user_save(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        invalidate_user(instance.pk)
+
+
+def connect_signals():
+    """Drop cached tokens on logout and whenever their user changes."""
+    from rest_framework.authtoken.models import Token
+
+    from .models import User
+
+    post_delete.connect(on_token_delete, sender=Token, dispatch_uid="token_cache_token_delete")
+    post_save.connect(on_user_save, sender=User, dispatch_uid="token_cache_user_save")
@@ -27,10 +27,10 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        if user.active_farm:
+        if user.active_farm_id:
             # Return users in the same farm
             return User.objects.filter(
-                farm_memberships__farm=user.active_farm
+                farm_memberships__farm_id=user.active_farm_id
             ).distinct()
         return User.objects.filter(id=user.id)
 
@@ -46,10 +46,8 @@ class FarmViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Farm.objects.filter(
-            memberships__user=self.request.user,
-            memberships__is_active=True,
-        )
+        # Active memberships come from the cached farm context
+        return Farm.objects.filter(id__in=self.request.farm_context.farm_ids)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -106,11 +104,8 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        # Delete the user's token
-        try:
-            request.user.auth_token.delete()
-        except Exception:
-            pass
+        # Delete the user's token (this also drops it from the token cache)
+        Token.objects.filter(user=request.user).delete()
         return Response({"detail": "Successfully logged out"})
 
 
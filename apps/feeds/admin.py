@@ -4,7 +4,7 @@ Koimeret Dairies - Feeds Admin
 from django.contrib import admin
 from django.utils.html import format_html
 
-from .models import FeedItem, FeedPurchase, FeedUsageLog, InventoryBalance, InventoryMovement
+from .models import FeedItem, FeedPurchase, FeedUsageDaily, FeedUsageLog, InventoryBalance, InventoryMovement
 
 
 @admin.register(FeedItem)
@@ -56,3 +56,11 @@ class InventoryMovementAdmin(admin.ModelAdmin):
     raw_id_fields = ["farm", "feed_item", "recorded_by"]
     date_hierarchy = "date"
     readonly_fields = ["farm", "feed_item", "date", "movement_type", "quantity", "unit", "balance_before", "balance_after", "source_type", "source_id", "recorded_by"]
+
+
+@admin.register(FeedUsageDaily)
+class FeedUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ["farm", "date", "category", "quantity_kg", "cost", "log_count"]
+    list_filter = ["category", "farm"]
+    raw_id_fields = ["farm"]
+    date_hierarchy = "date"
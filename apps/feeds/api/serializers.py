@@ -3,7 +3,9 @@ Koimeret Dairies - Feeds API Serializers
 """
 from rest_framework import serializers
 
+from apps.core.fields import ImageVariantsField
 from apps.feeds.models import FeedItem, FeedPurchase, FeedUsageLog, InventoryBalance, InventoryMovement
+from apps.feeds.scans import MAX_BATCH_SIZE
 
 
 class FeedItemSerializer(serializers.ModelSerializer):
@@ -34,12 +36,13 @@ class FeedItemSerializer(serializers.ModelSerializer):
 class FeedPurchaseSerializer(serializers.ModelSerializer):
     feed_item_name = serializers.CharField(source="feed_item.name", read_only=True)
     recorded_by_name = serializers.CharField(source="recorded_by.full_name", read_only=True, allow_null=True)
+    receipt_image_variants = ImageVariantsField(source="receipt_image")
 
     class Meta:
         model = FeedPurchase
         fields = [
             "id", "feed_item", "feed_item_name", "date", "quantity", "unit",
-            "unit_price", "total_cost", "supplier", "receipt_image", "notes",
+            "unit_price", "total_cost", "supplier", "receipt_image", "receipt_image_variants", "notes",
             "recorded_by", "recorded_by_name", "farm", "sync_status",
             "created_at"
         ]
@@ -116,3 +119,14 @@ class QRScanSerializer(serializers.Serializer):
     date = serializers.DateField(required=False)
     cow_id = serializers.IntegerField(required=False, allow_null=True)
     notes = serializers.CharField(required=False, allow_blank=True)
+
+
+class QueuedScanSerializer(QRScanSerializer):
+    """One scan from a device's offline queue."""
+    local_id = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+
+class QRScanBatchSerializer(serializers.Serializer):
+    """Serializer for posting a batch of queued QR scans."""
+    device_id = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    scans = QueuedScanSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SIZE)
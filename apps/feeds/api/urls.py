@@ -10,6 +10,7 @@ from .views import (
     FeedUsageLogViewSet,
     InventoryBalanceViewSet,
     InventoryMovementViewSet,
+    QRScanBatchView,
     QRScanView,
 )
 
@@ -22,5 +23,6 @@ router.register(r"inventory/movements", InventoryMovementViewSet, basename="inve
 
 urlpatterns = [
     path("feeds/scan/", QRScanView.as_view(), name="qr-scan"),
+    path("feeds/scan/batch/", QRScanBatchView.as_view(), name="qr-scan-batch"),
     path("", include(router.urls)),
 ]
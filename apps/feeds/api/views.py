@@ -13,8 +13,12 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from apps.core.archive import parse_range, read_history
+from apps.core.routers import replica_action
+from apps.core.versions import conditional, versioned_cache
+from apps.feeds.efficiency import GROUP_BY_CHOICES, compute_efficiency
 from apps.feeds.models import FeedItem, FeedPurchase, FeedUsageLog, InventoryBalance, InventoryMovement
-from apps.dairy.models import Cow
+from apps.feeds.scans import apply_scans
 from .serializers import (
     FeedItemSerializer,
     FeedPurchaseSerializer,
@@ -22,6 +26,7 @@ from .serializers import (
     FeedUsageCreateSerializer,
     InventoryBalanceSerializer,
     InventoryMovementSerializer,
+    QRScanBatchSerializer,
     QRScanSerializer,
 )
 
@@ -45,6 +50,11 @@ class FeedItemViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(farm=self.request.user.active_farm)
 
+    # current_stock.days_remaining is estimated from the last 30 days of usage, so lists change daily
+    @conditional("feeds.FeedItem", "feeds.InventoryBalance", "feeds.FeedUsageLog", daily=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"])
     def by_qr(self, request):
         """Look up feed item by QR code."""
@@ -126,6 +136,62 @@ class FeedUsageLogViewSet(viewsets.ModelViewSet):
         serializer = FeedUsageLogSerializer(logs, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    @replica_action
+    def history(self, request):
+        """Get feed usage for a date range, including archived months."""
+        try:
+            date_from, date_to = parse_range(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if not date_from:
+            return Response({"error": "date_from required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        if request.query_params.get("feed_item"):
+            try:
+                filters["feed_item_id"] = int(request.query_params["feed_item"])
+            except ValueError:
+                return Response({"error": "feed_item must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        logs = read_history(FeedUsageLog, request.user.active_farm, date_from, date_to, **filters)
+        serializer = FeedUsageLogSerializer(logs, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    @replica_action
+    def efficiency(self, request):
+        """
+        Liters per kg of feed and feed cost per liter over rolling windows.
+        Query params: group_by (farm, category or cow), window (days), periods.
+        """
+        farm = request.user.active_farm
+        if not farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = request.query_params.get("group_by", "farm")
+        if group_by not in GROUP_BY_CHOICES:
+            return Response(
+                {"error": f"group_by must be one of {', '.join(GROUP_BY_CHOICES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            window = int(request.query_params.get("window", 7))
+            periods = int(request.query_params.get("periods", 4))
+        except ValueError:
+            return Response({"error": "window and periods must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= window <= 366 or not 1 <= periods <= 104:
+            return Response(
+                {"error": "window must be 1-366 days and periods 1-104"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({
+            "group_by": group_by,
+            "window_days": window,
+            "windows": compute_efficiency([farm.id], group_by, window, periods),
+        })
+
 
 class InventoryBalanceViewSet(viewsets.ReadOnlyModelViewSet):
     """Inventory balance endpoints (read-only)."""
@@ -141,6 +207,11 @@ class InventoryBalanceViewSet(viewsets.ReadOnlyModelViewSet):
             return InventoryBalance.objects.filter(farm=user.active_farm).select_related("feed_item")
         return InventoryBalance.objects.none()
 
+    # days_remaining is estimated from the last 30 days of usage, so lists change daily
+    @conditional("feeds.InventoryBalance", "feeds.FeedItem", "feeds.FeedUsageLog", daily=True)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=["get"])
     def low_stock(self, request):
         """Get items with low stock."""
@@ -152,6 +223,9 @@ class InventoryBalanceViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @conditional("feeds.InventoryBalance", "feeds.FeedItem")
+    @versioned_cache("feeds.InventoryBalance", "feeds.FeedItem")
+    @replica_action
     def summary(self, request):
         """Get inventory summary."""
         queryset = self.get_queryset()
@@ -197,6 +271,28 @@ class InventoryMovementViewSet(viewsets.ReadOnlyModelViewSet):
             return InventoryMovement.objects.filter(farm=user.active_farm)
         return InventoryMovement.objects.none()
 
+    @action(detail=False, methods=["get"])
+    @replica_action
+    def history(self, request):
+        """Get inventory movements for a date range, including archived months."""
+        try:
+            date_from, date_to = parse_range(request.query_params)
+        except ValueError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        if not date_from:
+            return Response({"error": "date_from required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filters = {}
+        if request.query_params.get("feed_item"):
+            try:
+                filters["feed_item_id"] = int(request.query_params["feed_item"])
+            except ValueError:
+                return Response({"error": "feed_item must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        movements = read_history(InventoryMovement, request.user.active_farm, date_from, date_to, **filters)
+        serializer = InventoryMovementSerializer(movements, many=True)
+        return Response(serializer.data)
+
 
 class QRScanView(APIView):
     """Handle QR code scanning for quick feed usage logging."""
@@ -205,7 +301,6 @@ class QRScanView(APIView):
     def post(self, request):
         serializer = QRScanSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        data = serializer.validated_data
 
         user = request.user
         if not user.active_farm:
@@ -214,43 +309,43 @@ class QRScanView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Find feed item by QR code
-        try:
-            feed_item = FeedItem.objects.get(
-                farm=user.active_farm,
-                qr_code=data["qr_code"],
-            )
-        except FeedItem.DoesNotExist:
+        logs, _, errors = apply_scans(user.active_farm, user, [serializer.validated_data])
+        if errors:
             return Response(
-                {"error": "Feed item not found for QR code"},
+                {"error": errors[0]["error"]},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get optional cow
-        cow = None
-        if data.get("cow_id"):
-            try:
-                cow = Cow.objects.get(
-                    farm=user.active_farm,
-                    id=data["cow_id"],
-                )
-            except Cow.DoesNotExist:
-                pass
-
-        # Create usage log
-        usage_log = FeedUsageLog.objects.create(
-            farm=user.active_farm,
-            feed_item=feed_item,
-            date=data.get("date", date.today()),
-            quantity=data["quantity"],
-            unit=feed_item.unit,
-            cow=cow,
-            scan_method="qr_scan",
-            logged_by=user,
-            notes=data.get("notes", ""),
+        return Response(
+            FeedUsageLogSerializer(logs[0]).data,
+            status=status.HTTP_201_CREATED
         )
 
+
+class QRScanBatchView(APIView):
+    """Apply a device's queued offline QR scans in one request."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = QRScanBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        user = request.user
+        if not user.active_farm:
+            return Response(
+                {"error": "No active farm"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logs, duplicates, errors = apply_scans(
+            user.active_farm, user, data["scans"], device_id=data.get("device_id", "")
+        )
         return Response(
-            FeedUsageLogSerializer(usage_log).data,
-            status=status.HTTP_201_CREATED
+            {
+                "created": [{"id": log.id, "local_id": log.local_id} for log in logs],
+                "duplicates": duplicates,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED if logs else status.HTTP_200_OK
         )
@@ -0,0 +1,251 @@
+"""
+Koimeret Dairies - Feed Efficiency
+
+Relates feed to milk output: liters of milk per kg of feed and feed cost per
+liter, per farm, feed category or cow, over consecutive rolling windows.
+
+Each report is two grouped aggregations, feed usage and milk, bucketed into
+windows in SQL and merged in memory. Farm and category reports over long
+ranges read the daily rollups (FeedUsageDaily, MilkProductionSummary) for
+past days and the raw logs only for today.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from apps.core.archive import archived_months, exclude_months
+from apps.dairy.models import Cow, MilkLog, MilkProductionSummary
+from apps.dairy.summaries import refresh_milk_summaries
+
+from .models import FeedItem, FeedUsageDaily, FeedUsageLog
+
+GROUP_BY_CHOICES = ("farm", "category", "cow")
+
+# Ranges at least this long use the daily rollups (farm and category only)
+ROLLUP_MIN_DAYS = 90
+
+# Nightly refresh re-covers this many days so late entries are picked up
+REFRESH_DAYS = 7
+
+ZERO = Decimal("0")
+
+
+def _money():
+    return DecimalField(max_digits=14, decimal_places=2)
+
+
+def get_windows(window_days, periods, date_to=None):
+    """Consecutive (date_from, date_to) windows ending on date_to, newest first."""
+    date_to = date_to or date.today()
+    windows = []
+    for index in range(periods):
+        end = date_to - timedelta(days=index * window_days)
+        windows.append((end - timedelta(days=window_days - 1), end))
+    return windows
+
+
+def _window_case(windows):
+    return Case(
+        *[When(date__range=bounds, then=Value(index)) for index, bounds in enumerate(windows)],
+        output_field=IntegerField(),
+    )
+
+
+def _feed_cost():
+    return Coalesce(
+        Sum(F("quantity") * F("feed_item__cost_per_unit"), output_field=_money()),
+        Value(ZERO),
+        output_field=_money(),
+    )
+
+
+def _live_feed(farm_ids, windows, group_by, date_from, date_to):
+    fields = ["farm_id", "window"]
+    queryset = FeedUsageLog.objects.filter(farm_id__in=farm_ids, date__gte=date_from, date__lte=date_to)
+    if group_by == "category":
+        queryset = queryset.annotate(group_key=F("feed_item__category"))
+        fields.append("group_key")
+    elif group_by == "cow":
+        queryset = queryset.filter(cow__isnull=False).annotate(group_key=F("cow_id"))
+        fields.append("group_key")
+
+    return queryset.annotate(window=_window_case(windows)).values(*fields).annotate(
+        feed_kg=Coalesce(Sum("quantity", filter=Q(unit="kg")), Value(ZERO), output_field=_money()),
+        feed_cost=_feed_cost(),
+    ).order_by()
+
+
+def _rollup_feed(farm_ids, windows, group_by, date_from, date_to):
+    fields = ["farm_id", "window"]
+    queryset = FeedUsageDaily.objects.filter(farm_id__in=farm_ids, date__gte=date_from, date__lte=date_to)
+    if group_by == "category":
+        queryset = queryset.annotate(group_key=F("category"))
+        fields.append("group_key")
+
+    return queryset.annotate(window=_window_case(windows)).values(*fields).annotate(
+        feed_kg=Sum("quantity_kg"),
+        feed_cost=Sum("cost"),
+    ).order_by()
+
+
+def _live_milk(farm_ids, windows, by_cow, date_from, date_to):
+    fields = ["farm_id", "window"]
+    queryset = MilkLog.objects.filter(
+        farm_id__in=farm_ids, is_latest=True, date__gte=date_from, date__lte=date_to
+    )
+    if by_cow:
+        queryset = queryset.annotate(group_key=F("cow_id"))
+        fields.append("group_key")
+
+    return queryset.annotate(window=_window_case(windows)).values(*fields).annotate(
+        liters=Sum("liters"),
+    ).order_by()
+
+
+def _rollup_milk(farm_ids, windows, date_from, date_to):
+    queryset = MilkProductionSummary.objects.filter(
+        farm_id__in=farm_ids, date__gte=date_from, date__lte=date_to
+    )
+    return queryset.annotate(window=_window_case(windows)).values("farm_id", "window").annotate(
+        liters=Sum("total_liters"),
+    ).order_by()
+
+
+def _ratio(numerator, denominator, places):
+    if not denominator:
+        return None
+    return round(float(numerator) / float(denominator), places)
+
+
+def compute_efficiency(farm_ids, group_by="farm", window_days=7, periods=4, date_to=None):
+    """
+    Feed conversion per window for the given farms.
+
+    Only usage logged in kg counts towards feed_kg; feed_cost is quantity
+    times the feed item's cost_per_unit for every log. In category reports
+    each category is set against the farm's whole milk output, so
+    liters_per_kg reads "liters produced per kg of this category fed".
+    Returns a list of {"date_from", "date_to", "rows"} newest first.
+    """
+    if group_by not in GROUP_BY_CHOICES:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_CHOICES)}")
+
+    windows = get_windows(window_days, periods, date_to)
+    range_from, range_to = windows[-1][0], windows[0][1]
+
+    today = date.today()
+    use_rollups = group_by != "cow" and (range_to - range_from).days + 1 >= ROLLUP_MIN_DAYS
+    if use_rollups:
+        rollup_to = min(range_to, today - timedelta(days=1))
+        feed_rows = list(_rollup_feed(farm_ids, windows, group_by, range_from, rollup_to))
+        milk_rows = list(_rollup_milk(farm_ids, windows, range_from, rollup_to))
+        if range_to >= today:
+            feed_rows += list(_live_feed(farm_ids, windows, group_by, today, range_to))
+            milk_rows += list(_live_milk(farm_ids, windows, False, today, range_to))
+    else:
+        feed_rows = list(_live_feed(farm_ids, windows, group_by, range_from, range_to))
+        milk_rows = list(_live_milk(farm_ids, windows, group_by == "cow", range_from, range_to))
+
+    # Merge both aggregations on (window, farm, group key)
+    totals = {}
+    for row in feed_rows:
+        key = (row["window"], row["farm_id"], row.get("group_key"))
+        entry = totals.setdefault(key, {"feed_kg": ZERO, "feed_cost": ZERO, "liters": ZERO})
+        entry["feed_kg"] += row["feed_kg"] or ZERO
+        entry["feed_cost"] += row["feed_cost"] or ZERO
+
+    if group_by == "category":
+        farm_liters = {}
+        for row in milk_rows:
+            key = (row["window"], row["farm_id"])
+            farm_liters[key] = farm_liters.get(key, ZERO) + (row["liters"] or ZERO)
+        for (window, farm_id, _), entry in totals.items():
+            entry["liters"] = farm_liters.get((window, farm_id), ZERO)
+    else:
+        for row in milk_rows:
+            key = (row["window"], row["farm_id"], row.get("group_key"))
+            entry = totals.setdefault(key, {"feed_kg": ZERO, "feed_cost": ZERO, "liters": ZERO})
+            entry["liters"] += row["liters"] or ZERO
+
+    cow_labels = {}
+    if group_by == "cow":
+        cow_ids = {key[2] for key in totals}
+        cow_labels = {
+            cow_id: (tag, name)
+            for cow_id, tag, name in Cow.objects.filter(id__in=cow_ids).values_list("id", "tag_number", "name")
+        }
+    category_labels = dict(FeedItem.CATEGORY_CHOICES)
+
+    results = [
+        {"date_from": start, "date_to": end, "rows": []}
+        for start, end in windows
+    ]
+    for (window, farm_id, group_key), entry in sorted(totals.items(), key=lambda item: (item[0][1], str(item[0][2]))):
+        row = {"farm_id": farm_id}
+        if group_by == "category":
+            row["category"] = group_key
+            row["category_display"] = str(category_labels.get(group_key, group_key))
+        elif group_by == "cow":
+            tag, name = cow_labels.get(group_key, ("", ""))
+            row.update({"cow_id": group_key, "cow_tag": tag, "cow_name": name})
+        row.update({
+            "feed_kg": entry["feed_kg"],
+            "feed_cost": entry["feed_cost"],
+            "liters": entry["liters"],
+            "liters_per_kg": _ratio(entry["liters"], entry["feed_kg"], 3),
+            "cost_per_liter": _ratio(entry["feed_cost"], entry["liters"], 2),
+        })
+        results[window]["rows"].append(row)
+    return results
+
+
+def refresh_feed_rollups(date_from, date_to, farm_ids=None):
+    """Recompute FeedUsageDaily rows for a date range. Returns rows written."""
+    logs = FeedUsageLog.objects.filter(date__gte=date_from, date__lte=date_to)
+    rollups = FeedUsageDaily.objects.filter(date__gte=date_from, date__lte=date_to)
+    if farm_ids:
+        logs = logs.filter(farm_id__in=farm_ids)
+        rollups = rollups.filter(farm_id__in=farm_ids)
+    # Archived months keep their rollups; their logs are no longer in the hot table
+    archived = archived_months(FeedUsageLog._meta.label, date_from, date_to, farm_ids)
+    logs = exclude_months(logs, archived)
+    rollups = exclude_months(rollups, archived)
+
+    rows = logs.values("farm_id", "date", "feed_item__category").annotate(
+        feed_kg=Coalesce(Sum("quantity", filter=Q(unit="kg")), Value(ZERO), output_field=_money()),
+        feed_cost=_feed_cost(),
+        logs=Count("id"),
+    ).order_by()
+
+    objects = [
+        FeedUsageDaily(
+            farm_id=row["farm_id"],
+            date=row["date"],
+            category=row["feed_item__category"],
+            quantity_kg=row["feed_kg"],
+            cost=row["feed_cost"],
+            log_count=row["logs"],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        rollups.delete()
+        FeedUsageDaily.objects.bulk_create(objects, batch_size=1000)
+    return len(objects)
+
+
+def refresh_rollups(date_from=None, date_to=None, farm_ids=None):
+    """
+    Refresh both daily rollups used by efficiency reports.
+    Defaults to the last REFRESH_DAYS days up to yesterday.
+    """
+    date_to = date_to or date.today() - timedelta(days=1)
+    date_from = date_from or date_to - timedelta(days=REFRESH_DAYS - 1)
+    return {
+        "milk_summaries": refresh_milk_summaries(date_from, date_to, farm_ids),
+        "feed_rollups": refresh_feed_rollups(date_from, date_to, farm_ids),
+    }
@@ -0,0 +1,39 @@
+"""
+Rebuild the daily milk and feed rollups used by feed efficiency reports
+Run: python manage.py refreshrollups --days 365
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild MilkProductionSummary and FeedUsageDaily rows for a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Number of days up to yesterday to rebuild (default: 7)",
+        )
+        parser.add_argument(
+            "--farm",
+            type=int,
+            action="append",
+            dest="farms",
+            help="Restrict to a farm ID (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        from apps.feeds.efficiency import refresh_rollups
+
+        date_to = date.today() - timedelta(days=1)
+        date_from = date_to - timedelta(days=options["days"] - 1)
+        self.stdout.write(f"Refreshing rollups from {date_from} to {date_to}...")
+
+        written = refresh_rollups(date_from, date_to, options["farms"])
+        for name, count in written.items():
+            self.stdout.write(f"  {name}: {count} rows")
+
+        self.stdout.write(self.style.SUCCESS("Rollups refreshed"))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedusagelog',
+            index=models.Index(fields=['farm', 'date'], name='feeds_usage_farm_date'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['farm', 'date'], name='feeds_movement_farm_date'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0002_auditlog_farm_created_index'),
+        ('feeds', '0002_farm_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(choices=[('concentrate', 'Concentrate'), ('roughage', 'Roughage'), ('supplement', 'Supplement'), ('mineral', 'Mineral'), ('other', 'Other')], max_length=20)),
+                ('quantity_kg', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('log_count', models.PositiveIntegerField(default=0)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_usage_daily', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'feed usage daily rollup',
+                'verbose_name_plural': 'feed usage daily rollups',
+                'ordering': ['-date', 'category'],
+                'unique_together': {('farm', 'date', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0003_feedusagedaily'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['farm', 'qr_code'], name='feeds_item_farm_qr'),
+        ),
+    ]
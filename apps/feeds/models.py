@@ -71,6 +71,9 @@ class FeedItem(TimeStampedModel, FarmScopedModel):
         verbose_name_plural = _("feed items")
         unique_together = ["farm", "name"]
         ordering = ["name"]
+        indexes = [
+            models.Index(fields=["farm", "qr_code"], name="feeds_item_farm_qr"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_category_display()})"
@@ -112,6 +115,8 @@ class FeedPurchase(TimeStampedModel, FarmScopedModel, SyncableModel):
         null=True,
         blank=True,
     )
+    # Set once the size variants exist (apps.core.images)
+    receipt_image_processed = models.BooleanField(default=False, editable=False)
     notes = models.TextField(_("notes"), blank=True)
     recorded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -177,6 +182,9 @@ class FeedUsageLog(TimeStampedModel, FarmScopedModel, SyncableModel):
         verbose_name = _("feed usage log")
         verbose_name_plural = _("feed usage logs")
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["farm", "date"], name="feeds_usage_farm_date"),
+        ]
 
     def __str__(self):
         return f"{self.feed_item} - {self.quantity} {self.unit} on {self.date}"
@@ -295,11 +303,40 @@ class InventoryMovement(TimeStampedModel, FarmScopedModel):
         verbose_name = _("inventory movement")
         verbose_name_plural = _("inventory movements")
         ordering = ["-date", "-created_at"]
+        indexes = [
+            models.Index(fields=["farm", "date"], name="feeds_movement_farm_date"),
+        ]
 
     def __str__(self):
         return f"{self.feed_item} {self.movement_type}: {self.quantity} {self.unit}"
 
 
+class FeedUsageDaily(models.Model):
+    """
+    Daily feed usage per farm and category (rollup for long-range queries).
+    Rebuilt by apps.feeds.efficiency.refresh_feed_rollups.
+    """
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="feed_usage_daily",
+    )
+    date = models.DateField()
+    category = models.CharField(max_length=20, choices=FeedItem.CATEGORY_CHOICES)
+    quantity_kg = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    log_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("feed usage daily rollup")
+        verbose_name_plural = _("feed usage daily rollups")
+        unique_together = ["farm", "date", "category"]
+        ordering = ["-date", "category"]
+
+    def __str__(self):
+        return f"{self.farm} - {self.date} {self.category}: {self.quantity_kg}kg"
+
+
 # Signals to update inventory balances
 @receiver(post_save, sender=FeedPurchase)
 def update_inventory_on_purchase(sender, instance, created, **kwargs):
@@ -0,0 +1,178 @@
+"""
+Koimeret Dairies - QR Scans
+
+Feeding rounds scan feed item QR codes in bursts. Codes are resolved from a
+per-farm map cached under the farm's FeedItem version (apps.core.versions),
+so adding, editing or deleting a feed item invalidates it and a scan does
+not query feed items at all. The map is also kept in each process
+(apps.core.caching), so a burst does not fetch it from Redis per scan.
+
+apply_scans() records a batch of scans - one live scan or a worker's queued
+offline scans - in a single transaction: one insert for the usage logs, one
+locked read and one bulk update of the inventory balances, one insert
+for the movements and one for the change events of all of them
+(apps.core.events). These are the same rows the per-row signals in
+apps.feeds.models write for other usage entries; the logs are audited
+(apps.farm.audit) as if saved one by one.
+"""
+from collections import OrderedDict
+
+from django.utils import timezone
+
+from apps.core.caching import farm_key, fetch
+from apps.core.events import batched
+from apps.core.versions import get_versions
+from apps.farm.audit import record_created
+
+# Versions change the key, so the timeout only bounds memory
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Most scans a single batch request may carry
+MAX_BATCH_SIZE = 500
+
+
+def qr_map(farm_id):
+    """{qr_code: (feed item id, name, unit)} for one farm."""
+    from .models import FeedItem
+
+    version = get_versions(farm_id, ["feeds.FeedItem"])["feeds.FeedItem"]
+
+    def compute():
+        rows = (
+            FeedItem.objects.filter(farm_id=farm_id).exclude(qr_code="")
+            .order_by("pk").values_list("qr_code", "pk", "name", "unit")
+        )
+        return {code: (pk, name, unit) for code, pk, name, unit in rows}
+
+    return fetch(farm_key(farm_id, "feeds-qr-map", version), compute, CACHE_TIMEOUT, local=True)
+
+
+def apply_scans(farm, user, scans, device_id=""):
+    """
+    Record `scans` (dicts with qr_code, quantity and optional date, cow_id,
+    notes and local_id) for `farm`. Scans whose (device_id, local_id) was
+    already recorded are not applied twice, so a client can resend a batch
+    whose response it never received.
+
+    Returns (logs, duplicates, errors): the new FeedUsageLog rows and
+    {"index", "id", "local_id"} / {"index", "qr_code", "error"} entries for
+    the scans that were skipped.
+    """
+    from apps.dairy.models import Cow
+
+    from .models import FeedItem, FeedUsageLog, InventoryBalance, InventoryMovement
+
+    codes = qr_map(farm.id)
+    today = timezone.localdate()
+    errors = []
+    accepted = []
+    for index, scan in enumerate(scans):
+        if scan["qr_code"] not in codes:
+            errors.append({"index": index, "qr_code": scan["qr_code"], "error": "Feed item not found for QR code"})
+        else:
+            accepted.append((index, scan))
+
+    duplicates = []
+    local_ids = {scan.get("local_id") for _, scan in accepted} - {None, ""}
+    if device_id and local_ids:
+        # Limited to the batch's dates so the lookup uses the (farm, date) index
+        recorded = dict(
+            FeedUsageLog.objects.filter(
+                farm=farm,
+                date__in={scan.get("date") or today for _, scan in accepted},
+                device_id=device_id,
+                local_id__in=local_ids,
+            ).values_list("local_id", "id")
+        )
+        fresh = []
+        for index, scan in accepted:
+            local_id = scan.get("local_id")
+            if local_id and local_id in recorded:
+                duplicates.append({"index": index, "id": recorded[local_id], "local_id": local_id})
+            else:
+                if local_id:
+                    # Repeated within the batch: the first copy wins
+                    recorded[local_id] = None
+                fresh.append((index, scan))
+        accepted = fresh
+
+    if not accepted:
+        return [], duplicates, errors
+
+    cow_ids = {scan["cow_id"] for _, scan in accepted if scan.get("cow_id")}
+    # Unknown cows are dropped rather than failing the scan, as for single scans
+    cows = Cow.objects.filter(farm=farm).in_bulk(cow_ids) if cow_ids else {}
+
+    items = {}
+    logs = []
+    for _, scan in accepted:
+        pk, name, unit = codes[scan["qr_code"]]
+        if pk not in items:
+            # Built from the cached map so serializing the logs needs no query
+            items[pk] = FeedItem(pk=pk, farm_id=farm.id, name=name, unit=unit, qr_code=scan["qr_code"])
+        logs.append(FeedUsageLog(
+            farm=farm,
+            feed_item=items[pk],
+            date=scan.get("date") or today,
+            quantity=scan["quantity"],
+            unit=unit,
+            cow=cows.get(scan.get("cow_id")),
+            scan_method="qr_scan",
+            logged_by=user,
+            notes=scan.get("notes", ""),
+            device_id=device_id if scan.get("local_id") else "",
+            local_id=scan.get("local_id") or "",
+        ))
+
+    with batched():
+        logs = FeedUsageLog.objects.bulk_create(logs)
+        record_created(logs, user=user)
+
+        usage = OrderedDict()
+        for log in logs:
+            usage.setdefault(log.feed_item_id, []).append(log)
+        balances = InventoryBalance.objects.select_for_update().filter(feed_item_id__in=usage)
+        balances = {balance.feed_item_id: balance for balance in balances}
+        missing = [pk for pk in usage if pk not in balances]
+        if missing:
+            InventoryBalance.objects.bulk_create(
+                [InventoryBalance(farm=farm, feed_item_id=pk, unit=items[pk].unit) for pk in missing],
+                ignore_conflicts=True,
+            )
+            balances.update(
+                (balance.feed_item_id, balance)
+                for balance in InventoryBalance.objects.select_for_update().filter(feed_item_id__in=missing)
+            )
+
+        now = timezone.now()
+        movements = []
+        for pk, item_logs in usage.items():
+            balance = balances[pk]
+            for log in item_logs:
+                before = balance.quantity_on_hand
+                balance.quantity_on_hand = before - log.quantity
+                movements.append(InventoryMovement(
+                    farm=farm,
+                    feed_item_id=pk,
+                    date=log.date,
+                    movement_type="usage_out",
+                    quantity=-log.quantity,
+                    unit=log.unit,
+                    balance_before=before,
+                    balance_after=balance.quantity_on_hand,
+                    source_type="FeedUsageLog",
+                    source_id=log.id,
+                    recorded_by=user,
+                ))
+            balance.last_usage_at = now
+            balance.updated_at = now
+        InventoryBalance.objects.bulk_update(
+            list(balances.values()), ["quantity_on_hand", "last_usage_at", "updated_at"]
+        )
+        InventoryMovement.objects.bulk_create(movements)
+
+    created = {log.local_id: log.id for log in logs if log.local_id}
+    for duplicate in duplicates:
+        if duplicate["id"] is None:
+            duplicate["id"] = created[duplicate["local_id"]]
+    return logs, duplicates, errors
@@ -0,0 +1,16 @@
+"""
+Koimeret Dairies - Feeds Background Tasks
+"""
+from celery import shared_task
+
+
+@shared_task
+def refresh_efficiency_rollups():
+    """Nightly refresh of the daily milk and feed rollups behind efficiency reports."""
+    from apps.core.routers import replica_reads
+
+    from .efficiency import refresh_rollups
+
+    # Source rows are read from the replica when it is current; rollups are written to the primary
+    with replica_reads():
+        return refresh_rollups()
@@ -3,6 +3,7 @@ Koimeret Dairies - Health API Serializers
 """
 from rest_framework import serializers
 
+from apps.core.fields import ImageVariantsField
 from apps.health.models import HealthEvent, Treatment, Withdrawal, Vaccination, VaccinationSchedule
 
 
@@ -11,13 +12,14 @@ class HealthEventSerializer(serializers.ModelSerializer):
     cow_name = serializers.CharField(source="cow.name", read_only=True)
     reported_by_name = serializers.CharField(source="reported_by.full_name", read_only=True, allow_null=True)
     severity_display = serializers.CharField(source="get_severity_display", read_only=True)
+    photo_variants = ImageVariantsField(source="photo")
 
     class Meta:
         model = HealthEvent
         fields = [
             "id", "cow", "cow_tag", "cow_name", "date", "symptoms",
             "temperature", "diagnosis", "severity", "severity_display",
-            "notes", "photo", "reported_by", "reported_by_name",
+            "notes", "photo", "photo_variants", "reported_by", "reported_by_name",
             "is_resolved", "resolved_at", "farm", "sync_status", "created_at"
         ]
         read_only_fields = ["id", "created_at"]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthevent',
+            name='photo_processed',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
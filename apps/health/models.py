@@ -49,6 +49,8 @@ class HealthEvent(TimeStampedModel, FarmScopedModel, SyncableModel):
         null=True,
         blank=True,
     )
+    # Set once the size variants exist (apps.core.images)
+    photo_processed = models.BooleanField(default=False, editable=False)
     reported_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
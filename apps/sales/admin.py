@@ -3,7 +3,7 @@ Koimeret Dairies - Sales Admin
 """
 from django.contrib import admin
 
-from .models import Buyer, Sale, Payment
+from .models import Buyer, DailyProfitLoss, MilkReconciliation, Sale, Payment
 
 
 @admin.register(Buyer)
@@ -30,3 +30,19 @@ class PaymentAdmin(admin.ModelAdmin):
     search_fields = ["reference", "payer_phone"]
     raw_id_fields = ["farm", "sale", "recorded_by"]
     date_hierarchy = "date"
+
+
+@admin.register(DailyProfitLoss)
+class DailyProfitLossAdmin(admin.ModelAdmin):
+    list_display = ["farm", "date", "revenue", "total_cost", "net_profit", "updated_at"]
+    list_filter = ["farm"]
+    raw_id_fields = ["farm"]
+    date_hierarchy = "date"
+
+
+@admin.register(MilkReconciliation)
+class MilkReconciliationAdmin(admin.ModelAdmin):
+    list_display = ["farm", "date", "produced_liters", "withheld_liters", "sold_liters", "unaccounted_liters", "status"]
+    list_filter = ["status", "farm"]
+    raw_id_fields = ["farm", "alert"]
+    date_hierarchy = "date"
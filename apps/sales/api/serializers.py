@@ -3,7 +3,7 @@ Koimeret Dairies - Sales API Serializers
 """
 from rest_framework import serializers
 
-from apps.sales.models import Buyer, Sale, Payment
+from apps.sales.models import Buyer, MilkReconciliation, Sale, Payment
 
 
 class BuyerSerializer(serializers.ModelSerializer):
@@ -80,3 +80,22 @@ class SaleCreateSerializer(serializers.ModelSerializer):
             validated_data["liters_sold"] * validated_data["price_per_liter"]
         )
         return super().create(validated_data)
+
+
+class MilkReconciliationSerializer(serializers.ModelSerializer):
+    alert_status = serializers.CharField(source="alert.status", read_only=True, allow_null=True)
+
+    class Meta:
+        model = MilkReconciliation
+        fields = [
+            "id", "farm", "date", "produced_liters", "withheld_liters", "sold_liters",
+            "unaccounted_liters", "tolerance_liters", "status", "alert", "alert_status", "updated_at"
+        ]
+        read_only_fields = fields
+
+
+class DeliverySheetSerializer(serializers.Serializer):
+    """A collection-center delivery sheet upload (see apps.sales.deliveries)."""
+    file = serializers.FileField()
+    payment_method = serializers.ChoiceField(choices=Sale.PAYMENT_METHOD_CHOICES, default="credit")
+    paid_status = serializers.ChoiceField(choices=Sale.PAID_STATUS_CHOICES, default="unpaid")
@@ -4,12 +4,14 @@ Koimeret Dairies - Sales API URLs
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import BuyerViewSet, SaleViewSet, PaymentViewSet
+from .views import BuyerViewSet, MilkReconciliationViewSet, SaleViewSet, PaymentViewSet, ProfitLossViewSet
 
 router = DefaultRouter()
 router.register(r"buyers", BuyerViewSet, basename="buyer")
 router.register(r"sales", SaleViewSet, basename="sale")
 router.register(r"payments", PaymentViewSet, basename="payment")
+router.register(r"profit-loss", ProfitLossViewSet, basename="profit-loss")
+router.register(r"milk-reconciliation", MilkReconciliationViewSet, basename="milk-reconciliation")
 
 urlpatterns = [
     path("", include(router.urls)),
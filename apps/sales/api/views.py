@@ -7,18 +7,24 @@ from decimal import Decimal
 from django.db.models import Sum, Count, Avg
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from apps.sales.models import Buyer, Sale, Payment
+from apps.core.routers import replica_action
+from apps.sales.deliveries import DeliverySheetError, import_deliveries
+from apps.sales.models import Buyer, MilkReconciliation, Sale, Payment
+from apps.sales.profitability import AMOUNT_COLUMNS, PERIODS, aggregate
 from apps.health.models import Withdrawal
 from .serializers import (
     BuyerSerializer,
     SaleSerializer,
     SaleCreateSerializer,
     PaymentSerializer,
+    MilkReconciliationSerializer,
+    DeliverySheetSerializer,
 )
 
 
@@ -82,6 +88,7 @@ class SaleViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @replica_action
     def summary(self, request):
         """Get sales summary."""
         queryset = self.get_queryset()
@@ -147,6 +154,33 @@ class SaleViewSet(viewsets.ModelViewSet):
             "message": "No active withdrawal periods",
         })
 
+    @action(detail=False, methods=["post"], parser_classes=[MultiPartParser, FormParser])
+    def import_deliveries(self, request):
+        """
+        Import a collection-center delivery sheet (CSV with date, buyer,
+        liters, price_per_liter and optional notes columns).
+        """
+        farm = request.user.active_farm
+        if not farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = DeliverySheetSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = import_deliveries(
+                farm,
+                request.user,
+                serializer.validated_data["file"].read(),
+                payment_method=serializer.validated_data["payment_method"],
+                paid_status=serializer.validated_data["paid_status"],
+            )
+        except DeliverySheetError as error:
+            return Response(
+                {"error": "Delivery sheet not imported", "errors": error.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(result, status=status.HTTP_201_CREATED if result["created"] else status.HTTP_200_OK)
+
     @action(detail=False, methods=["get"])
     def unpaid(self, request):
         """Get unpaid/partial sales."""
@@ -190,3 +224,78 @@ class PaymentViewSet(viewsets.ModelViewSet):
             elif sale.amount_paid > 0:
                 sale.paid_status = "partial"
             sale.save()
+
+
+class MilkReconciliationViewSet(viewsets.ReadOnlyModelViewSet):
+    """Daily milk produced against withheld and sold (see apps.sales.reconciliation)."""
+    serializer_class = MilkReconciliationSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = ["status", "date"]
+    ordering = ["-date"]
+
+    def get_queryset(self):
+        user = self.request.user
+        if user.active_farm:
+            queryset = MilkReconciliation.objects.filter(farm=user.active_farm)
+            date_from = self.request.query_params.get("date_from")
+            date_to = self.request.query_params.get("date_to")
+            if date_from:
+                queryset = queryset.filter(date__gte=date_from)
+            if date_to:
+                queryset = queryset.filter(date__lte=date_to)
+            return queryset.select_related("alert")
+        return MilkReconciliation.objects.none()
+
+    @action(detail=True, methods=["get"])
+    @replica_action
+    def buyers(self, request, pk=None):
+        """Liters and revenue per buyer on the reconciled day."""
+        record = self.get_object()
+        rows = Sale.objects.filter(farm_id=record.farm_id, date=record.date).values(
+            "buyer", "buyer__name", "channel",
+        ).annotate(
+            liters=Sum("liters_sold"),
+            revenue=Sum("total_amount"),
+            sales=Count("id"),
+        ).order_by("-liters")
+        return Response({
+            "reconciliation": MilkReconciliationSerializer(record).data,
+            "buyers": list(rows),
+        })
+
+
+class ProfitLossViewSet(viewsets.ViewSet):
+    """Profit and loss per month, quarter or year from the daily rollup."""
+    permission_classes = [IsAuthenticated]
+
+    @replica_action
+    def list(self, request):
+        """
+        Get P&L per period.
+        Query params: period (month, quarter or year), date_from, date_to.
+        """
+        farm = request.user.active_farm
+        if not farm:
+            return Response({"error": "No active farm"}, status=status.HTTP_400_BAD_REQUEST)
+
+        period = request.query_params.get("period", "month")
+        if period not in PERIODS:
+            return Response(
+                {"error": f"period must be one of {', '.join(PERIODS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = aggregate(
+            farm,
+            period,
+            request.query_params.get("date_from"),
+            request.query_params.get("date_to"),
+        )
+        totals = {column: sum((row[column] or Decimal("0") for row in rows), Decimal("0")) for column in AMOUNT_COLUMNS}
+
+        return Response({
+            "period": period,
+            "totals": totals,
+            "periods": rows,
+        })
@@ -6,3 +6,7 @@ class SalesConfig(AppConfig):
     name = 'apps.sales'
     label = 'sales'
     verbose_name = 'Sales & Payments'
+
+    def ready(self):
+        from .profitability import connect_signals
+        connect_signals()
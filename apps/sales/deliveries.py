@@ -0,0 +1,171 @@
+"""
+Koimeret Dairies - Collection-Center Delivery Sheets
+
+Imports milk delivered to dairy collection centers from a CSV delivery
+sheet: a header row, then one row per delivery with date (YYYY-MM-DD),
+buyer, liters and price_per_liter, plus optional notes. The buyer is the
+name or ID of one of the farm's collection-center buyers.
+
+A sheet is validated as a whole and imported all-or-nothing with one
+bulk_create. Rows matching a sale already recorded (same date, buyer and
+liters) are skipped, so importing a sheet again, or one overlapping
+deliveries entered by hand, does not count them twice. The profit and loss
+rollup of the affected days is recomputed and the new sales are audited
+(apps.farm.audit) in the same transaction, and their milk reconciliation
+is queued once it commits.
+"""
+import csv
+import io
+import logging
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.farm.audit import record_created
+
+from .models import Buyer, Sale
+from .profitability import recompute_days
+from .reconciliation import CENTS, get_reconciliation_setting
+
+logger = logging.getLogger("smartdairy.sales")
+
+CHANNEL = "dairy_collection_center"
+REQUIRED_COLUMNS = ["date", "buyer", "liters", "price_per_liter"]
+
+
+class DeliverySheetError(Exception):
+    """A sheet that cannot be imported; `errors` lists the problems by line."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _amount(value):
+    try:
+        amount = Decimal(value.strip().replace(",", ""))
+    except InvalidOperation:
+        return None
+    return amount.quantize(CENTS) if amount.is_finite() and amount > 0 else None
+
+
+def _buyer_lookup(farm):
+    """The farm's collection-center buyers by ID and by case-insensitive name (None when ambiguous)."""
+    buyers = list(Buyer.objects.filter(farm=farm, buyer_type=CHANNEL, is_active=True).only("id", "name"))
+    by_name = {}
+    for buyer in buyers:
+        name = buyer.name.strip().casefold()
+        by_name[name] = None if name in by_name else buyer
+    return {str(buyer.pk): buyer for buyer in buyers}, by_name
+
+
+def parse(farm, content):
+    """
+    The sheet's rows as dicts of date, buyer, liters, price_per_liter and
+    notes. Raises DeliverySheetError listing every invalid line.
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise DeliverySheetError(["The sheet must be a UTF-8 CSV file"])
+    reader = csv.DictReader(io.StringIO(content))
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        raise DeliverySheetError([f"Missing column(s): {', '.join(missing)}"])
+
+    by_id, by_name = _buyer_lookup(farm)
+    today = timezone.localdate()
+    max_rows = get_reconciliation_setting("MAX_IMPORT_ROWS")
+    rows, errors = [], []
+    for line, record in enumerate(reader, 2):
+        if len(rows) + len(errors) >= max_rows:
+            raise DeliverySheetError([f"A sheet may have at most {max_rows} rows"])
+        values = {column: (record.get(column) or "").strip() for column in REQUIRED_COLUMNS + ["notes"]}
+        if not any(values.values()):
+            continue
+        problems = []
+        day = parse_date(values["date"]) if values["date"] else None
+        if day is None:
+            problems.append(f"invalid date {values['date']!r}")
+        elif day > today:
+            problems.append(f"date {day} is in the future")
+        buyer_name = values["buyer"]
+        buyer = by_id.get(buyer_name) or by_name.get(buyer_name.casefold())
+        if buyer is None:
+            reason = "matches several buyers" if buyer_name.casefold() in by_name else "is not a collection center buyer"
+            problems.append(f"buyer {buyer_name!r} {reason}")
+        liters = _amount(values["liters"])
+        if liters is None:
+            problems.append(f"invalid liters {values['liters']!r}")
+        price = _amount(values["price_per_liter"])
+        if price is None:
+            problems.append(f"invalid price_per_liter {values['price_per_liter']!r}")
+        if problems:
+            errors.append(f"Line {line}: {', '.join(problems)}")
+            continue
+        rows.append({"date": day, "buyer": buyer, "liters": liters, "price_per_liter": price, "notes": values["notes"]})
+
+    if errors:
+        raise DeliverySheetError(errors)
+    if not rows:
+        raise DeliverySheetError(["The sheet has no deliveries"])
+    return rows
+
+
+def import_deliveries(farm, user, content, payment_method="credit", paid_status="unpaid"):
+    """
+    Import a delivery sheet for a farm. Returns the number of sales created,
+    the rows skipped as already recorded and the dates covered.
+    """
+    rows = parse(farm, content)
+    dates = sorted({row["date"] for row in rows})
+    # Multiset, so a sheet with two equal deliveries on one day keeps both
+    recorded = Counter(
+        Sale.objects.filter(farm=farm, channel=CHANNEL, date__in=dates)
+        .values_list("date", "buyer_id", "liters_sold")
+    )
+
+    sales, skipped = [], 0
+    for row in rows:
+        key = (row["date"], row["buyer"].pk, row["liters"])
+        if recorded[key]:
+            recorded[key] -= 1
+            skipped += 1
+            continue
+        sales.append(Sale(
+            farm=farm,
+            date=row["date"],
+            buyer=row["buyer"],
+            channel=CHANNEL,
+            liters_sold=row["liters"],
+            price_per_liter=row["price_per_liter"],
+            total_amount=(row["liters"] * row["price_per_liter"]).quantize(CENTS),
+            payment_method=payment_method,
+            paid_status=paid_status,
+            recorded_by=user,
+            notes=row["notes"],
+        ))
+
+    with transaction.atomic():
+        Sale.objects.bulk_create(sales, batch_size=500)
+        if sales:
+            # bulk_create skips the rollup and audit signals
+            recompute_days(farm.pk, {sale.date for sale in sales})
+            record_created(sales, user=user)
+            transaction.on_commit(lambda: queue_reconciliation(farm.pk, dates))
+    return {"created": len(sales), "skipped": skipped, "dates": dates}
+
+
+def queue_reconciliation(farm_id, dates):
+    from .tasks import reconcile_milk
+
+    try:
+        reconcile_milk.delay(min(dates).isoformat(), max(dates).isoformat(), [farm_id])
+    except Exception:
+        # The nightly run reconciles the recent days anyway
+        logger.warning("Could not queue milk reconciliation for farm %s", farm_id, exc_info=True)
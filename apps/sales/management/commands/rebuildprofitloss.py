@@ -0,0 +1,32 @@
+"""
+Recompute the daily profit and loss rollup from source records
+Run: python manage.py rebuildprofitloss
+"""
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+
+class Command(BaseCommand):
+    help = "Recompute DailyProfitLoss rows from sales, feed purchases, treatments, vaccinations and cows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--farm",
+            type=int,
+            action="append",
+            dest="farms",
+            help="Restrict to a farm ID (repeatable)",
+        )
+        parser.add_argument("--date-from", type=parse_date, help="First date to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--date-to", type=parse_date, help="Last date to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        from apps.sales.profitability import rebuild
+
+        self.stdout.write("Rebuilding daily profit and loss...")
+        count = rebuild(
+            farm_ids=options["farms"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"{count} daily rows written"))
@@ -0,0 +1,41 @@
+"""
+Reconcile milk produced against milk withheld and sold, raising alerts for discrepancies
+Run: python manage.py reconcilemilk --days 30
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Rebuild MilkReconciliation rows and milk discrepancy alerts for a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=7,
+            help="Number of days up to yesterday to reconcile (default: 7)",
+        )
+        parser.add_argument(
+            "--farm",
+            type=int,
+            action="append",
+            dest="farms",
+            help="Restrict to a farm ID (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        from apps.sales.reconciliation import reconcile
+
+        date_to = timezone.localdate() - timedelta(days=1)
+        date_from = date_to - timedelta(days=options["days"] - 1)
+        self.stdout.write(f"Reconciling milk from {date_from} to {date_to}...")
+
+        result = reconcile(date_from, date_to, options["farms"])
+        self.stdout.write(
+            f"  {result['days']} day(s), {result['discrepancies']} discrepancies, "
+            f"{result['alerts_opened']} alert(s) opened, {result['alerts_resolved']} resolved"
+        )
+        self.stdout.write(self.style.SUCCESS("Milk reconciled"))
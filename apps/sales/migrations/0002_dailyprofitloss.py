@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('farm', '0002_auditlog_farm_created_index'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProfitLoss',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('liters_sold', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('feed_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('treatment_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vaccination_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('livestock_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net_profit', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_profit_loss', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'daily profit and loss',
+                'verbose_name_plural': 'daily profit and loss',
+                'ordering': ['-date'],
+                'unique_together': {('farm', 'date')},
+            },
+        ),
+    ]
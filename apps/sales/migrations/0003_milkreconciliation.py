@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0003_milk_discrepancy_alert_type'),
+        ('farm', '0002_auditlog_farm_created_index'),
+        ('sales', '0002_dailyprofitloss'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MilkReconciliation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('produced_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('withheld_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('sold_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('unaccounted_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tolerance_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('discrepancy', 'Discrepancy')], default='ok', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('alert', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='alerts.alert')),
+                ('farm', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='milk_reconciliations', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'milk reconciliation',
+                'verbose_name_plural': 'milk reconciliations',
+                'ordering': ['-date'],
+                'unique_together': {('farm', 'date')},
+            },
+        ),
+    ]
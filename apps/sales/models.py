@@ -231,3 +231,76 @@ class Payment(TimeStampedModel, FarmScopedModel, SyncableModel):
 
     def __str__(self):
         return f"{self.date}: {self.amount} via {self.get_method_display()}"
+
+
+class DailyProfitLoss(models.Model):
+    """
+    Daily profit and loss per farm (materialised rollup).
+    Kept current by apps.sales.profitability; rebuilt by rebuildprofitloss.
+    """
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="daily_profit_loss",
+    )
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    liters_sold = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    feed_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    treatment_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    vaccination_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    livestock_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net_profit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("daily profit and loss")
+        verbose_name_plural = _("daily profit and loss")
+        unique_together = ["farm", "date"]
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.farm} - {self.date}: {self.net_profit}"
+
+
+class MilkReconciliation(models.Model):
+    """
+    Milk produced against milk withheld and sold per farm and day.
+    Written by apps.sales.reconciliation from the daily summary tables.
+    """
+    STATUS_CHOICES = [
+        ("ok", _("OK")),
+        ("discrepancy", _("Discrepancy")),
+    ]
+
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="milk_reconciliations",
+    )
+    date = models.DateField()
+    produced_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    withheld_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    sold_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Produced - withheld - sold: positive when milk is missing, negative when more was sold than produced
+    unaccounted_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tolerance_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ok")
+    alert = models.ForeignKey(
+        "alerts.Alert",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("milk reconciliation")
+        verbose_name_plural = _("milk reconciliations")
+        unique_together = ["farm", "date"]
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.farm} - {self.date}: {self.unaccounted_liters}L unaccounted"
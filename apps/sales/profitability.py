@@ -0,0 +1,189 @@
+"""
+Koimeret Dairies - Profitability Rollup
+
+DailyProfitLoss holds one row per farm and day: sales revenue against feed
+purchases, treatments, vaccinations and cow purchases. Saving or deleting
+any of those records marks its (farm, date) dirty; dirty days are recomputed
+once when the transaction commits, with one grouped aggregation per source.
+Period reports (month, quarter, year) are summed straight from the rollup.
+"""
+import threading
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import DailyProfitLoss
+
+# (model label, date field, amount field, rollup column)
+SOURCES = [
+    ("sales.Sale", "date", "total_amount", "revenue"),
+    ("sales.Sale", "date", "liters_sold", "liters_sold"),
+    ("feeds.FeedPurchase", "date", "total_cost", "feed_cost"),
+    ("health.Treatment", "date", "cost", "treatment_cost"),
+    ("health.Vaccination", "date", "cost", "vaccination_cost"),
+    ("dairy.Cow", "purchase_date", "purchase_price", "livestock_cost"),
+]
+
+COST_COLUMNS = ["feed_cost", "treatment_cost", "vaccination_cost", "livestock_cost"]
+AMOUNT_COLUMNS = ["revenue", "liters_sold"] + COST_COLUMNS + ["total_cost", "net_profit"]
+
+PERIODS = {
+    "month": TruncMonth,
+    "quarter": TruncQuarter,
+    "year": TruncYear,
+}
+
+ZERO = Decimal("0")
+
+
+def _grouped_sources():
+    """SOURCES grouped per model so each model is aggregated in one query."""
+    grouped = defaultdict(list)
+    for label, date_field, amount_field, column in SOURCES:
+        grouped[(label, date_field)].append((amount_field, column))
+    return grouped
+
+
+def _collect(farm_ids=None, dates=None, date_from=None, date_to=None):
+    """Source amounts as {(farm_id, date): {column: amount}}."""
+    totals = defaultdict(dict)
+    for (label, date_field), columns in _grouped_sources().items():
+        queryset = apps.get_model(label).objects.filter(**{f"{date_field}__isnull": False})
+        if farm_ids:
+            queryset = queryset.filter(farm_id__in=farm_ids)
+        if dates:
+            queryset = queryset.filter(**{f"{date_field}__in": dates})
+        if date_from:
+            queryset = queryset.filter(**{f"{date_field}__gte": date_from})
+        if date_to:
+            queryset = queryset.filter(**{f"{date_field}__lte": date_to})
+
+        rows = queryset.values("farm_id", date_field).annotate(
+            **{column: Sum(amount_field) for amount_field, column in columns}
+        ).order_by()
+        for row in rows:
+            entry = totals[(row["farm_id"], row[date_field])]
+            for _, column in columns:
+                entry[column] = row[column] or ZERO
+    return totals
+
+
+def _build(farm_id, day, amounts):
+    values = {column: amounts.get(column, ZERO) for column in ["revenue", "liters_sold"] + COST_COLUMNS}
+    values["total_cost"] = sum((values[column] for column in COST_COLUMNS), ZERO)
+    values["net_profit"] = values["revenue"] - values["total_cost"]
+    return DailyProfitLoss(farm_id=farm_id, date=day, **values)
+
+
+def recompute_days(farm_id, dates):
+    """Recompute the rollup rows of one farm for the given dates."""
+    dates = sorted(set(dates))
+    totals = _collect(farm_ids=[farm_id], dates=dates)
+    with transaction.atomic():
+        DailyProfitLoss.objects.filter(farm_id=farm_id, date__in=dates).delete()
+        DailyProfitLoss.objects.bulk_create(
+            [_build(farm_id, day, totals[(farm_id, day)]) for day in dates if (farm_id, day) in totals]
+        )
+
+
+def rebuild(farm_ids=None, date_from=None, date_to=None):
+    """Full recompute of the rollup (optionally limited). Returns rows written."""
+    totals = _collect(farm_ids=farm_ids, date_from=date_from, date_to=date_to)
+
+    existing = DailyProfitLoss.objects.all()
+    if farm_ids:
+        existing = existing.filter(farm_id__in=farm_ids)
+    if date_from:
+        existing = existing.filter(date__gte=date_from)
+    if date_to:
+        existing = existing.filter(date__lte=date_to)
+
+    with transaction.atomic():
+        existing.delete()
+        DailyProfitLoss.objects.bulk_create(
+            [_build(farm_id, day, amounts) for (farm_id, day), amounts in totals.items()],
+            batch_size=1000,
+        )
+    return len(totals)
+
+
+def aggregate(farm, period="month", date_from=None, date_to=None):
+    """Period totals for a farm, summed from the daily rollup."""
+    queryset = DailyProfitLoss.objects.filter(farm=farm)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+
+    rows = queryset.annotate(period=PERIODS[period]("date")).values("period").annotate(
+        **{column: Sum(column) for column in AMOUNT_COLUMNS}
+    ).order_by("-period")
+    return list(rows)
+
+
+# Dirty (farm_id, date) pairs waiting for the current transaction to commit
+_pending = threading.local()
+
+
+def mark_dirty(farm_id, day):
+    if farm_id is None or day is None:
+        return
+    dirty = getattr(_pending, "days", None)
+    if dirty is None:
+        dirty = _pending.days = set()
+    dirty.add((farm_id, day))
+    # Several callbacks may be queued; the first one drains the whole set
+    transaction.on_commit(flush)
+
+
+def flush():
+    dirty = getattr(_pending, "days", None)
+    _pending.days = None
+    if not dirty:
+        return
+    by_farm = defaultdict(set)
+    for farm_id, day in dirty:
+        by_farm[farm_id].add(day)
+    for farm_id, days in by_farm.items():
+        recompute_days(farm_id, days)
+
+
+def _date_field(sender):
+    return next(date_field for label, date_field, _, _ in SOURCES if label == sender._meta.label)
+
+
+def on_pre_save(sender, instance, raw=False, **kwargs):
+    # Remember the stored date so moving a record also fixes its old day
+    if raw or instance.pk is None:
+        return
+    date_field = _date_field(sender)
+    instance._profit_loss_previous = (
+        sender.objects.filter(pk=instance.pk).values_list("farm_id", date_field).first()
+    )
+
+
+def on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_profit_loss_previous", None)
+    if previous:
+        mark_dirty(*previous)
+    mark_dirty(instance.farm_id, getattr(instance, _date_field(sender)))
+
+
+def on_delete(sender, instance, **kwargs):
+    mark_dirty(instance.farm_id, getattr(instance, _date_field(sender)))
+
+
+def connect_signals():
+    """Attach rollup hooks to every source model."""
+    for label in {label for label, _, _, _ in SOURCES}:
+        model = apps.get_model(label)
+        pre_save.connect(on_pre_save, sender=model, dispatch_uid=f"profit_loss_pre_save_{label}")
+        post_save.connect(on_save, sender=model, dispatch_uid=f"profit_loss_save_{label}")
+        post_delete.connect(on_delete, sender=model, dispatch_uid=f"profit_loss_delete_{label}")
@@ -0,0 +1,191 @@
+"""
+Koimeret Dairies - Milk Reconciliation
+
+Checks that the milk a farm produced each day was either withheld (cows
+under a milk withdrawal) or sold. Produced and withheld liters are read from
+MilkProductionSummary and sold liters from the DailyProfitLoss rollup, so a
+date range is reconciled with one read of each summary table however many
+farms and days it covers. Results are kept as MilkReconciliation rows.
+
+A day whose unaccounted liters exceed the tolerance (the larger of a fixed
+number of liters and a share of production) raises a milk_discrepancy
+alert. The alert is resolved when a later run finds the day back within
+tolerance, e.g. after a missing delivery sheet was imported. A farm's
+milk_discrepancy AlertRule can disable the alerts or override the tolerance
+through its "tolerance_liters" and "tolerance_percent" parameters.
+
+Only days up to yesterday are reconciled; today's milk is still being
+logged and sold.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DailyProfitLoss, MilkReconciliation
+
+DEFAULTS = {
+    "TOLERANCE_LITERS": 5,
+    "TOLERANCE_PERCENT": 2,
+    # Nightly reconciliation window
+    "DAYS": 7,
+    "MAX_IMPORT_ROWS": 2000,
+}
+
+ALERT_TYPE = "milk_discrepancy"
+
+ZERO = Decimal("0")
+CENTS = Decimal("0.01")
+
+
+def get_reconciliation_setting(name):
+    return getattr(settings, "MILK_RECONCILIATION", {}).get(name, DEFAULTS[name])
+
+
+def tolerance(produced, parameters=None):
+    """Liters a day may be off by before it counts as a discrepancy."""
+    parameters = parameters or {}
+    liters = Decimal(str(parameters.get("tolerance_liters", get_reconciliation_setting("TOLERANCE_LITERS"))))
+    percent = Decimal(str(parameters.get("tolerance_percent", get_reconciliation_setting("TOLERANCE_PERCENT"))))
+    return max(liters, produced * percent / 100).quantize(CENTS)
+
+
+def _alert_rules(farm_ids):
+    """{farm_id: rule} of the farms with a milk_discrepancy alert rule."""
+    from apps.alerts.models import AlertRule
+
+    rules = AlertRule.objects.filter(alert_type=ALERT_TYPE)
+    if farm_ids:
+        rules = rules.filter(farm_id__in=farm_ids)
+    return {rule.farm_id: rule for rule in rules.order_by("-is_enabled")}
+
+
+def describe(record):
+    """The alert message for a reconciled day."""
+    figures = (
+        f"Produced {record.produced_liters} L, withheld {record.withheld_liters} L, "
+        f"sold {record.sold_liters} L"
+    )
+    if record.unaccounted_liters > 0:
+        gap = f"{record.unaccounted_liters} L unaccounted for"
+    else:
+        gap = f"{-record.unaccounted_liters} L more sold than was available"
+    return f"{figures}: {gap} (tolerance {record.tolerance_liters} L)."
+
+
+def _severity(record):
+    return "high" if abs(record.unaccounted_liters) > 2 * record.tolerance_liters else "medium"
+
+
+def _build_alert(record):
+    from apps.alerts.models import Alert
+
+    return Alert(
+        farm_id=record.farm_id,
+        alert_type=ALERT_TYPE,
+        severity=_severity(record),
+        title=f"Milk discrepancy on {record.date}",
+        message=describe(record),
+        entity_type="MilkReconciliation",
+        entity_id=record.pk,
+    )
+
+
+def reconcile(date_from, date_to, farm_ids=None, refresh=True):
+    """
+    Reconcile a date range (refreshing the milk summaries first unless
+    `refresh` is false). Returns counts of days, discrepancies and alerts.
+    """
+    from apps.alerts.models import Alert
+    from apps.dairy.models import MilkProductionSummary
+    from apps.dairy.summaries import refresh_milk_summaries
+
+    result = {"days": 0, "discrepancies": 0, "alerts_opened": 0, "alerts_resolved": 0}
+    date_to = min(date_to, timezone.localdate() - timedelta(days=1))
+    if date_from > date_to:
+        return result
+    if refresh:
+        refresh_milk_summaries(date_from, date_to, farm_ids)
+
+    def scoped(queryset):
+        queryset = queryset.filter(date__gte=date_from, date__lte=date_to)
+        return queryset.filter(farm_id__in=farm_ids) if farm_ids else queryset
+
+    # {(farm_id, date): [produced, withheld, sold]}
+    figures = defaultdict(lambda: [ZERO, ZERO, ZERO])
+    rows = scoped(MilkProductionSummary.objects).values_list("farm_id", "date", "total_liters", "withheld_liters")
+    for farm_id, day, produced, withheld in rows:
+        figures[(farm_id, day)][:2] = [produced, withheld]
+    for farm_id, day, sold in scoped(DailyProfitLoss.objects).values_list("farm_id", "date", "liters_sold"):
+        figures[(farm_id, day)][2] = sold
+    existing = {(record.farm_id, record.date): record for record in scoped(MilkReconciliation.objects).select_related("alert")}
+    for key in existing:
+        # Everything recorded for the day was deleted since the last run
+        figures[key]
+    rules = _alert_rules(farm_ids)
+
+    created, updated, needs_alert, changed_alerts, resolved_alerts = [], [], [], [], []
+    for (farm_id, day), (produced, withheld, sold) in figures.items():
+        rule = rules.get(farm_id)
+        record = existing.get((farm_id, day)) or MilkReconciliation(farm_id=farm_id, date=day)
+        record.produced_liters = produced
+        record.withheld_liters = withheld
+        record.sold_liters = sold
+        record.unaccounted_liters = produced - withheld - sold
+        record.tolerance_liters = tolerance(produced, rule.parameters if rule else None)
+        record.status = "discrepancy" if abs(record.unaccounted_liters) > record.tolerance_liters else "ok"
+
+        alert = record.alert
+        active = alert is not None and alert.status in ("open", "acknowledged")
+        if record.status == "discrepancy":
+            if alert is None and (rule is None or rule.is_enabled):
+                needs_alert.append(record)
+            elif active:
+                alert.message, alert.severity = describe(record), _severity(record)
+                changed_alerts.append(alert)
+            # An alert someone resolved or muted stays that way while the day is off
+        elif alert is not None:
+            if active:
+                resolved_alerts.append(alert.pk)
+            # A new discrepancy on this day will raise a new alert
+            record.alert = None
+        (updated if record.pk else created).append(record)
+
+    fields = [
+        "produced_liters", "withheld_liters", "sold_liters", "unaccounted_liters", "tolerance_liters",
+        "status", "alert", "updated_at",
+    ]
+    now = timezone.now()
+    for record in updated:
+        record.updated_at = now
+    with transaction.atomic():
+        MilkReconciliation.objects.bulk_create(created, batch_size=1000)
+        MilkReconciliation.objects.bulk_update(updated, fields, batch_size=1000)
+        if needs_alert:
+            alerts = Alert.objects.bulk_create([_build_alert(record) for record in needs_alert])
+            for record, alert in zip(needs_alert, alerts):
+                record.alert = alert
+            MilkReconciliation.objects.bulk_update(needs_alert, ["alert"])
+        if changed_alerts:
+            Alert.objects.bulk_update(changed_alerts, ["message", "severity"])
+        if resolved_alerts:
+            Alert.objects.filter(pk__in=resolved_alerts).update(
+                status="resolved", resolved_at=now, resolution_note="Back within tolerance",
+            )
+
+    result.update(
+        days=len(figures),
+        discrepancies=sum(1 for record in created + updated if record.status == "discrepancy"),
+        alerts_opened=len(needs_alert),
+        alerts_resolved=len(resolved_alerts),
+    )
+    return result
+
+
+def reconcile_recent(farm_ids=None):
+    """Reconcile the last DAYS days up to yesterday."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    return reconcile(yesterday - timedelta(days=get_reconciliation_setting("DAYS") - 1), yesterday, farm_ids)
@@ -0,0 +1,34 @@
+"""
+Koimeret Dairies - Sales Background Tasks
+"""
+from datetime import date, timedelta
+
+from celery import shared_task
+
+# Nightly rebuild window; catches changes made without signals (queryset.update)
+REBUILD_DAYS = 7
+
+
+@shared_task
+def rebuild_recent_profit_loss():
+    """Rebuild the last REBUILD_DAYS days of the daily P&L rollup."""
+    from apps.core.routers import replica_reads
+
+    from .profitability import rebuild
+
+    with replica_reads():
+        return rebuild(date_from=date.today() - timedelta(days=REBUILD_DAYS))
+
+
+@shared_task
+def reconcile_milk(date_from=None, date_to=None, farm_ids=None):
+    """
+    Reconcile milk produced against withheld and sold for a date range
+    (ISO dates), or the recent days when none is given.
+    """
+    from .reconciliation import reconcile, reconcile_recent
+
+    # Reads the summaries it has just refreshed, so it stays on the primary
+    if date_from is None:
+        return reconcile_recent(farm_ids)
+    return reconcile(date.fromisoformat(date_from), date.fromisoformat(date_to), farm_ids)
@@ -0,0 +1 @@
+# Koimeret Dairies - Public Showcase App
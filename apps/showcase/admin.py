@@ -0,0 +1,12 @@
+"""
+Koimeret Dairies - Public Showcase Admin
+"""
+from django.contrib import admin
+
+from .models import FarmSnapshot
+
+
+@admin.register(FarmSnapshot)
+class FarmSnapshotAdmin(admin.ModelAdmin):
+    list_display = ["farm", "herd_size", "milking_cows", "daily_liters", "liters_date", "updated_at"]
+    readonly_fields = ["farm", "herd_size", "milking_cows", "daily_liters", "liters_date", "updated_at"]
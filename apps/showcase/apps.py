@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class ShowcaseConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.showcase'
+    label = 'showcase'
+    verbose_name = 'Public Showcase'
+
+    def ready(self):
+        from . import cache
+        cache.connect_signals()
@@ -0,0 +1,99 @@
+"""
+Koimeret Dairies - Showcase Page Cache
+
+Public Wagtail pages are served through wagtail-cache's cache_page on the
+Wagtail serve route only. The global wagtail-cache middleware would also
+cache API responses, whose token-authenticated users look anonymous to it.
+Anonymous hits are answered from the "pages" cache without a database query.
+
+With WAGTAIL_CACHE_KEYRING each cached URL keeps a list of its cache keys.
+Publishing, unpublishing or moving a page purges the page and its parent,
+which may list it. A changed FarmSnapshot purges the home pages showing
+that farm. Browsers get a short max-age so purges reach them quickly.
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from wagtail import views as wagtail_views
+from wagtailcache.cache import cache_page, clear_cache
+from wagtailcache.settings import wagtailcache_settings
+
+logger = logging.getLogger("smartdairy.showcase")
+
+DEFAULTS = {
+    "BROWSER_MAX_AGE": 60,
+}
+
+
+def get_showcase_setting(name):
+    return getattr(settings, "SHOWCASE", {}).get(name, DEFAULTS[name])
+
+
+_cached_serve = cache_page(wagtail_views.serve)
+
+
+def serve(request, path):
+    """wagtail.views.serve behind the full-page cache."""
+    response = _cached_serve(request, path)
+    if response.get(wagtailcache_settings.WAGTAIL_CACHE_HEADER) in ("hit", "miss"):
+        # The stored response carries the server-side timeout as max-age
+        patch_cache_control(response, public=True, max_age=get_showcase_setting("BROWSER_MAX_AGE"))
+    return response
+
+
+def url_pattern(path, subtree=False):
+    """Keyring regex for a URL path on any host (and, with `subtree`, every URL below it)."""
+    return rf"^https?://[^/]+{re.escape(path)}" + ("" if subtree else r"(\?.*)?$")
+
+
+def purge(patterns):
+    if not patterns:
+        return
+    try:
+        clear_cache(patterns)
+    except Exception:
+        # Entries still expire; a cache outage must not fail a publish
+        logger.warning("Could not purge showcase URL(s) %s", patterns, exc_info=True)
+
+
+def purge_pages(pages):
+    purge([url_pattern(parts[2]) for parts in (page.get_url_parts() for page in pages) if parts])
+
+
+def purge_page(page):
+    """Purge a page and its parent from the page cache."""
+    parent = page.get_parent()
+    purge_pages([page] + ([parent] if parent and not parent.is_root() else []))
+
+
+def purge_farm(farm_id):
+    """Purge the live home pages showing a farm's snapshot."""
+    from .models import HomePage
+
+    purge_pages(HomePage.objects.live().filter(farm_id=farm_id))
+
+
+def on_page_change(sender, instance, **kwargs):
+    purge_page(instance)
+
+
+def on_page_move(sender, instance, url_path_before=None, url_path_after=None, **kwargs):
+    if url_path_before == url_path_after:
+        return
+    # Everything cached under the old path, which nothing can be matched from any more
+    site = instance.get_site()
+    root = site.root_page.url_path if site else "/"
+    if url_path_before and url_path_before.startswith(root):
+        purge([url_pattern("/" + url_path_before[len(root):], subtree=True)])
+    purge_page(instance)
+
+
+def connect_signals():
+    """Purge cached showcase pages when Wagtail publishes, unpublishes or moves them."""
+    from wagtail.signals import page_published, page_unpublished, post_page_move
+
+    page_published.connect(on_page_change, dispatch_uid="showcase_cache_published")
+    page_unpublished.connect(on_page_change, dispatch_uid="showcase_cache_unpublished")
+    post_page_move.connect(on_page_move, dispatch_uid="showcase_cache_moved")
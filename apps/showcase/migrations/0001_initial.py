@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+import wagtailcache.cache
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('wagtailcore', '0094_alter_page_locale'),
+        ('farm', '0002_auditlog_farm_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomePage',
+            fields=[
+                ('page_ptr', models.OneToOneField(auto_created=True, on_delete=django.db.models.deletion.CASCADE, parent_link=True, primary_key=True, serialize=False, to='wagtailcore.page')),
+                ('intro', models.TextField(blank=True)),
+                ('farm', models.ForeignKey(blank=True, help_text='Farm whose herd size and daily liters are shown', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'home page',
+            },
+            bases=(wagtailcache.cache.WagtailCacheMixin, 'wagtailcore.page'),
+        ),
+        migrations.CreateModel(
+            name='FarmSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('herd_size', models.PositiveIntegerField(default=0)),
+                ('milking_cows', models.PositiveIntegerField(default=0)),
+                ('daily_liters', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('liters_date', models.DateField(blank=True, help_text='Day the daily liters are for', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('farm', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='showcase_snapshot', to='farm.farm')),
+            ],
+            options={
+                'verbose_name': 'farm snapshot',
+                'verbose_name_plural': 'farm snapshots',
+            },
+        ),
+    ]
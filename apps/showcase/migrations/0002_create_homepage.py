@@ -0,0 +1,75 @@
+import uuid
+
+from django.db import migrations
+
+
+def _next_child_path(Page, parent):
+    last = Page.objects.filter(depth=parent.depth + 1, path__startswith=parent.path).order_by("-path").first()
+    number = int(last.path[-4:], 36) + 1 if last else 1
+    digits = ""
+    while number:
+        number, digit = divmod(number, 36)
+        digits = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"[digit] + digits
+    return parent.path + digits.rjust(4, "0")
+
+
+def create_homepage(apps, schema_editor):
+    """
+    Replace Wagtail's default welcome page with a showcase HomePage, as
+    Wagtail's project template does. Sites already given a page are left alone.
+    """
+    ContentType = apps.get_model("contenttypes.ContentType")
+    Page = apps.get_model("wagtailcore.Page")
+    Site = apps.get_model("wagtailcore.Site")
+    HomePage = apps.get_model("showcase.HomePage")
+
+    root = Page.objects.filter(depth=1).first()
+    if root is None:
+        return
+    site = Site.objects.filter(is_default_site=True).select_related("root_page").first()
+    welcome = site.root_page if site else None
+    page_type = ContentType.objects.get_for_model(Page)
+    if welcome is not None and (welcome.content_type_id != page_type.id or welcome.numchild):
+        return
+
+    content_type, _ = ContentType.objects.get_or_create(app_label="showcase", model="homepage")
+    homepage = HomePage.objects.create(
+        title="Koimeret Dairies",
+        draft_title="Koimeret Dairies",
+        slug="home",
+        content_type=content_type,
+        path=_next_child_path(Page, root),
+        depth=2,
+        numchild=0,
+        url_path="/home/",
+        locale_id=welcome.locale_id if welcome else root.locale_id,
+        translation_key=uuid.uuid4(),
+        live=True,
+    )
+    if site is None:
+        Site.objects.create(hostname="localhost", root_page=homepage, is_default_site=True)
+    else:
+        site.root_page = homepage
+        site.save(update_fields=["root_page"])
+    if welcome is not None:
+        welcome.delete()
+    root.numchild = Page.objects.filter(depth=2, path__startswith=root.path).count()
+    root.save(update_fields=["numchild"])
+
+
+def remove_homepage(apps, schema_editor):
+    # The welcome page is not restored; Site rows pointing at the page go with it
+    apps.get_model("showcase.HomePage").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('showcase', '0001_initial'),
+        ('wagtailcore', '0094_alter_page_locale'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_homepage, remove_homepage),
+    ]
@@ -0,0 +1,62 @@
+"""
+Koimeret Dairies - Public Showcase Models
+"""
+from django.db import models
+from wagtail.admin.panels import FieldPanel
+from wagtail.models import Page
+from wagtailcache.cache import WagtailCacheMixin
+
+
+class FarmSnapshot(models.Model):
+    """
+    Public farm figures, precomputed hourly by apps.showcase.snapshots so
+    showcase pages never aggregate farm data while rendering.
+    """
+    farm = models.OneToOneField(
+        "farm.Farm",
+        on_delete=models.CASCADE,
+        related_name="showcase_snapshot",
+    )
+    herd_size = models.PositiveIntegerField(default=0)
+    milking_cows = models.PositiveIntegerField(default=0)
+    daily_liters = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    liters_date = models.DateField(null=True, blank=True, help_text="Day the daily liters are for")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "farm snapshot"
+        verbose_name_plural = "farm snapshots"
+
+    def __str__(self):
+        return f"{self.farm_id}: {self.herd_size} cows, {self.daily_liters} L"
+
+
+class HomePage(WagtailCacheMixin, Page):
+    """
+    Public landing page. Served from the wagtail-cache full-page cache and
+    purged when it is published, unpublished or moved (apps.showcase.cache).
+    """
+    intro = models.TextField(blank=True)
+    farm = models.ForeignKey(
+        "farm.Farm",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        help_text="Farm whose herd size and daily liters are shown",
+    )
+
+    template = "home.html"
+
+    content_panels = Page.content_panels + [
+        FieldPanel("intro"),
+        FieldPanel("farm"),
+    ]
+
+    class Meta:
+        verbose_name = "home page"
+
+    def get_context(self, request, *args, **kwargs):
+        context = super().get_context(request, *args, **kwargs)
+        context["snapshot"] = FarmSnapshot.objects.filter(farm_id=self.farm_id).first() if self.farm_id else None
+        return context
@@ -0,0 +1,73 @@
+"""
+Koimeret Dairies - Showcase Snapshots
+
+Herd size and daily liters shown on the public pages are precomputed here
+by a Celery task with three grouped queries for all farms, so a traffic
+spike on the showcase never aggregates farm data. Only snapshots whose
+figures changed are written, and only their pages are purged.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+FIELDS = ["herd_size", "milking_cows", "daily_liters", "liters_date"]
+
+
+def refresh_snapshots(farm_ids=None):
+    """Recompute farm snapshots. Returns the number that changed."""
+    from apps.dairy.models import Cow, MilkLog
+    from apps.farm.models import Farm
+
+    from .cache import purge_farm
+    from .models import FarmSnapshot
+
+    farms = Farm.objects.all()
+    if farm_ids:
+        farms = farms.filter(pk__in=farm_ids)
+    farm_ids = list(farms.order_by("pk").values_list("pk", flat=True))
+    if not farm_ids:
+        return 0
+
+    # Yesterday is the last complete milking day
+    day = timezone.localdate() - timedelta(days=1)
+    herds = {
+        row["farm_id"]: row
+        for row in Cow.objects.filter(farm_id__in=farm_ids, is_active=True)
+        .exclude(status__in=["sold", "dead"])
+        .values("farm_id")
+        .annotate(herd=Count("id"), milking=Count("id", filter=Q(status="milking")))
+        .order_by()
+    }
+    liters = dict(
+        MilkLog.objects.filter(farm_id__in=farm_ids, date=day, is_latest=True)
+        .values("farm_id")
+        .annotate(total=Sum("liters"))
+        .order_by()
+        .values_list("farm_id", "total")
+    )
+
+    existing = FarmSnapshot.objects.in_bulk(farm_ids, field_name="farm_id")
+    created, updated = [], []
+    for farm_id in farm_ids:
+        herd = herds.get(farm_id, {})
+        values = {
+            "herd_size": herd.get("herd", 0),
+            "milking_cows": herd.get("milking", 0),
+            "daily_liters": liters.get(farm_id) or 0,
+            "liters_date": day,
+        }
+        snapshot = existing.get(farm_id)
+        if snapshot is None:
+            created.append(FarmSnapshot(farm_id=farm_id, **values))
+        elif any(getattr(snapshot, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(snapshot, field, value)
+            snapshot.updated_at = timezone.now()
+            updated.append(snapshot)
+
+    FarmSnapshot.objects.bulk_create(created, ignore_conflicts=True)
+    FarmSnapshot.objects.bulk_update(updated, FIELDS + ["updated_at"])
+    for snapshot in created + updated:
+        purge_farm(snapshot.farm_id)
+    return len(created) + len(updated)
@@ -0,0 +1,16 @@
+"""
+Koimeret Dairies - Showcase Background Tasks
+"""
+from celery import shared_task
+
+
+@shared_task
+def refresh_showcase_snapshots():
+    """Hourly refresh of the farm figures shown on the public showcase pages."""
+    from apps.core.routers import replica_reads
+
+    from .snapshots import refresh_snapshots
+
+    # Aggregates are read from the replica when it is current; snapshots are written to the primary
+    with replica_reads():
+        return refresh_snapshots()
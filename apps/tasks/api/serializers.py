@@ -3,6 +3,7 @@ Koimeret Dairies - Tasks API Serializers
 """
 from rest_framework import serializers
 
+from apps.core.fields import ImageVariantsField
 from apps.tasks.models import TaskTemplate, TaskInstance, TaskCompletion
 
 
@@ -24,12 +25,13 @@ class TaskTemplateSerializer(serializers.ModelSerializer):
 
 class TaskCompletionSerializer(serializers.ModelSerializer):
     completed_by_name = serializers.CharField(source="completed_by.full_name", read_only=True, allow_null=True)
+    photo_variants = ImageVariantsField(source="photo")
 
     class Meta:
         model = TaskCompletion
         fields = [
             "id", "task", "completed_by", "completed_by_name",
-            "completed_at", "comment", "photo", "created_at"
+            "completed_at", "comment", "photo", "photo_variants", "created_at"
         ]
         read_only_fields = ["id", "created_at"]
 
@@ -4,12 +4,14 @@ Koimeret Dairies - Tasks API URLs
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import TaskTemplateViewSet, TaskInstanceViewSet
+from .views import TaskTemplateViewSet, TaskInstanceViewSet, TodayTasksView
 
 router = DefaultRouter()
 router.register(r"tasks/templates", TaskTemplateViewSet, basename="task-template")
 router.register(r"tasks", TaskInstanceViewSet, basename="task")
 
 urlpatterns = [
+    # Async polling endpoint, matched before the router's detail routes
+    path("tasks/today/", TodayTasksView.as_view(), name="task-today"),
     path("", include(router.urls)),
 ]
@@ -11,6 +11,8 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from apps.core.aio import AsyncAPIView, gather
+from apps.core.versions import conditional
 from apps.tasks.models import TaskTemplate, TaskInstance, TaskCompletion
 from .serializers import (
     TaskTemplateSerializer,
@@ -38,6 +40,10 @@ class TaskTemplateViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(farm=self.request.user.active_farm)
 
+    @conditional("tasks.TaskTemplate")
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
 
 class TaskInstanceViewSet(viewsets.ModelViewSet):
     """Task instance management."""
@@ -64,14 +70,6 @@ class TaskInstanceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(farm=self.request.user.active_farm)
 
-    @action(detail=False, methods=["get"])
-    def today(self, request):
-        """Get today's tasks."""
-        today = date.today()
-        tasks = self.get_queryset().filter(task_date=today)
-        serializer = TaskInstanceSerializer(tasks, many=True)
-        return Response(serializer.data)
-
     @action(detail=False, methods=["get"])
     def my_tasks(self, request):
         """Get tasks assigned to current user."""
@@ -193,3 +191,23 @@ class TaskInstanceViewSet(viewsets.ModelViewSet):
             "created_count": len(created_tasks),
             "tasks": TaskInstanceSerializer(created_tasks, many=True).data,
         })
+
+
+class TodayTasksView(AsyncAPIView):
+    """Get today's tasks (async polling endpoint)."""
+    version_models = ["tasks.TaskInstance"]
+    daily = True
+
+    async def get_data(self, request):
+        farm_id = request.user.active_farm_id
+        if not farm_id:
+            return []
+
+        def load():
+            tasks = TaskInstance.objects.filter(farm_id=farm_id, task_date=date.today()).select_related(
+                "completion__completed_by", "assignee", "assignee_role", "related_cow"
+            )
+            return TaskInstanceSerializer(tasks, many=True).data
+
+        (data,) = await gather(load)
+        return data
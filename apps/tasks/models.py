@@ -145,6 +145,8 @@ class TaskCompletion(TimeStampedModel):
         null=True,
         blank=True,
     )
+    # Set once the size variants exist (apps.core.images)
+    photo_processed = models.BooleanField(default=False, editable=False)
 
     class Meta:
         verbose_name = _("task completion")
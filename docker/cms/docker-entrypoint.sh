@@ -8,17 +8,13 @@ while ! nc -z db 5432; do
 done
 echo "Database is ready!"
 
-# Run migrations
-echo "Running migrations..."
-python manage.py migrate --noinput
-
-# Collect static files
-echo "Collecting static files..."
-python manage.py collectstatic --noinput --clear
-
-# Initialize database with seed data
-echo "Initializing database..."
-python manage.py initdb --skip-if-exists
+# Migrations, static files and seed data in one Django start-up; each step is
+# skipped when nothing changed. Worker and API-only containers set
+# DJANGO_BOOTSTRAP=false and leave this to the cms container.
+if [ "${DJANGO_BOOTSTRAP:-true}" = "true" ]; then
+    echo "Preparing database and static files..."
+    python manage.py bootstrap
+fi
 
 echo "Starting application..."
 exec "$@"
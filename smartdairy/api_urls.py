@@ -0,0 +1,34 @@
+"""
+Koimeret Dairies - API URL Configuration
+
+The /api/v1/ endpoints. smartdairy.urls includes them next to the CMS;
+the slim settings serve them alone.
+"""
+from django.urls import include, path
+
+urlpatterns = [
+    # Dashboard APIs
+    path("api/v1/dashboard/owner/", __import__("apps.core.api", fromlist=["OwnerDashboardView"]).OwnerDashboardView.as_view(), name="owner-dashboard"),
+    path("api/v1/dashboard/worker/", __import__("apps.core.api", fromlist=["WorkerDashboardView"]).WorkerDashboardView.as_view(), name="worker-dashboard"),
+    path("api/v1/dashboard/portfolio/", __import__("apps.core.api", fromlist=["PortfolioView"]).PortfolioView.as_view(), name="portfolio-dashboard"),
+
+    # Request metrics (admin only)
+    path("api/v1/metrics/requests/", __import__("apps.core.api", fromlist=["RequestMetricsView"]).RequestMetricsView.as_view(), name="request-metrics"),
+
+    # Resumable photo uploads
+    path("api/v1/uploads/", __import__("apps.core.api", fromlist=["UploadSessionListView"]).UploadSessionListView.as_view(), name="upload-session-list"),
+    path("api/v1/uploads/<uuid:pk>/", __import__("apps.core.api", fromlist=["UploadSessionView"]).UploadSessionView.as_view(), name="upload-session-detail"),
+
+    # QR label sheets
+    path("api/v1/labels/", __import__("apps.core.api", fromlist=["LabelSheetListView"]).LabelSheetListView.as_view(), name="label-sheet-list"),
+    path("api/v1/labels/<uuid:pk>/", __import__("apps.core.api", fromlist=["LabelSheetView"]).LabelSheetView.as_view(), name="label-sheet-detail"),
+
+    # App APIs
+    path("api/v1/", include("apps.farm.urls")),
+    path("api/v1/", include("apps.dairy.api.urls")),
+    path("api/v1/", include("apps.feeds.api.urls")),
+    path("api/v1/", include("apps.health.api.urls")),
+    path("api/v1/", include("apps.tasks.api.urls")),
+    path("api/v1/", include("apps.sales.api.urls")),
+    path("api/v1/", include("apps.alerts.api.urls")),
+]
@@ -5,6 +5,7 @@ import os
 from pathlib import Path
 
 import environ
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -75,11 +76,16 @@ LOCAL_APPS = [
     "apps.tasks",
     "apps.sales",
     "apps.alerts",
+    "apps.showcase",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + WAGTAIL_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
+# Wagtail and the apps built on it, left out by the slim settings (API-only and worker processes)
+CMS_APPS = WAGTAIL_APPS + ["wagtailcache", "wagtailmetadata", "wagtail_color_panel", "apps.showcase"]
+
 MIDDLEWARE = [
+    "apps.core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -90,6 +96,9 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    "apps.farm.middleware.AuditContextMiddleware",
+    "apps.farm.middleware.FarmContextMiddleware",
+    "apps.core.middleware.ReplicaPinMiddleware",
 ]
 
 ROOT_URLCONF = "smartdairy.urls"
@@ -115,8 +124,68 @@ WSGI_APPLICATION = "smartdairy.wsgi.application"
 ASGI_APPLICATION = "smartdairy.asgi.application"
 
 # Database
+# Connections are kept for DATABASE_CONN_MAX_AGE seconds and health-checked before
+# reuse. Behind pgbouncer in transaction mode, disable server-side cursors.
+DATABASE_CONNECTION = {
+    "CONN_MAX_AGE": env.int("DATABASE_CONN_MAX_AGE", default=60),
+    "CONN_HEALTH_CHECKS": env.bool("DATABASE_CONN_HEALTH_CHECKS", default=True),
+    "DISABLE_SERVER_SIDE_CURSORS": env.bool("DATABASE_DISABLE_SERVER_SIDE_CURSORS", default=False),
+}
 DATABASES = {
-    "default": env.db("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
+    "default": {
+        **env.db("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+        **DATABASE_CONNECTION,
+    }
+}
+
+# Optional read replica for summaries, analytics and rollup tasks (see apps.core.routers)
+if env("DATABASE_REPLICA_URL", default=""):
+    DATABASES["replica"] = {
+        **env.db("DATABASE_REPLICA_URL"),
+        **DATABASE_CONNECTION,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["apps.core.routers.ReplicaRouter"]
+DATABASE_REPLICA = {
+    # Seconds a user's replica reads stay on the primary after they write
+    "STICKY_SECONDS": env.int("DATABASE_REPLICA_STICKY_SECONDS", default=15),
+    # Reads fall back to the primary while the replica is further behind than this
+    "MAX_LAG": env.float("DATABASE_REPLICA_MAX_LAG", default=10),
+    "LAG_CHECK_INTERVAL": env.int("DATABASE_REPLICA_LAG_CHECK_INTERVAL", default=5),
+}
+
+# Caches: Redis through django-redis. A Redis outage degrades to cache misses.
+CACHE_OPTIONS = {
+    "IGNORE_EXCEPTIONS": True,
+    "SOCKET_CONNECT_TIMEOUT": 1,
+    "SOCKET_TIMEOUT": 1,
+    "CONNECTION_POOL_KWARGS": {"max_connections": env.int("CACHE_MAX_CONNECTIONS", default=50)},
+}
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": env("CACHE_URL", default="redis://localhost:6379/3"),
+        "TIMEOUT": 60 * 60 * 4,  # 4 hours
+        "OPTIONS": CACHE_OPTIONS,
+    },
+    # Public showcase pages; purged on publish, so they can be kept for a day
+    "pages": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": env("CACHE_URL", default="redis://localhost:6379/3"),
+        "KEY_PREFIX": "pages",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": CACHE_OPTIONS,
+    },
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+# Tiered cache: per-process LRU and stampede protection in front of the shared cache (see apps.core.caching)
+TIERED_CACHE = {
+    "LOCAL_SIZE": env.int("TIERED_CACHE_LOCAL_SIZE", default=512),
+    "LOCAL_TTL": env.int("TIERED_CACHE_LOCAL_TTL", default=300),
+    "LOCK_TIMEOUT": 30,
+    "LOCK_WAIT": 5.0,
+    "EARLY_RECOMPUTE_BETA": 1.0,
 }
 
 # Default primary key field type
@@ -164,11 +233,19 @@ WAGTAILSEARCH_BACKENDS = {
 WAGTAILIMAGES_MAX_UPLOAD_SIZE = 20 * 1024 * 1024  # 20MB
 WAGTAILIMAGES_MAX_IMAGE_PIXELS = 128 * 1000000  # 128 megapixels
 
+# Full-page cache for public Wagtail pages (see apps.showcase.cache)
+WAGTAIL_CACHE = env.bool("WAGTAIL_CACHE", default=True)
+WAGTAIL_CACHE_BACKEND = "pages"
+WAGTAIL_CACHE_KEYRING = True
+SHOWCASE = {
+    "BROWSER_MAX_AGE": env.int("SHOWCASE_BROWSER_MAX_AGE", default=60),
+}
+
 # REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        "apps.farm.authentication.FarmTokenAuthentication",
+        "apps.farm.authentication.FarmSessionAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -190,6 +267,96 @@ CORS_ALLOW_CREDENTIALS = True
 # SmartDairy Settings
 DEFAULT_CURRENCY = env("DEFAULT_CURRENCY", default="KES")
 
+# Audit log (events are queued and bulk-written by a background thread)
+AUDIT_LOG = {
+    "ENABLED": env.bool("AUDIT_LOG_ENABLED", default=True),
+    "BATCH_SIZE": env.int("AUDIT_LOG_BATCH_SIZE", default=200),
+    "FLUSH_INTERVAL": env.float("AUDIT_LOG_FLUSH_INTERVAL", default=2.0),
+    "MAX_QUEUE_SIZE": env.int("AUDIT_LOG_MAX_QUEUE_SIZE", default=10000),
+    "RETENTION_DAYS": env.int("AUDIT_LOG_RETENTION_DAYS", default=365),
+    "TRUSTED_PROXIES": env.int("AUDIT_LOG_TRUSTED_PROXIES", default=1),
+    "EXCLUDE": ["feeds.InventoryBalance", "feeds.InventoryMovement"],
+}
+
+# Archive: months older than HOT_MONTHS are moved into compressed chunks
+ARCHIVE = {
+    "HOT_MONTHS": env.int("ARCHIVE_HOT_MONTHS", default=13),
+    "MODELS": ["dairy.MilkLog", "feeds.FeedUsageLog", "feeds.InventoryMovement"],
+    "COMPRESSION_LEVEL": 6,
+}
+
+# Request metrics: sampled per-request timings, SQL counts and cache hits
+REQUEST_METRICS = {
+    "ENABLED": env.bool("REQUEST_METRICS_ENABLED", default=True),
+    "SAMPLE_RATE": env.float("REQUEST_METRICS_SAMPLE_RATE", default=1.0),
+    "SERVER_TIMING": env.bool("REQUEST_METRICS_SERVER_TIMING", default=True),
+    "LOG": env.bool("REQUEST_METRICS_LOG", default=True),
+    "WINDOW_SIZE": env.int("REQUEST_METRICS_WINDOW_SIZE", default=500),
+    "SLOW_REQUEST_MS": env.int("REQUEST_METRICS_SLOW_MS", default=1000),
+}
+
+# Token cache: token -> user in a per-process LRU backed by the shared cache
+TOKEN_CACHE = {
+    "ENABLED": env.bool("TOKEN_CACHE_ENABLED", default=True),
+    "LOCAL_TTL": env.int("TOKEN_CACHE_LOCAL_TTL", default=30),
+    "LOCAL_SIZE": env.int("TOKEN_CACHE_LOCAL_SIZE", default=2048),
+    "SHARED_TTL": env.int("TOKEN_CACHE_SHARED_TTL", default=300),
+    "TRACK_DEVICES": env.bool("TOKEN_CACHE_TRACK_DEVICES", default=True),
+    "DEVICE_HEADER": "HTTP_X_DEVICE_ID",
+    "DEVICE_FLUSH_INTERVAL": env.int("TOKEN_CACHE_DEVICE_FLUSH_INTERVAL", default=60),
+}
+
+# Async read views: independent queries run concurrently on a thread pool
+ASYNC_READS = {
+    "CONCURRENT": env.bool("ASYNC_READS_CONCURRENT", default=True),
+    "MAX_WORKERS": env.int("ASYNC_READS_MAX_WORKERS", default=16),
+}
+
+# Uploaded photos: EXIF stripped and WebP variants written by a Celery task (see apps.core.images)
+IMAGE_VARIANTS = {
+    "ENABLED": env.bool("IMAGE_VARIANTS_ENABLED", default=True),
+    "VARIANTS": {"medium": 800, "thumbnail": 200},
+    "QUALITY": env.int("IMAGE_VARIANTS_QUALITY", default=80),
+}
+
+# Resumable photo uploads: chunks are kept on disk until assembled (see apps.core.uploads)
+UPLOAD_SESSIONS = {
+    "ROOT": env("UPLOAD_SESSIONS_ROOT", default=str(MEDIA_ROOT / "uploads-partial")),
+    "CHUNK_SIZE": 1024 * 1024,
+    "MAX_CHUNK_SIZE": 5 * 1024 * 1024,
+    "MAX_SIZE": 50 * 1024 * 1024,
+    "EXPIRE_HOURS": env.int("UPLOAD_SESSIONS_EXPIRE_HOURS", default=24),
+}
+
+# QR label sheets, rendered by a Celery task (see apps.core.labels)
+LABEL_SHEETS = {
+    "PROCESSES": env.int("LABEL_SHEETS_PROCESSES", default=4),
+    "DPI": 300,
+    "PAGE_SIZE": (2480, 3508),
+    "COLUMNS": 3,
+    "ROWS": 7,
+}
+
+# Change events of farm-scoped models, published to a Redis Stream by manage.py relayevents (see apps.core.events)
+EVENT_STREAM = {
+    "ENABLED": env.bool("EVENT_STREAM_ENABLED", default=True),
+    "URL": env("EVENT_STREAM_URL", default=env("REDIS_URL", default="redis://localhost:6379/0")),
+    "STREAM": env("EVENT_STREAM_NAME", default="smartdairy:events"),
+    "MAXLEN": env.int("EVENT_STREAM_MAXLEN", default=100_000),
+    "BATCH_SIZE": 500,
+    "POLL_INTERVAL": 1.0,
+    "RETENTION_HOURS": env.int("EVENT_STREAM_RETENTION_HOURS", default=72),
+    "EXCLUDE": [],
+}
+
+# Milk produced vs withheld vs sold per farm and day (see apps.sales.reconciliation)
+MILK_RECONCILIATION = {
+    "TOLERANCE_LITERS": env.int("MILK_RECONCILIATION_TOLERANCE_LITERS", default=5),
+    "TOLERANCE_PERCENT": env.float("MILK_RECONCILIATION_TOLERANCE_PERCENT", default=2),
+    "DAYS": 7,
+    "MAX_IMPORT_ROWS": 2000,
+}
+
 # Celery settings
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/1")
 CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://localhost:6379/2")
@@ -197,6 +364,36 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
+# Tasks of the CMS apps run on a worker with the full settings; the rest on slim workers
+CELERY_TASK_ROUTES = {
+    "apps.showcase.tasks.*": {"queue": "cms"},
+}
+CELERY_BEAT_SCHEDULE = {
+    "refresh-efficiency-rollups": {
+        "task": "apps.feeds.tasks.refresh_efficiency_rollups",
+        "schedule": crontab(hour=1, minute=15),
+    },
+    "rebuild-recent-profit-loss": {
+        "task": "apps.sales.tasks.rebuild_recent_profit_loss",
+        "schedule": crontab(hour=1, minute=30),
+    },
+    "reconcile-milk": {
+        "task": "apps.sales.tasks.reconcile_milk",
+        "schedule": crontab(hour=1, minute=45),
+    },
+    "prune-upload-sessions": {
+        "task": "apps.core.tasks.prune_upload_sessions",
+        "schedule": crontab(minute=20),
+    },
+    "prune-outbox-events": {
+        "task": "apps.core.tasks.prune_outbox_events",
+        "schedule": crontab(minute=40),
+    },
+    "refresh-showcase-snapshots": {
+        "task": "apps.showcase.tasks.refresh_showcase_snapshots",
+        "schedule": crontab(minute=10),
+    },
+}
 
 # Logging
 LOGGING = {
@@ -233,5 +430,10 @@ LOGGING = {
             "level": "DEBUG",
             "propagate": False,
         },
+        "smartdairy.metrics": {
+            "handlers": ["console"],
+            "level": env("REQUEST_METRICS_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
     },
 }
@@ -27,12 +27,16 @@ else:
         }
     }
 
-# Caching
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
-    }
-}
+# Caching: an in-process fakeredis server unless CACHE_URL points at a real Redis
+if not env("CACHE_URL", default=""):  # noqa: F405
+    import fakeredis
+
+    CACHE_OPTIONS["CONNECTION_POOL_KWARGS"]["connection_class"] = fakeredis.FakeConnection  # noqa: F405
+# Event stream: in-process fakeredis unless a Redis URL is given
+if not env("EVENT_STREAM_URL", default="") and not env("REDIS_URL", default=""):  # noqa: F405
+    EVENT_STREAM["URL"] = None  # noqa: F405
+# Every view of a showcase page renders
+CACHES["pages"] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}  # noqa: F405
 
 # Debug toolbar
 INSTALLED_APPS += ["debug_toolbar"]  # noqa: F405
@@ -40,6 +44,9 @@ MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")  # noqa:
 
 INTERNAL_IPS = ["127.0.0.1", "172.0.0.0/8"]
 
+# Run Celery tasks (e.g. image variants) in-process unless a worker is set up
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", default=True)  # noqa: F405
+
 # Email backend for development
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
@@ -22,21 +22,6 @@ if not DEBUG:
     SESSION_COOKIE_SECURE = True
     CSRF_COOKIE_SECURE = True
 
-# Memcached
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
-        "LOCATION": env("MEMCACHED_URL", default="memcached:11211"),  # noqa: F405
-        "TIMEOUT": 60 * 60 * 4,  # 4 hours
-        "OPTIONS": {
-            "no_delay": True,
-            "ignore_exc": True,
-            "max_pool_size": 4,
-            "use_pooling": True,
-        },
-    }
-}
-
 # Static files with whitenoise
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
@@ -47,3 +32,7 @@ LOGGING["handlers"]["file"] = {  # noqa: F405
     "formatter": "verbose",
 }
 LOGGING["root"]["handlers"] = ["console", "file"]  # noqa: F405
+
+# Request metrics: sample a tenth of requests and keep Server-Timing off the wire
+REQUEST_METRICS["SAMPLE_RATE"] = env.float("REQUEST_METRICS_SAMPLE_RATE", default=0.1)  # noqa: F405
+REQUEST_METRICS["SERVER_TIMING"] = env.bool("REQUEST_METRICS_SERVER_TIMING", default=False)  # noqa: F405
@@ -0,0 +1,15 @@
+"""
+SmartDairy - Slim settings for API-only and worker processes
+
+Production settings without the Wagtail CMS (CMS_APPS): Celery workers and
+beat, the event relay and the async API server start without importing
+Wagtail, its admin or the showcase pages. The URLconf serves the /api/v1/
+endpoints only. Migrations, collectstatic and the CMS stay with processes
+on the full settings, as do the showcase tasks (the "cms" Celery queue).
+"""
+from .production import *  # noqa: F401, F403
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in CMS_APPS]  # noqa: F405
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith("wagtail.")]  # noqa: F405
+
+ROOT_URLCONF = "smartdairy.api_urls"
@@ -4,13 +4,14 @@ Koimeret Dairies - URL Configuration
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 from wagtail import urls as wagtail_urls
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.api.v2.views import PagesAPIViewSet
 from wagtail.api.v2.router import WagtailAPIRouter
 from wagtail.documents import urls as wagtaildocs_urls
+from wagtail.urls import serve_pattern
 
 # Wagtail API Router
 api_router = WagtailAPIRouter("wagtailapi")
@@ -27,18 +28,11 @@ urlpatterns = [
     # Wagtail API
     path("api/wagtail/", api_router.urls),
 
-    # Dashboard APIs
-    path("api/v1/dashboard/owner/", __import__("apps.core.api", fromlist=["OwnerDashboardView"]).OwnerDashboardView.as_view(), name="owner-dashboard"),
-    path("api/v1/dashboard/worker/", __import__("apps.core.api", fromlist=["WorkerDashboardView"]).WorkerDashboardView.as_view(), name="worker-dashboard"),
-
-    # App APIs
-    path("api/v1/", include("apps.farm.urls")),
-    path("api/v1/", include("apps.dairy.api.urls")),
-    path("api/v1/", include("apps.feeds.api.urls")),
-    path("api/v1/", include("apps.health.api.urls")),
-    path("api/v1/", include("apps.tasks.api.urls")),
-    path("api/v1/", include("apps.sales.api.urls")),
-    path("api/v1/", include("apps.alerts.api.urls")),
+    # Dashboard, metrics, upload, label and app APIs
+    path("", include("smartdairy.api_urls")),
+
+    # Public pages through the full-page cache, ahead of Wagtail's uncached serve route
+    re_path(serve_pattern, __import__("apps.showcase.cache", fromlist=["serve"]).serve, name="showcase_serve"),
 
     # Wagtail catch-all (must be last)
     path("", include(wagtail_urls)),